@@ -0,0 +1,89 @@
+""" A memory-efficient alternative to representing morphology nodes as dicts.
+"""
+
+from typing import Any, Dict, Iterator, Mapping
+import collections.abc
+
+
+SWC_FIELDS = ("id", "type", "x", "y", "z", "radius", "parent")
+
+
+class CompactNode(collections.abc.Mapping):
+    """ A fixed-field record describing a single node of a reconstruction.
+    Supports the read (and item assignment) interface of the dicts used
+    elsewhere as nodes (node["x"], "radius" in node, node.get, node.items,
+    comparison with dicts), but stores its fields in slots, which is
+    substantially more compact.
+
+    Notes
+    -----
+    Unlike a dict node, a CompactNode cannot hold keys beyond SWC_FIELDS.
+    Morphologies whose nodes need additional annotations should use dicts.
+
+    """
+
+    __slots__ = SWC_FIELDS
+    _fields = frozenset(SWC_FIELDS)
+
+    def __init__(
+        self,
+        id: int,
+        type: int,
+        x: float,
+        y: float,
+        z: float,
+        radius: float,
+        parent: int
+    ):
+        self.id = id
+        self.type = type
+        self.x = x
+        self.y = y
+        self.z = z
+        self.radius = radius
+        self.parent = parent
+
+    @classmethod
+    def from_dict(cls, node: Mapping[str, Any]) -> "CompactNode":
+        """ Build a CompactNode from a dict-like node. Keys other than
+        SWC_FIELDS are discarded.
+        """
+
+        return cls(**{field: node[field] for field in SWC_FIELDS})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ Convert this node to a plain dict
+        """
+
+        return {field: getattr(self, field) for field in SWC_FIELDS}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self._fields:
+            setattr(self, key, value)
+        else:
+            raise KeyError(
+                f"{self.__class__.__name__} does not support key: {key}")
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._fields
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(SWC_FIELDS)
+
+    def __len__(self) -> int:
+        return len(SWC_FIELDS)
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in SWC_FIELDS)
+
+    def __setstate__(self, state):
+        for field, value in zip(SWC_FIELDS, state):
+            setattr(self, field, value)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()})"
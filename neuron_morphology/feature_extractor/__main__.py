@@ -1,7 +1,5 @@
 import copy as cp
 import logging
-import multiprocessing as mp
-import functools
 from typing import Dict, Any, Tuple, List, Set, Optional, Type
 
 from argschema import ArgSchemaParser
@@ -9,11 +7,21 @@ from argschema import ArgSchemaParser
 from neuron_morphology.feature_extractor._schemas import (
     InputParameters, OutputParameters)
 
-from neuron_morphology.feature_extractor.run_feature_extraction import \
-    run_feature_extraction
+from neuron_morphology.feature_extractor.batch import (
+    iter_extract, check_batch_options)
+from neuron_morphology.feature_extractor.checkpoint import CheckpointLedger
 
 from neuron_morphology.feature_extractor.feature_writer import (
-    FeatureWriter, DEFAULT_FEATURE_FORMATTERS)
+    FeatureWriter, StreamingFeatureWriter, DEFAULT_FEATURE_FORMATTERS, 
+    read_results)
+from neuron_morphology.feature_extractor.profiling import summarize_timings
+from neuron_morphology.feature_extractor.result_cache import (
+    DEFAULT_MAX_BYTES, summarize_cache_statistics)
+from neuron_morphology.feature_extractor.scheduling import ScheduleReport
+from neuron_morphology.feature_extractor.parallel import (
+    DEFAULT_MIN_PARALLEL_NODES)
+from neuron_morphology.feature_extractor.prefetch import (
+    PrefetchStats, DEFAULT_MAX_PREFETCH_BYTES)
 
 
 def extract_multiple(
@@ -24,13 +32,32 @@ def extract_multiple(
     only_marks: Optional[List[str]] = None,
     num_processes: Optional[int] = None,
     global_parameters: Optional[Dict[str, Any]] = None,
-    output_table_path: Optional[str] = None
+    output_table_path: Optional[str] = None,
+    engine: str = "reference",
+    track_memory: bool = False,
+    profile_dir: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    results_path: Optional[str] = None,
+    flush_every: int = 100,
+    checkpoint: Optional[CheckpointLedger] = None,
+    resume: bool = False,
+    result_cache_path: Optional[str] = None,
+    result_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES,
+    schedule: str = "largest_first",
+    schedule_report: Optional[ScheduleReport] = None,
+    task_timeout: Optional[float] = None,
+    max_task_memory: Optional[int] = None,
+    failures: Optional[List[Dict[str, Any]]] = None,
+    prefetch_depth: int = 0,
+    max_prefetch_bytes: int = DEFAULT_MAX_PREFETCH_BYTES,
+    prefetch_stats: Optional[PrefetchStats] = None
 ):
     """ For each path in swc_paths, load the file into a morphology and (attempt 
     to) extract each feature in the set specified by feature_set.
 
-    Because of how Windows handles multiprocessing, run_feature_extraction
-    must be in another py file.
+    Because of how Windows handles multiprocessing, the functions run by 
+    pool workers (see run_feature_extraction) must be in another py file.
 
     Parameters
     ----------
@@ -44,40 +71,133 @@ def extract_multiple(
     global_parameters : a dictionary specifying cross-reconstruction
         parameters
     output_table_path : if not none, write a flattened table of features here
+    engine : "reference" or "fast". Which implementation of the feature set 
+        to use.
+    track_memory : if True, record the peak memory allocated by each feature
+    profile_dir : if provided, write cProfile statistics for each 
+        reconstruction to this directory
+    chunksize : when using a pool, send reconstructions to workers in chunks
+        of this size. If the schedule is "largest_first", defaults to 1, so 
+        that each worker takes the next largest reconstruction as it becomes 
+        free. Otherwise defaults to splitting the reconstructions into about 
+        4 chunks per process (as multiprocessing.Pool.map does).
+    results_path : if provided, stream each reconstruction's outputs to this 
+        file (as JSON lines) as they arrive, rather than accumulating them in 
+        memory. The output table, if requested, is also written 
+        incrementally. See StreamingFeatureWriter.
+    flush_every : when streaming, flush outputs to disk after this many 
+        reconstructions.
+    checkpoint : if provided, record each completed reconstruction in this 
+        ledger.
+    resume : if True, reconstructions with up-to-date records in the 
+        checkpoint ledger are not recalculated. Instead, their recorded 
+        outputs are written. A record is out of date if the swc file, 
+        feature set, engine, package version or parameters have changed. 
+        Requires checkpoint.
+    result_cache_path : if provided, cache individual feature results in a 
+        sqlite database at this path (shared by all processes), and reuse 
+        them rather than recalculating. Unlike resume, this allows partial 
+        reuse: after adding a feature to the set only that feature is 
+        calculated.
+    result_cache_max_bytes : evict the least recently used cached results 
+        when the cache exceeds this size
+    min_parallel_nodes : reconstructions with at least this many nodes are 
+        not sent to the pool. Instead they are processed one at a time after 
+        the pool finishes, each using num_processes processes to calculate 
+        its features (see FeatureExtractionRun). This keeps a few very large 
+        reconstructions from running on one core while the rest sit idle.
+    schedule : "largest_first" (the default) starts the reconstructions with 
+        the largest estimated cost (see scheduling.estimate_cost) first, so 
+        that they do not delay the end of the batch. "input" preserves the 
+        given order.
+    schedule_report : if provided, record expected and actual costs of each 
+        calculated reconstruction, as well as the batch's makespan, here.
+    task_timeout : if provided, a worker which spends longer than this 
+        (seconds) on a single reconstruction is killed and replaced, and the 
+        reconstruction is recorded as failed. See SupervisedPool.
+    max_task_memory : if provided, a worker whose resident memory (along 
+        with that of any processes it forks) exceeds this (bytes) is 
+        likewise killed and replaced. Requires /proc.
+    failures : if provided (and task_timeout or max_task_memory is 
+        provided), a description of each failed reconstruction (see 
+        TaskFailure) is appended here. Under supervision, reconstructions 
+        whose extraction raises an exception are also recorded as failed, 
+        rather than stopping the batch.
+    prefetch_depth : if positive, read the swc files of up to this many 
+        upcoming reconstructions on background threads while features are 
+        calculated (see prefetch_swc_data), so that workers parse 
+        reconstructions from memory. Useful when files are on a network 
+        filesystem. The read time is recorded for each reconstruction as 
+        ("reconstruction" / "io"), alongside "parse" and "extract". 
+        Reconstructions which are extracted by forking this process (see 
+        min_parallel_nodes) are not prefetched, and worker processes are 
+        started from a fork server where available.
+    max_prefetch_bytes : limits the total size of the files being read 
+        ahead, but not yet handed to a worker
+    prefetch_stats : if provided (and prefetching), record the total bytes 
+        and time read, as well as the time spent waiting on reads, here
+
+    Notes
+    -----
+    The feature extractor and global parameters are set up once per process 
+    (see prepare_extraction), rather than once per reconstruction. To 
+    process outputs as they arrive, rather than writing them, use 
+    batch.iter_extract (or batch.aextract within an asyncio event loop).
 
     Returns
     -------
     a dictionary whose keys are reconstruction identifers and whose values are
-        the outputs of run_feature_extraction for those reconstructions.
+        the outputs of run_feature_extraction for those reconstructions. Use 
+        summarize_timings to aggregate the per-feature timings recorded in 
+        these outputs. If results_path is provided, a description of the 
+        written outputs (see StreamingFeatureWriter.write) is returned 
+        instead.
 
     """
 
-    num_processes = num_processes if num_processes else mp.cpu_count()
-    num_processes = min(num_processes, len(reconstructions))
-
-    global_parameters = {} if global_parameters is None else global_parameters
-
-    extract = functools.partial(
-        run_feature_extraction,
-        feature_set=feature_set,
-        only_marks=only_marks,
-        required_marks=required_marks,
-        global_parameter_spec=global_parameters
-    )
+    check_batch_options(checkpoint, resume, schedule)
 
-    if num_processes > 1:
-        pool = mp.Pool(num_processes)
-        mapper = pool.imap_unordered(extract, reconstructions)
+    writer: FeatureWriter
+    if results_path is not None:
+        writer = StreamingFeatureWriter(
+            heavy_output_path,
+            results_path,
+            output_table_path,
+            formatters=DEFAULT_FEATURE_FORMATTERS,
+            flush_every=flush_every
+        )
     else:
-        mapper = (extract(morph) for morph in reconstructions) # type: ignore[assignment]
-
-    writer = FeatureWriter(
-        heavy_output_path,
-        output_table_path,
-        formatters=DEFAULT_FEATURE_FORMATTERS
-    )
+        writer = FeatureWriter(
+            heavy_output_path,
+            output_table_path,
+            formatters=DEFAULT_FEATURE_FORMATTERS
+        )
 
-    for identifier, run in mapper:
+    for identifier, run in iter_extract(
+        reconstructions,
+        feature_set,
+        required_marks=required_marks,
+        only_marks=only_marks,
+        num_processes=num_processes,
+        global_parameters=global_parameters,
+        engine=engine,
+        track_memory=track_memory,
+        profile_dir=profile_dir,
+        chunksize=chunksize,
+        checkpoint=checkpoint,
+        resume=resume,
+        result_cache_path=result_cache_path,
+        result_cache_max_bytes=result_cache_max_bytes,
+        min_parallel_nodes=min_parallel_nodes,
+        schedule=schedule,
+        schedule_report=schedule_report,
+        task_timeout=task_timeout,
+        max_task_memory=max_task_memory,
+        failures=failures,
+        prefetch_depth=prefetch_depth,
+        max_prefetch_bytes=max_prefetch_bytes,
+        prefetch_stats=prefetch_stats
+    ):
         writer.add_run(identifier, run)
 
     return writer.write()
@@ -93,11 +213,46 @@ def main():
     logging.getLogger().setLevel(inputs_record.pop("log_level"))
     inputs_record.pop("input_json", None)
     inputs_record.pop("output_json", None)
-    output_table_path = inputs_record.pop("output_table_path", None)
+
+    checkpoint_path = inputs_record.pop("checkpoint_path", None)
+    checkpoint = None
+    if checkpoint_path is not None:
+        checkpoint = CheckpointLedger(checkpoint_path)
     
     output = {}
     output.update({"inputs": parser.args})
-    output.update({"results": extract_multiple(**inputs_record)})
+    schedule_report = ScheduleReport()
+    failures: List[Dict[str, Any]] = []
+    prefetch_stats = PrefetchStats()
+    output.update({"results": extract_multiple(
+        checkpoint=checkpoint, 
+        schedule_report=schedule_report, 
+        failures=failures,
+        prefetch_stats=prefetch_stats,
+        **inputs_record
+    )})
+    output.update({"failures": failures})
+
+    if checkpoint is not None:
+        output.update({"checkpoint_summary": checkpoint.summary()})
+        checkpoint.close()
+    output.update({"schedule_summary": schedule_report.summary()})
+
+    results_path = inputs_record.get("results_path")
+
+    def iter_runs():
+        if results_path is not None:
+            return (run for _, run in read_results(results_path))
+        return iter(output["results"].values())
+
+    output.update({"timing_summary": summarize_timings(iter_runs())})
+    output.update({"reconstruction_timing_summary": summarize_timings(
+        iter_runs(), category="reconstruction")})
+    if inputs_record.get("prefetch_depth"):
+        output.update({"prefetch_summary": prefetch_stats.summary()})
+    if inputs_record.get("result_cache_path") is not None:
+        output.update({
+            "result_cache_summary": summarize_cache_statistics(iter_runs())})
 
     parser.output(output)
 
@@ -1,7 +1,9 @@
 from argschema.schemas import ArgSchema, DefaultSchema
 from argschema.fields import (
-    InputFile, OutputFile, String, Nested, Dict, List, Int, Field, Float)
+    InputFile, OutputFile, OutputDir, String, Nested, Dict, List, Int, Field, 
+    Float, Boolean)
 from marshmallow import ValidationError
+from marshmallow.validate import OneOf, Range
 
 from neuron_morphology.features.layer.layered_point_depths import \
     LayeredPointDepths
@@ -130,6 +132,16 @@ class InputParameters(ArgSchema):
         required=False,
         default="aibs_default"
     )
+    engine = String(
+        description=(
+            "which implementation of the feature set to use. \"fast\" "
+            "substitutes array-backed implementations, which produce the same "
+            "results, where these are available."
+        ),
+        required=False,
+        default="reference",
+        validate=OneOf(["reference", "fast"])
+    )
     only_marks = List(
         String,
         cli_as_single_argument=True,
@@ -149,10 +161,66 @@ class InputParameters(ArgSchema):
         description=(
             "this module writes outputs to a json specified as --output_json. "
             "If you want to store outputs in a different format "
-            "(.csv is supported currently), specify this parameter"
+            "(.csv or .h5), specify this parameter. An .h5 table stores "
+            "numeric features as a float64 matrix (see "
+            "feature_table.load_feature_table)"
+        ),
+        required=False
+    )
+    results_path = OutputFile(
+        description=(
+            "If provided, each reconstruction's outputs are appended to this "
+            "file (as a line of JSON) as soon as they are calculated, and "
+            "the output table (if requested) is likewise written "
+            "incrementally. The output json then records where results were "
+            "written, rather than the results themselves. Use this for large "
+            "cohorts."
         ),
         required=False
     )
+    flush_every = Int(
+        description=(
+            "when streaming results (see results_path), flush outputs to "
+            "disk after this many reconstructions"
+        ),
+        required=False,
+        default=100
+    )
+    checkpoint_path = OutputFile(
+        description=(
+            "If provided, record each completed reconstruction in a sqlite "
+            "ledger at this path. See resume."
+        ),
+        required=False
+    )
+    resume = Boolean(
+        description=(
+            "Skip reconstructions which have up-to-date records in the "
+            "checkpoint ledger (same swc contents, feature set, engine, "
+            "package version and parameters), writing their recorded "
+            "outputs instead of recalculating them. Requires checkpoint_path."
+        ),
+        required=False,
+        default=False
+    )
+    result_cache_path = OutputFile(
+        description=(
+            "If provided, cache individual feature results in a sqlite "
+            "database at this path and reuse them in later runs. Only "
+            "features whose results are not cached (e.g. because they are "
+            "new, or their parameters or the reconstruction have changed) "
+            "are calculated."
+        ),
+        required=False
+    )
+    result_cache_max_bytes = Int(
+        description=(
+            "When the result cache exceeds this size (in bytes), the least "
+            "recently used results are evicted"
+        ),
+        required=False,
+        default=2 ** 30
+    )
     num_processes = Int(
         description=(
             "Run a multiprocessing pool with this many processes. "
@@ -163,6 +231,94 @@ class InputParameters(ArgSchema):
         default=None,
         allow_none=True
     )
+    track_memory = Boolean(
+        description=(
+            "record the peak memory allocated while calculating each feature "
+            "(using tracemalloc). This slows feature extraction considerably."
+        ),
+        required=False,
+        default=False
+    )
+    profile_dir = OutputDir(
+        description=(
+            "if provided, profile feature extraction for each reconstruction "
+            "(using cProfile) and write the statistics (one .prof file per "
+            "reconstruction) to this directory"
+        ),
+        required=False
+    )
+    min_parallel_nodes = Int(
+        description=(
+            "Reconstructions with at least this many nodes are processed one "
+            "at a time after the rest, with their features calculated in "
+            "parallel using num_processes processes."
+        ),
+        required=False,
+        default=100000
+    )
+    schedule = String(
+        description=(
+            "The order in which reconstructions are processed. "
+            "\"largest_first\" starts the reconstructions with the largest "
+            "swc files first, so that they do not delay the end of the "
+            "batch. \"input\" processes reconstructions in the order given."
+        ),
+        required=False,
+        default="largest_first",
+        validate=OneOf(["largest_first", "input"])
+    )
+    task_timeout = Float(
+        description=(
+            "If provided, a worker which spends longer than this (seconds) "
+            "on a single reconstruction is killed and replaced. The "
+            "reconstruction is recorded as failed and the batch continues."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    max_task_memory = Int(
+        description=(
+            "If provided, a worker whose resident memory (along with that of "
+            "any processes it forks) exceeds this many bytes is killed and "
+            "replaced. The reconstruction is recorded as "
+            "failed and the batch continues. Requires /proc (Linux)."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    prefetch_depth = Int(
+        description=(
+            "If positive, read the swc files of up to this many upcoming "
+            "reconstructions on background threads while features are "
+            "calculated, so that I/O latency (e.g. on a network filesystem) "
+            "overlaps with computation. 0 (the default) disables "
+            "prefetching."
+        ),
+        required=False,
+        default=0,
+        validate=Range(min=0)
+    )
+    max_prefetch_bytes = Int(
+        description=(
+            "When prefetching, the maximum total size (bytes) of the swc "
+            "files read ahead of their use"
+        ),
+        required=False,
+        default=256 * 1024 ** 2,
+        validate=Range(min=1)
+    )
+    chunksize = Int(
+        description=(
+            "When running a pool, send reconstructions to worker processes in "
+            "chunks of this size. Default is to divide the reconstructions "
+            "into about 4 chunks per process."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
     global_parameters = Nested(
         GlobalParameters, 
         description=(
@@ -182,3 +338,263 @@ class OutputParameters(DefaultSchema):
         description="The outputs of feature extraction",
         required=True
     )
+    checkpoint_summary = Dict(
+        description=(
+            "if a checkpoint ledger was used, the numbers of reconstructions "
+            "skipped (found in the ledger) and computed"
+        ),
+        required=False
+    )
+    result_cache_summary = Dict(
+        description=(
+            "if a result cache was used, the total numbers of cached feature "
+            "results found (hits) and calculated (misses)"
+        ),
+        required=False
+    )
+    schedule_summary = Dict(
+        description=(
+            "the schedule used, the batch's makespan, the rank correlation "
+            "of expected (swc size) and actual (wall time) costs across "
+            "reconstructions, and the costs of the slowest reconstructions"
+        ),
+        required=False
+    )
+    failures = List(
+        Dict,
+        description=(
+            "reconstructions which could not be processed under supervision "
+            "(see task_timeout and max_task_memory), with the reason (timeout, "
+            "memory, error or crashed), a message, the elapsed time and the "
+            "peak resident memory of the worker and its children (if "
+            "max_task_memory is set)"
+        ),
+        required=False
+    )
+    timing_summary = Dict(
+        description=(
+            "for each feature, percentiles (p50, p95) and maxima of the wall "
+            "time, cpu time and (if tracked) peak memory used in calculating "
+            "that feature across reconstructions"
+        ),
+        required=False
+    )
+    reconstruction_timing_summary = Dict(
+        description=(
+            "percentiles (p50, p95) and maxima across reconstructions of the "
+            "time spent reading (io), parsing (parse) and extracting "
+            "features from (extract) each reconstruction"
+        ),
+        required=False
+    )
+    prefetch_summary = Dict(
+        description=(
+            "if prefetching, the number of files and bytes read ahead, the "
+            "total time spent reading, the time spent waiting for reads to "
+            "finish and the largest number of bytes read ahead at once"
+        ),
+        required=False
+    )
+
+
+class ServerParameters(ArgSchema):
+    host = String(
+        description=(
+            "listen on this address. The default only accepts local "
+            "connections."
+        ),
+        required=False,
+        default="127.0.0.1"
+    )
+    port = Int(
+        description="listen on this port. 0 chooses a free port.",
+        required=False,
+        default=8321
+    )
+    path_root = String(
+        description=(
+            "If provided, requests may only name files (e.g. swc_path) "
+            "within this directory. Required if host is not a loopback "
+            "address, since clients are not authenticated."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    feature_set = String(
+        description="select the basic set of features to calculate",
+        required=False,
+        default="aibs_default"
+    )
+    engine = String(
+        description="which implementation of the feature set to use",
+        required=False,
+        default="reference",
+        validate=OneOf(["reference", "fast"])
+    )
+    only_marks = List(
+        String,
+        cli_as_single_argument=True,
+        description=(
+            "restrict calculated features to those with this set of marks"
+        ), 
+        required=False
+    )
+    required_marks = String(
+        description=(
+            "Error (vs. skip) if any of these marks fail validation"
+        ), 
+        required=False,
+        many=True
+    )
+    num_processes = Int(
+        description=(
+            "Keep this many worker processes. Default is the number of cpus."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    max_batch_size = Int(
+        description=(
+            "dispatch at most this many reconstructions to the workers at once"
+        ),
+        required=False,
+        default=64
+    )
+    max_wait = Float(
+        description=(
+            "after receiving a reconstruction, wait up to this long "
+            "(seconds) for concurrent requests to batch with it"
+        ),
+        required=False,
+        default=0.005
+    )
+    global_parameters = Nested(
+        GlobalParameters, 
+        description=(
+            "configuration applied to all morphologies processed by this "
+            "server"
+        ), 
+        required=False
+    )
+
+
+class JobQueueParameters(ArgSchema):
+    mode = String(
+        description=(
+            "submit: add reconstructions (and record the extraction "
+            "settings) to the job table. work: claim and run jobs until none "
+            "remain. merge: write the results of completed jobs. status: "
+            "report the number of jobs with each status."
+        ),
+        required=True,
+        validate=OneOf(["submit", "work", "merge", "status"])
+    )
+    queue_path = String(
+        description=(
+            "the sqlite job table. Should be on a filesystem shared by all "
+            "workers."
+        ),
+        required=True
+    )
+    reconstructions = Nested(
+        Reconstruction,
+        description="(submit) the reconstructions to be processed",
+        required=False,
+        many=True
+    )
+    feature_set = String(
+        description="(submit) select the basic set of features to calculate",
+        required=False,
+        default="aibs_default"
+    )
+    engine = String(
+        description="(submit) which implementation of the feature set to use",
+        required=False,
+        default="reference",
+        validate=OneOf(["reference", "fast"])
+    )
+    only_marks = List(
+        String,
+        cli_as_single_argument=True,
+        description=(
+            "(submit) restrict calculated features to those with this set of "
+            "marks"
+        ), 
+        required=False
+    )
+    required_marks = String(
+        description=(
+            "(submit) Error (vs. skip) if any of these marks fail validation"
+        ), 
+        required=False,
+        many=True
+    )
+    global_parameters = Nested(
+        GlobalParameters, 
+        description=(
+            "(submit) configuration applied to all morphologies processed"
+        ), 
+        required=False
+    )
+    max_attempts = Int(
+        description=(
+            "a job which has been claimed this many times without completing "
+            "is marked failed"
+        ),
+        required=False,
+        default=3
+    )
+    lease = Float(
+        description=(
+            "a running job whose worker has not heartbeated for this long "
+            "(seconds) is released for retry"
+        ),
+        required=False,
+        default=300.0
+    )
+    worker = String(
+        description=(
+            "(work) identifies this worker. Defaults to a unique id built "
+            "from the host name and process id."
+        ),
+        required=False
+    )
+    heartbeat_interval = Float(
+        description=(
+            "(work) renew this worker's lease on its current job this often "
+            "(seconds)"
+        ),
+        required=False,
+        default=30.0
+    )
+    poll_interval = Float(
+        description=(
+            "(work) when no jobs are pending but some are still running, "
+            "check again this often (seconds)"
+        ),
+        required=False,
+        default=5.0
+    )
+    max_jobs = Int(
+        description="(work) stop after running this many jobs",
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    heavy_output_path = OutputFile(
+        description="(merge) heavyweight feature outputs are stored here",
+        required=False
+    )
+    output_table_path = OutputFile(
+        description="(merge) if provided, write a .csv or .h5 table here",
+        required=False
+    )
+    results_path = OutputFile(
+        description=(
+            "(merge) if provided, stream each reconstruction's outputs to "
+            "this file (as a line of JSON), rather than to the output json"
+        ),
+        required=False
+    )
@@ -0,0 +1,568 @@
+""" Extract features from many reconstructions, yielding each
+reconstruction's outputs as soon as they are available.
+"""
+
+from typing import (
+    Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Set, 
+    Tuple)
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import logging
+import multiprocessing as mp
+import time
+
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    prepare_extraction, run_prepared_extraction, initialize_worker,
+    run_worker_extraction, resolve_feature_set)
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.checkpoint import (
+    CheckpointLedger, CheckpointKey, feature_set_version)
+from neuron_morphology.feature_extractor.result_cache import DEFAULT_MAX_BYTES
+from neuron_morphology.feature_extractor.supervisor import SupervisedPool
+from neuron_morphology.feature_extractor.scheduling import (
+    ScheduleReport, known_schedules, estimate_cost, order_reconstructions,
+    reconstruction_identifier)
+from neuron_morphology.feature_extractor.parallel import (
+    DEFAULT_MIN_PARALLEL_NODES, is_large_swc)
+from neuron_morphology.feature_extractor.prefetch import (
+    PrefetchStats, prefetch_swc_data, DEFAULT_MAX_PREFETCH_BYTES)
+from neuron_morphology.feature_extractor.profiling import serialize_timings
+
+
+def default_chunksize(num_tasks: int, num_processes: int) -> int:
+    """ Choose a chunk size which gives each process about 4 chunks of tasks
+    """
+
+    chunksize, extra = divmod(num_tasks, num_processes * 4)
+    if extra:
+        chunksize += 1
+    return max(chunksize, 1)
+
+
+def check_batch_options(
+    checkpoint: Optional[CheckpointLedger],
+    resume: bool,
+    schedule: str
+):
+    """ Raise a ValueError if batch extraction options are inconsistent
+    """
+
+    if resume and checkpoint is None:
+        raise ValueError("resuming requires a checkpoint ledger")
+    if schedule not in known_schedules:
+        raise ValueError(
+            f"unknown schedule: {schedule}. Options are: {known_schedules}")
+
+
+def worker_setup_args(
+    feature_set: str,
+    only_marks: Optional[List[str]],
+    required_marks: Optional[List[str]],
+    global_parameters: Optional[Dict[str, Any]],
+    engine: str = "reference",
+    track_memory: bool = False,
+    profile_dir: Optional[str] = None,
+    result_cache_path: Optional[str] = None,
+    result_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    num_processes: int = 1,
+    min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES
+) -> Tuple:
+    """ Build the arguments with which batch extraction workers are 
+    initialized (see initialize_worker and prepare_extraction), so that 
+    iter_extract and aextract configure their workers alike.
+    """
+
+    return (
+        feature_set, only_marks, required_marks,
+        {} if global_parameters is None else global_parameters,
+        engine, track_memory, profile_dir, result_cache_path,
+        result_cache_max_bytes, num_processes, min_parallel_nodes
+    )
+
+
+def checkpoint_parameters(
+    feature_set: str,
+    engine: str,
+    only_marks: Optional[List[str]],
+    required_marks: Optional[List[str]],
+    global_parameters: Optional[Dict[str, Any]]
+) -> Tuple[str, Dict[str, Any]]:
+    """ Describe the batch-wide inputs which a recorded run must match in 
+    order to be reused.
+
+    Returns
+    -------
+    version : of the feature set (see feature_set_version)
+    parameters : see CheckpointLedger.key_for
+
+    """
+
+    version = feature_set_version(feature_set, engine, [
+        feature.name for feature in
+        FeatureExtractor(resolve_feature_set(feature_set, engine)).features
+    ])
+    parameters = {
+        "global_parameters": 
+            {} if global_parameters is None else global_parameters,
+        "only_marks": only_marks,
+        "required_marks": required_marks
+    }
+    return version, parameters
+
+
+def checkpoint_key(
+    checkpoint: CheckpointLedger,
+    reconstruction: Dict[str, Any],
+    version: str,
+    parameters: Dict[str, Any]
+) -> Optional[CheckpointKey]:
+    """ Build a reconstruction's checkpoint key (see 
+    CheckpointLedger.key_for). Returns None if its swc file can not be read. 
+    Such a reconstruction is neither skipped nor recorded; its extraction 
+    fails (and is reported) as it would without a checkpoint.
+    """
+
+    try:
+        return checkpoint.key_for(reconstruction, version, parameters)
+    except OSError as err:
+        logging.warning(
+            f"unable to checkpoint {reconstruction_identifier(reconstruction)}"
+            f": {err}"
+        )
+        return None
+
+
+def record_run(
+    identifier: str,
+    run: Dict[str, Any],
+    checkpoint: Optional[CheckpointLedger],
+    keys: Dict[str, CheckpointKey],
+    schedule_report: Optional[ScheduleReport]
+) -> Tuple[str, Dict[str, Any]]:
+    """ Note a completed run in the batch's checkpoint ledger and schedule 
+    report (if these are provided). Runs without a checkpoint key (see 
+    checkpoint_key) are not recorded in the ledger.
+    """
+
+    key = keys.get(str(identifier))
+    if checkpoint is not None and key is not None:
+        checkpoint.record(key, identifier, run)
+    if schedule_report is not None:
+        schedule_report.record(identifier, run)
+    return identifier, run
+
+
+def iter_extract(
+    reconstructions: List[Dict[str, Any]],
+    feature_set: str = "aibs_default",
+    required_marks: Optional[List[str]] = None,
+    only_marks: Optional[List[str]] = None,
+    num_processes: Optional[int] = None,
+    global_parameters: Optional[Dict[str, Any]] = None,
+    engine: str = "reference",
+    track_memory: bool = False,
+    profile_dir: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    checkpoint: Optional[CheckpointLedger] = None,
+    resume: bool = False,
+    result_cache_path: Optional[str] = None,
+    result_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES,
+    schedule: str = "largest_first",
+    schedule_report: Optional[ScheduleReport] = None,
+    task_timeout: Optional[float] = None,
+    max_task_memory: Optional[int] = None,
+    failures: Optional[List[Dict[str, Any]]] = None,
+    prefetch_depth: int = 0,
+    max_prefetch_bytes: int = DEFAULT_MAX_PREFETCH_BYTES,
+    prefetch_stats: Optional[PrefetchStats] = None
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """ Extract features from many reconstructions, yielding each
+    reconstruction's outputs as soon as its extraction completes. See
+    extract_multiple (which writes these outputs) for a description of the
+    parameters.
+
+    Yields
+    ------
+    identifier : labels a reconstruction
+    run : as returned by run_feature_extraction for this reconstruction.
+        Reconstructions are yielded in order of completion, not in input
+        order. When resuming, recorded runs are yielded first.
+
+    Notes
+    -----
+    Closing this generator early stops any worker processes.
+
+    """
+
+    check_batch_options(checkpoint, resume, schedule)
+
+    num_processes = num_processes if num_processes else mp.cpu_count()
+    if prefetch_depth and prefetch_stats is None:
+        prefetch_stats = PrefetchStats()
+
+    # pool workers can not fork, so they calculate features serially
+    setup_args = worker_setup_args(
+        feature_set, only_marks, required_marks, global_parameters,
+        engine, track_memory, profile_dir, result_cache_path,
+        result_cache_max_bytes, num_processes, min_parallel_nodes
+    )
+
+    keys: Dict[str, CheckpointKey] = {}
+    if checkpoint is not None:
+        version, parameters = checkpoint_parameters(
+            feature_set, engine, only_marks, required_marks, 
+            global_parameters
+        )
+
+        pending = []
+        recorded_runs = []
+        for reconstruction in reconstructions:
+            key = checkpoint_key(
+                checkpoint, reconstruction, version, parameters)
+            recorded = (
+                checkpoint.get(key) if resume and key is not None else None)
+
+            if recorded is None:
+                if key is not None:
+                    keys[key.identifier] = key
+                pending.append(reconstruction)
+            else:
+                recorded_runs.append(recorded)
+                checkpoint.num_skipped += 1
+
+        logging.info(
+            f"skipping {checkpoint.num_skipped} completed reconstructions; "
+            f"calculating {len(pending)}"
+        )
+        reconstructions = pending
+        yield from recorded_runs
+
+    def prefetched(
+        tasks: List[Dict[str, Any]]
+    ) -> Iterable[Dict[str, Any]]:
+        if not prefetch_depth:
+            return tasks
+        return prefetch_swc_data(
+            tasks, prefetch_depth, max_prefetch_bytes, prefetch_stats)
+
+    def finish(identifier: str, run: Dict[str, Any]) -> Tuple[str, Dict]:
+        if prefetch_stats is not None:
+            # the worker found this reconstruction already in memory
+            read = prefetch_stats.timings.pop(str(identifier), None)
+            if read is not None:
+                run.setdefault("timings", {}).setdefault(
+                    "reconstruction", {}).update(
+                        serialize_timings({"io": read}))
+
+        return record_run(
+            identifier, run, checkpoint, keys, schedule_report)
+
+    costs = {
+        reconstruction_identifier(reconstruction):
+            estimate_cost(reconstruction)
+        for reconstruction in reconstructions
+    }
+    if schedule_report is not None:
+        schedule_report.schedule = schedule
+        for identifier, cost in costs.items():
+            schedule_report.expect(identifier, cost)
+    reconstructions = order_reconstructions(reconstructions, costs, schedule)
+    start = time.perf_counter()
+
+    pooled: List[Dict[str, Any]] = []
+    serial = reconstructions
+    if min(num_processes, len(reconstructions)) > 1:
+        pooled, serial = [], []
+        for reconstruction in reconstructions:
+            if is_large_swc(reconstruction["swc_path"], min_parallel_nodes):
+                serial.append(reconstruction)
+            else:
+                pooled.append(reconstruction)
+
+        if len(pooled) < 2:
+            serial = pooled + serial
+            pooled = []
+
+    supervised = task_timeout is not None or max_task_memory is not None
+
+    # a process forked while prefetching threads are running may inherit a 
+    # lock held by one of them (and deadlock). Workers which may be started 
+    # while prefetching (e.g. replacements for failed workers) are therefore 
+    # forked from a server process instead.
+    context = mp.get_context()
+    if prefetch_depth and "forkserver" in mp.get_all_start_methods():
+        context = mp.get_context("forkserver")
+
+    def run_supervised(
+        tasks: List[Dict[str, Any]],
+        processes: int
+    ) -> Iterator[Tuple[str, Dict]]:
+        with SupervisedPool(
+            run_worker_extraction,
+            processes,
+            initializer=initialize_worker,
+            initargs=setup_args,
+            timeout=task_timeout,
+            max_memory=max_task_memory,
+            context=context
+        ) as pool:
+            for task, result, failure in pool.imap_unordered(
+                prefetched(tasks)
+            ):
+                if failure is None:
+                    yield finish(*result)
+                    continue
+
+                record = failure._asdict()
+                record["identifier"] = reconstruction_identifier(task)
+                if prefetch_stats is not None:
+                    prefetch_stats.timings.pop(record["identifier"], None)
+                logging.warning(
+                    f"feature extraction failed for {record['identifier']} "
+                    f"({failure.reason}): {failure.message}"
+                )
+                if failures is not None:
+                    failures.append(record)
+
+    if pooled and supervised:
+        yield from run_supervised(pooled, min(num_processes, len(pooled)))
+
+    elif pooled:
+        pool_processes = min(num_processes, len(pooled))
+        if chunksize is None and schedule == "largest_first":
+            chunksize = 1
+        elif chunksize is None:
+            chunksize = default_chunksize(len(pooled), pool_processes)
+
+        with context.Pool(
+            pool_processes,
+            initializer=initialize_worker,
+            initargs=setup_args
+        ) as pool:
+            for identifier, run in pool.imap_unordered(
+                run_worker_extraction, prefetched(pooled), chunksize=chunksize
+            ):
+                yield finish(identifier, run)
+
+    if serial and supervised:
+        yield from run_supervised(serial, 1)
+
+    elif serial:
+        setup = prepare_extraction(*setup_args)
+
+        # with several processes, these are the large reconstructions, which 
+        # this process forks in order to extract (see extract_in_parallel). 
+        # They are read as they are needed, rather than prefetched.
+        tasks = prefetched(serial) if num_processes <= 1 else serial
+        for reconstruction in tasks:
+            yield finish(*run_prepared_extraction(reconstruction, setup))
+
+    if schedule_report is not None:
+        schedule_report.makespan = time.perf_counter() - start
+
+
+def check_async_options(
+    chunksize: Optional[int],
+    schedule: str,
+    task_timeout: Optional[float],
+    max_task_memory: Optional[int],
+    failures: Optional[List[Dict[str, Any]]],
+    prefetch_depth: int,
+    max_prefetch_bytes: int,
+    prefetch_stats: Optional[PrefetchStats]
+):
+    """ Raise a ValueError if batch extraction options which aextract does 
+    not support are set (to other than their defaults).
+    """
+
+    unsupported = [
+        name for name, is_set in (
+            ("chunksize", chunksize is not None),
+            ("schedule", schedule != "input"),
+            ("task_timeout", task_timeout is not None),
+            ("max_task_memory", max_task_memory is not None),
+            ("failures", failures is not None),
+            ("prefetch_depth", prefetch_depth != 0),
+            (
+                "max_prefetch_bytes", 
+                max_prefetch_bytes != DEFAULT_MAX_PREFETCH_BYTES
+            ),
+            ("prefetch_stats", prefetch_stats is not None)
+        )
+        if is_set
+    ]
+    if unsupported:
+        raise ValueError(
+            f"aextract does not support: {', '.join(unsupported)}")
+
+
+async def aextract(
+    reconstructions: Iterable[Dict[str, Any]],
+    feature_set: str = "aibs_default",
+    required_marks: Optional[List[str]] = None,
+    only_marks: Optional[List[str]] = None,
+    num_processes: Optional[int] = None,
+    global_parameters: Optional[Dict[str, Any]] = None,
+    engine: str = "reference",
+    track_memory: bool = False,
+    profile_dir: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    checkpoint: Optional[CheckpointLedger] = None,
+    resume: bool = False,
+    result_cache_path: Optional[str] = None,
+    result_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES,
+    schedule: str = "input",
+    schedule_report: Optional[ScheduleReport] = None,
+    task_timeout: Optional[float] = None,
+    max_task_memory: Optional[int] = None,
+    failures: Optional[List[Dict[str, Any]]] = None,
+    prefetch_depth: int = 0,
+    max_prefetch_bytes: int = DEFAULT_MAX_PREFETCH_BYTES,
+    prefetch_stats: Optional[PrefetchStats] = None,
+    max_in_flight: Optional[int] = None,
+    executor: Optional[ProcessPoolExecutor] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """ Extract features from many reconstructions, without blocking an
+    asyncio event loop. Reconstructions are submitted to a process pool as
+    their predecessors complete, so that at most max_in_flight are queued or
+    running at once. Unconsumed results therefore hold up further
+    submissions (backpressure).
+
+    Parameters
+    ----------
+    reconstructions : specify the reconstructions on which to compute
+        features. May be a lazy iterable; items are drawn as capacity
+        becomes available.
+    feature_set, required_marks, only_marks, global_parameters, engine, 
+        track_memory, profile_dir, checkpoint, resume, result_cache_path, 
+        result_cache_max_bytes, min_parallel_nodes, schedule_report : see 
+        extract_multiple. The worker options (feature_set through 
+        min_parallel_nodes, other than checkpoint and resume) are ignored if 
+        an executor is provided.
+    num_processes : the size of the process pool. Defaults to the number of
+        cpus. Ignored if an executor is provided.
+    chunksize, schedule, task_timeout, max_task_memory, failures, 
+        prefetch_depth, max_prefetch_bytes, prefetch_stats : not supported, 
+        and accepted only so that aextract can be called like iter_extract. 
+        A ValueError is raised if any is set. Reconstructions are submitted 
+        one at a time, in input order ("input" is the only schedule), since 
+        ordering them would draw the whole iterable. Supervision and 
+        prefetching run synchronously, so would block the event loop.
+    max_in_flight : the maximum number of submitted, but not yet consumed,
+        reconstructions. Defaults to twice the number of processes.
+    executor : if provided, use this pool rather than starting one. Its
+        workers must have been initialized with initialize_worker (e.g. 
+        with worker_setup_args). It is not shut down on completion.
+
+    Yields
+    ------
+    identifier : labels a reconstruction
+    run : as returned by run_feature_extraction. In order of completion. 
+        When resuming, a recorded run is yielded in place of its 
+        reconstruction's calculation.
+
+    Examples
+    --------
+    >>> async for identifier, run in aextract(reconstructions):
+    ...     await database.insert(identifier, run["results"])
+
+    """
+
+    check_batch_options(checkpoint, resume, schedule)
+    check_async_options(
+        chunksize, schedule, task_timeout, max_task_memory, failures,
+        prefetch_depth, max_prefetch_bytes, prefetch_stats
+    )
+
+    num_processes = num_processes if num_processes else mp.cpu_count()
+    if max_in_flight is None:
+        max_in_flight = 2 * num_processes
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+
+    keys: Dict[str, CheckpointKey] = {}
+    if checkpoint is not None:
+        version, parameters = checkpoint_parameters(
+            feature_set, engine, only_marks, required_marks, 
+            global_parameters
+        )
+    if schedule_report is not None:
+        schedule_report.schedule = schedule
+
+    owned = executor is None
+    if executor is None:
+        executor = ProcessPoolExecutor(
+            num_processes,
+            initializer=initialize_worker,
+            initargs=worker_setup_args(
+                feature_set, only_marks, required_marks, global_parameters,
+                engine, track_memory, profile_dir, result_cache_path,
+                result_cache_max_bytes, num_processes, min_parallel_nodes
+            )
+        )
+
+    loop = asyncio.get_running_loop()
+    pending = iter(reconstructions)
+    in_flight: Set[asyncio.Future] = set()
+
+    # recorded runs (when resuming), awaiting consumption
+    recorded_runs: Deque[Tuple[str, Dict[str, Any]]] = deque()
+
+    def submit() -> bool:
+        for reconstruction in pending:
+            if checkpoint is not None:
+                key = checkpoint_key(
+                    checkpoint, reconstruction, version, parameters)
+                recorded = (
+                    checkpoint.get(key) if resume and key is not None 
+                    else None
+                )
+                if recorded is not None:
+                    checkpoint.num_skipped += 1
+                    recorded_runs.append(recorded)
+                    return True
+                if key is not None:
+                    keys[key.identifier] = key
+
+            if schedule_report is not None:
+                schedule_report.expect(
+                    reconstruction_identifier(reconstruction),
+                    estimate_cost(reconstruction)
+                )
+            in_flight.add(loop.run_in_executor(
+                executor, run_worker_extraction, reconstruction))
+            return True
+        return False
+
+    start = time.perf_counter()
+    try:
+        while len(in_flight) + len(recorded_runs) < max_in_flight and submit():
+            pass
+
+        while in_flight or recorded_runs:
+            if recorded_runs:
+                yield recorded_runs.popleft()
+                submit()
+                continue
+
+            done, _ = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                in_flight.remove(future)
+                identifier, run = future.result()
+                yield record_run(
+                    identifier, run, checkpoint, keys, schedule_report)
+                submit()
+
+        if schedule_report is not None:
+            schedule_report.makespan = time.perf_counter() - start
+
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=False)
@@ -0,0 +1,178 @@
+""" A ledger of completed feature extraction runs, which allows a large batch
+extraction to be resumed after a failure without redoing completed work.
+"""
+
+from typing import Any, Dict, Optional, Tuple, NamedTuple, Iterable
+import hashlib
+import json
+import pickle
+import sqlite3
+
+import neuron_morphology
+
+
+def hash_file(path: str, block_size: int = 2 ** 20) -> str:
+    """ Calculate the sha256 digest of a file's contents
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_:
+        for block in iter(lambda: file_.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_parameters(parameters: Any) -> str:
+    """ Calculate a stable digest of a json-like collection of parameters.
+    Mapping keys are sorted, so their order does not affect the result.
+    """
+
+    encoded = json.dumps(parameters, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def feature_set_version(
+    feature_set: str,
+    engine: str,
+    feature_names: Iterable[str]
+) -> str:
+    """ Identify a version of a feature set. This changes if the set's
+    features, the engine used to calculate them or the version of this
+    package change.
+    """
+
+    return hash_parameters({
+        "feature_set": feature_set,
+        "engine": engine,
+        "features": sorted(feature_names),
+        "version": neuron_morphology.__version__
+    })
+
+
+class CheckpointKey(NamedTuple):
+    """ Identifies a completed run. A recorded run is reused only if all of
+    these match.
+    """
+    identifier: str
+    swc_hash: str
+    feature_set_version: str
+    parameter_hash: str
+
+
+class CheckpointLedger:
+
+    def __init__(self, path: str):
+        """ Records completed feature extraction runs in a sqlite database.
+        Runs are stored (pickled) as returned by run_feature_extraction, so
+        that they can be passed to a FeatureWriter in place of a new
+        calculation.
+
+        Parameters
+        ----------
+        path : of the sqlite database. Created if it does not exist.
+
+        """
+
+        self.path = path
+        self.num_skipped = 0
+        self.num_recorded = 0
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "identifier TEXT PRIMARY KEY, "
+            "swc_hash TEXT NOT NULL, "
+            "feature_set_version TEXT NOT NULL, "
+            "parameter_hash TEXT NOT NULL, "
+            "run BLOB NOT NULL)"
+        )
+        self.connection.commit()
+
+    def key_for(
+        self,
+        reconstruction: Dict[str, Any],
+        version: str,
+        parameters: Any
+    ) -> CheckpointKey:
+        """ Build the key for a reconstruction.
+
+        Parameters
+        ----------
+        reconstruction : a reconstruction specification (as argued to
+            run_feature_extraction). Must have an swc_path.
+        version : identifies the feature set (see feature_set_version)
+        parameters : any other inputs (e.g. global parameters, marks) which
+            affect the results. Combined with the reconstruction's own
+            parameters.
+
+        """
+
+        swc_path = reconstruction["swc_path"]
+        identifier = reconstruction.get("identifier", swc_path)
+        own_parameters = {
+            key: value for key, value in reconstruction.items()
+            if key != "swc_path"
+        }
+
+        return CheckpointKey(
+            identifier=str(identifier),
+            swc_hash=hash_file(swc_path),
+            feature_set_version=version,
+            parameter_hash=hash_parameters([own_parameters, parameters])
+        )
+
+    def get(self, key: CheckpointKey) -> Optional[Tuple[str, Dict]]:
+        """ Look up a completed run.
+
+        Returns
+        -------
+        The recorded (identifier, run) if there is a record with this key.
+            None if there is no record or the record is stale (its hashes
+            differ).
+
+        """
+
+        row = self.connection.execute(
+            "SELECT run FROM checkpoints WHERE identifier = ? "
+            "AND swc_hash = ? AND feature_set_version = ? "
+            "AND parameter_hash = ?",
+            tuple(key)
+        ).fetchone()
+
+        if row is None:
+            return None
+        return pickle.loads(row[0])
+
+    def record(self, key: CheckpointKey, identifier: str, run: Dict):
+        """ Record a completed run, replacing any existing record for this
+        identifier.
+        """
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+            tuple(key) + (
+                pickle.dumps((identifier, run), pickle.HIGHEST_PROTOCOL),)
+        )
+        self.connection.commit()
+        self.num_recorded += 1
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+
+    def summary(self) -> Dict[str, Any]:
+        """ Report how many reconstructions were skipped (because a
+        completed run was found) and computed (and recorded) using this
+        ledger.
+        """
+
+        return {
+            "checkpoint_path": self.path,
+            "skipped": self.num_skipped,
+            "computed": self.num_recorded
+        }
+
+    def close(self):
+        self.connection.close()
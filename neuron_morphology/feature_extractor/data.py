@@ -1,23 +1,47 @@
-from typing import Union, Any, Dict
+from typing import Union, Any, Dict, Callable, Optional, Tuple, Hashable
+from contextlib import contextmanager
 
 from neuron_morphology.morphology import Morphology
 
 class Data:
 
     def __init__(self, morphology: Morphology, **other_things):
-        """ A placeholder for the "general data" objsect that we will pass 
-        into the feature extractor. Guaranteed to have a morphology. Might 
+        """ A placeholder for the "general data" objsect that we will pass
+        into the feature extractor. Guaranteed to have a morphology. Might
         have other things.
         """
 
         self.morphology: Morphology = morphology
+        self._computation_cache: Optional[Dict[Hashable, Any]] = None
+
+        # memoized results of mark validation (see mark.validate_mark)
+        self._mark_validity: Dict[Hashable, bool] = {}
+
         for name, value in other_things.items():
             setattr(self, name, value)
 
     def __hash__(self):
         return hash(id(self))
 
-# Using get_morphology, functions can easily accept either a Data or a 
+    @contextmanager
+    def computation_cache(self):
+        """ Within this context, intermediate results requested via cached()
+        are memoized on this Data, so that features can share them. The cache
+        is dropped when the (outermost) context exits.
+        """
+
+        if self._computation_cache is not None:
+            yield self._computation_cache
+            return
+
+        self._computation_cache = {}
+        try:
+            yield self._computation_cache
+        finally:
+            self._computation_cache = None
+
+
+# Using get_morphology, functions can easily accept either a Data or a
 # Morphology. This derived type expresses that union.
 MorphologyLike = Union[Data, Morphology]
 
@@ -28,3 +52,60 @@ def get_morphology(data: MorphologyLike):
     if isinstance(data, Morphology):
         return data
     return data.morphology
+
+
+def cache_key(fn: Callable, kwargs: Dict[str, Any]) -> Tuple:
+    """ Build a hashable key from a function and its keyword arguments. Lists
+    (e.g. of node types) are converted to tuples.
+    """
+
+    return (fn,) + tuple(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in sorted(kwargs.items())
+    )
+
+
+def memoize(
+    data: MorphologyLike, 
+    fn: Callable, 
+    kwargs: Dict[str, Any], 
+    compute: Callable[[], Any]
+) -> Any:
+    """ Return compute(), memoized under cache_key(fn, kwargs) if data is a 
+    Data with an active computation cache. This is the building block for 
+    cached; use it directly when the result is not simply 
+    fn(morphology, **kwargs).
+    """
+
+    cache = getattr(data, "_computation_cache", None)
+
+    if cache is None:
+        return compute()
+
+    key = cache_key(fn, kwargs)
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def cached(data: MorphologyLike, fn: Callable, **kwargs) -> Any:
+    """ Calculate fn(morphology, **kwargs). If data is a Data with an active
+    computation cache (see Data.computation_cache), the result is memoized
+    there, keyed by (fn, kwargs).
+
+    Parameters
+    ----------
+    data : supplies the morphology (and possibly the cache)
+    fn : the calculation. Must accept a morphology as its first argument
+    **kwargs : passed to fn. Values must be hashable (lists are converted to
+        tuples when building the key).
+
+    Returns
+    -------
+    The result of the calculation. Callers should treat this as read-only, as
+        it may be shared between features.
+
+    """
+
+    return memoize(
+        data, fn, kwargs, lambda: fn(get_morphology(data), **kwargs))
@@ -1,34 +1,83 @@
 from typing import (
-    AbstractSet, Set, Collection, Optional, Dict, Type, FrozenSet, List)
+    AbstractSet, Set, Collection, Optional, Dict, Type, FrozenSet, List, Any,
+    Hashable)
 import logging
 import warnings
+from contextlib import nullcontext
 
 from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
-from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.mark import (
+    Mark, validate_mark, determined_by_shape, data_shape)
+from neuron_morphology.feature_extractor.products import FeaturePlan
+from neuron_morphology.feature_extractor.selection import (
+    FeatureSelection, select_features, find_families)
+from neuron_morphology.feature_extractor.profiling import (
+    Timing, timed, tracking_memory, serialize_timings)
+from neuron_morphology.feature_extractor.result_cache import (
+    FeatureResultCache)
+from neuron_morphology.feature_extractor.parallel import (
+    DEFAULT_MIN_PARALLEL_NODES, choose_num_processes, extract_in_parallel)
 
 
 class FeatureExtractionRun:
     
-    def __init__(self, data):
+    def __init__(
+        self, 
+        data, 
+        track_memory: bool = False,
+        result_cache: Optional[FeatureResultCache] = None,
+        num_processes: int = 1,
+        min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES
+    ):
         """ Represents a single run of feature extraction on a single dataset.
 
         Parameters
         ----------
         data : the dataset from which to extract features
+        track_memory : if True, record the peak memory allocated by each mark 
+            validation and feature calculation (using tracemalloc). This 
+            slows extraction considerably.
+        result_cache : if provided, features whose results are found in this 
+            cache are not recalculated, and newly calculated results are 
+            added to it.
+        num_processes : if greater than 1 and the data's morphology has at 
+            least min_parallel_nodes nodes, calculate features using a pool 
+            of this many forked processes (see parallel). Otherwise features 
+            are calculated serially.
+        min_parallel_nodes : see num_processes
 
         """
 
         self.data: Data = data
+        self.track_memory = track_memory
+        self.result_cache = result_cache
+        self.num_processes = num_processes
+        self.min_parallel_nodes = min_parallel_nodes
+
+        # hits and misses in the result cache during this run
+        self.cache_statistics: Optional[Dict[str, int]] = None
+        self._data_hash: Optional[str] = None
 
         self.selected_marks: Set[Type[Mark]] = set()
         self.selected_features: List[MarkedFeature] = []
+        self.selection: Optional[FeatureSelection] = None
         self.results: Optional[Dict] = None
 
+        # wall time, cpu time and (optionally) peak memory of each mark 
+        # validation, feature calculation and extraction stage
+        self.timings: Dict[str, Dict[str, Timing]] = {
+            "marks": {},
+            "features": {},
+            "stages": {}
+        }
+
     def select_marks(
         self, 
         marks: Collection[Type[Mark]], 
-        required_marks: AbstractSet[Type[Mark]] = frozenset()
+        required_marks: AbstractSet[Type[Mark]] = frozenset(),
+        mark_selections: Optional[
+            Dict[Hashable, FrozenSet[Type[Mark]]]] = None
     ):
         """ Choose marks for this run by validating a set of candidates 
         against the data.
@@ -38,6 +87,10 @@ class FeatureExtractionRun:
         marks : candidate marks to be validated
         required_marks : if provided, raise an exception if any of these marks
             do not validate successfully
+        mark_selections : if provided, marks whose validity depends only on 
+            the shape of the data (see mark.data_shape) are selected from 
+            here, keyed by shape, rather than validated. Newly validated 
+            selections are added. Share this across the runs of a batch.
 
         Returns
         -------
@@ -45,11 +98,31 @@ class FeatureExtractionRun:
 
         """
 
-        for mark in marks:
-            if mark.validate(self.data):
-                self.selected_marks.add(mark)
-            else:
-                logging.info(f"skipping mark (validation failed): {mark.__class__.__name__}")
+        key = None
+        if mark_selections is not None:
+            by_shape = frozenset(
+                mark for mark in marks if determined_by_shape(mark))
+            if by_shape:
+                key = (data_shape(self.data), by_shape)
+
+        if key is not None and key in mark_selections:
+            self.selected_marks |= mark_selections[key]
+            marks = [mark for mark in marks if mark not in key[1]]
+
+        with tracking_memory(self.track_memory):
+            for mark in marks:
+                with timed(
+                    self.timings["marks"], mark.__name__, self.track_memory
+                ):
+                    valid = validate_mark(mark, self.data)
+
+                if valid:
+                    self.selected_marks.add(mark)
+                else:
+                    logging.info(f"skipping mark (validation failed): {mark.__class__.__name__}")
+
+        if key is not None and key not in mark_selections:
+            mark_selections[key] = frozenset(self.selected_marks & key[1])
 
         missing_required = required_marks - self.selected_marks
         if missing_required:
@@ -78,51 +151,315 @@ class FeatureExtractionRun:
         self : This FeatureExtractionRun, with selected_features updated
 
         """
-        if only_marks is None:
-            only_marks = set()
-
-        for feature in features:
-            extra_marks = feature.marks - self.selected_marks
-            if extra_marks:
-                logging.info(
-                    f"skipping feature: {feature.name}. "
-                    f"Found extra marks: {[mark.__name__ for mark in extra_marks]}")
-            elif only_marks - feature.marks:
-                logging.info(f"skipping feature: {feature.name} (no marks from {only_marks})")
-            else:
-                self.selected_features.append(feature)
+        self.selected_features.extend(
+            select_features(features, self.selected_marks, only_marks))
 
-        
         logging.info(f"selected features: {[feature.name for feature in self.selected_features]}")
         return self
 
+    def use_selection(self, selection: FeatureSelection):
+        """ Select features from a precompiled selection (which should have 
+        been built for this run's selected marks), rather than filtering 
+        candidates. The selection's families and product plans are reused.
+
+        Returns
+        -------
+        self : This FeatureExtractionRun, with selected_features updated
+
+        """
+
+        self.selection = selection
+        self.selected_features = list(selection.features)
+        return self
+
+    def plan(self) -> FeaturePlan:
+        """ Determine the intermediate products consumed by this run's 
+        selected features, and the order in which they will be computed.
+        """
+
+        return self._plan(self.selected_features)
+
+    def _plan(self, features: List[MarkedFeature]) -> FeaturePlan:
+        if self.selection is not None:
+            return self.selection.plan(features)
+        return FeaturePlan(features)
+
+    def _lookup_cached(self) -> Dict[str, Any]:
+        """ Look up selected features in the result cache, if there is one.
+
+        Returns
+        -------
+        A dictionary mapping feature names to cached results. Features whose 
+            results were not found are absent.
+
+        """
+
+        if self.result_cache is None:
+            return {}
+
+        self._data_hash = self.result_cache.hash_data(self.data)
+        self.cache_statistics = {"hits": 0, "misses": 0}
+        if self._data_hash is None:
+            self.cache_statistics["misses"] = len(self.selected_features)
+            return {}
+
+        results = {}
+        for feature in self.selected_features:
+            found, value = self.result_cache.get(self._data_hash, feature)
+            if found:
+                results[feature.name] = value
+                self.cache_statistics["hits"] += 1
+            else:
+                self.cache_statistics["misses"] += 1
+
+        return results
+
+    def _store_cached(self, features: List[MarkedFeature]):
+        """ Add the calculated results of some features to the result cache
+        """
+
+        if self.result_cache is None or self._data_hash is None:
+            return
+
+        for feature in features:
+            if feature.name in self.results:
+                self.result_cache.put(
+                    self._data_hash, feature, self.results[feature.name])
+        self.result_cache.commit()
+
+    def _families(
+        self, 
+        features: List[MarkedFeature]
+    ) -> Dict[Any, List]:
+        """ Group features which could be calculated together by a batched 
+        implementation (see marked_feature.batches).
+
+        Returns
+        -------
+        A dictionary mapping (base feature, batched implementation) to a list 
+            of (feature, specialization kwargs) pairs.
+
+        """
+
+        if self.selection is not None:
+            return self.selection.families(features)
+        return find_families(features)
+
+    def _extract_batched(
+        self, 
+        features: Optional[List[MarkedFeature]] = None
+    ) -> Dict[str, Any]:
+        """ Calculate families of selected features (specializations of a 
+        common base feature) using their batched implementations, where 
+        available. See marked_feature.batches.
+
+        Parameters
+        ----------
+        features : restrict to these features. Default is all selected 
+            features.
+
+        Returns
+        -------
+        A dictionary mapping feature names to results. Features which were 
+            not calculated here (no batched implementation, a family of one, 
+            or a failed batch) are absent.
+
+        Notes
+        -----
+        The resources used by each batch are divided evenly among its members 
+        when recording feature timings.
+
+        """
+
+        if features is None:
+            features = self.selected_features
+
+        results = {}
+        for (_, batched), members in self._families(features).items():
+            if len(members) < 2:
+                continue
+
+            batch_timing: Dict[str, Timing] = {}
+            try:
+                with timed(batch_timing, "batch", self.track_memory):
+                    values = batched(
+                        self.data, [variant for _, variant in members])
+            except Exception:
+                logging.warning(
+                    "batched extraction failed for "
+                    f"{[feature.name for feature, _ in members]}; "
+                    "calculating individually", 
+                    exc_info=True
+                )
+                continue
+
+            wall, cpu, peak_memory = batch_timing["batch"]
+            for (feature, _), value in zip(members, values):
+                results[feature.name] = value
+                self.timings["features"][feature.name] = Timing(
+                    wall / len(members), 
+                    cpu / len(members), 
+                    peak_memory
+                )
+
+        return results
+
+    def _extract_parallel(
+        self, 
+        features: List[MarkedFeature], 
+        num_processes: int
+    ) -> Dict[str, Any]:
+        """ Calculate features using a pool of forked processes. Products 
+        are computed first, in this process, so that workers share them. 
+        Each batchable family is sent to a single worker.
+
+        Returns
+        -------
+        A dictionary mapping feature names to results
+
+        """
+
+        stages = self.timings["stages"]
+        index = {
+            feature.name: ii 
+            for ii, feature in enumerate(self.selected_features)
+        }
+
+        groups: List[List[int]] = []
+        for members in self._families(features).values():
+            if len(members) > 1:
+                groups.append([index[feature.name] for feature, _ in members])
+
+        grouped = {ii for group in groups for ii in group}
+        individual = [
+            feature for feature in features 
+            if index[feature.name] not in grouped
+        ]
+        groups.extend([index[feature.name]] for feature in individual)
+
+        if isinstance(self.data, Data):
+            with timed(stages, "products", self.track_memory):
+                self._plan(individual).execute(self.data)
+
+        logging.info(
+            f"calculating {len(features)} features in {len(groups)} groups "
+            f"using {num_processes} processes"
+        )
+        with timed(stages, "parallel", self.track_memory):
+            results, timings = extract_in_parallel(
+                self, groups, num_processes)
+
+        self.timings["features"].update(timings)
+        return results
+
     def extract(self):
         """ For each selected feature, carry out calculation on this run's 
-        dataset.
+        dataset. Intermediate results shared between features are memoized 
+        on the dataset for the duration of this call (see 
+        Data.computation_cache). Products declared by the selected features 
+        are computed up front, once each (see plan). Families of 
+        specializations are calculated together where a batched 
+        implementation exists; these are done first, so that products only 
+        they would consume are not precomputed. If this run has a result 
+        cache, cached features are not calculated at all. Large 
+        reconstructions may be processed in parallel (see num_processes).
 
         Returns
         -------
-        self : This FeatureExtractionRun, with results updated
+        self : This FeatureExtractionRun, with results and timings updated
         """
 
         self.results = {}
 
+        if isinstance(self.data, Data):
+            cache_scope = self.data.computation_cache()
+        else:
+            cache_scope = nullcontext()
+
+        stages = self.timings["stages"]
+
+        with cache_scope, tracking_memory(self.track_memory):
+            with timed(stages, "cache", self.track_memory):
+                cached_results = self._lookup_cached()
+            
+            to_calculate = [
+                feature for feature in self.selected_features
+                if feature.name not in cached_results
+            ]
+
+            num_processes = choose_num_processes(
+                self.data, self.num_processes, self.min_parallel_nodes)
+            parallel = num_processes > 1 and len(to_calculate) > 1
+
+            if parallel:
+                batched_results = self._extract_parallel(
+                    to_calculate, num_processes)
+            else:
+                with timed(stages, "batched", self.track_memory):
+                    batched_results = self._extract_batched(to_calculate)
+
+            if isinstance(self.data, Data) and not parallel:
+                with timed(stages, "products", self.track_memory):
+                    plan = self._plan([
+                        feature for feature in to_calculate
+                        if feature.name not in batched_results
+                    ])
+                    logging.info(
+                        f"computing {len(plan)} products for "
+                        f"{plan.num_requests} requests")
+                    plan.execute(self.data)
+
+            try:
+                with timed(stages, "features", self.track_memory):
+                    self._extract_remaining(cached_results, batched_results)
+            finally:
+                self._store_cached(to_calculate)
+
+        return self
+
+    def _extract_remaining(
+        self,
+        cached_results: Dict[str, Any],
+        batched_results: Dict[str, Any]
+    ):
+        """ Collect cached and batched results and calculate the remaining 
+        selected features one at a time, in selection order
+        """
+
+        features = self.timings["features"]
         for feature in self.selected_features:
+            if feature.name in cached_results:
+                self.results[feature.name] = cached_results[feature.name]
+                continue
+
+            if feature.name in batched_results:
+                self.results[feature.name] = batched_results[feature.name]
+                continue
+
             try:
-                self.results[feature.name] = feature(self.data)
+                with timed(features, feature.name, self.track_memory):
+                    self.results[feature.name] = feature(self.data)
             except:
-                logging.warning(f"feature extraction failed for {feature.name}")
+                logging.warning(
+                    f"feature extraction failed for {feature.name}")
                 raise
 
-        return self
-
     def serialize(self):
         """ Return a dictionary describing this run
         """
 
-        return {
+        serialized = {
             "results": self.results,
             "selected_marks": [mark.__name__ for mark in self.selected_marks],
             "selected_features": [
-                feature.name for feature in self.selected_features]
+                feature.name for feature in self.selected_features],
+            "timings": {
+                category: serialize_timings(timings)
+                for category, timings in self.timings.items()
+            }
         }
+
+        if self.cache_statistics is not None:
+            serialized["result_cache"] = dict(self.cache_statistics)
+
+        return serialized
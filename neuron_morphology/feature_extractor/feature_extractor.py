@@ -1,6 +1,6 @@
 from typing import (
     Sequence, Set, AbstractSet, List, Optional, Type, Union, Iterable, 
-    Mapping, Any)
+    Mapping, Any, Dict, FrozenSet, Hashable, Tuple)
 import logging
 import collections
 
@@ -11,6 +11,12 @@ from neuron_morphology.feature_extractor.marked_feature import (
 from neuron_morphology.feature_extractor.feature_extraction_run import \
     FeatureExtractionRun
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.products import FeaturePlan
+from neuron_morphology.feature_extractor.selection import FeatureSelection
+from neuron_morphology.feature_extractor.result_cache import (
+    FeatureResultCache)
+from neuron_morphology.feature_extractor.parallel import (
+    DEFAULT_MIN_PARALLEL_NODES)
 
 
 # The register_features method on FeatureExtractor supports one level of 
@@ -35,6 +41,14 @@ class FeatureExtractor:
         self.marks: Set[Type[Mark]] = set()
         self.features: List[MarkedFeature] = []
 
+        # marks selected for each shape of data seen by this extractor (see
+        # FeatureExtractionRun.select_marks), so that a batch of similar
+        # reconstructions validates these marks once
+        self.mark_selections: Dict[Hashable, FrozenSet[Type[Mark]]] = {}
+
+        # compiled feature selections, keyed by (selected marks, only marks)
+        self.selections: Dict[Tuple, FeatureSelection] = {}
+
         if features:
             self.register_features(features)
 
@@ -62,13 +76,46 @@ class FeatureExtractor:
                 self.marks |= feature_to_register.marks
                 self.features.append(feature_to_register)
 
+        self.selections.clear()
         return self
 
+    def select(
+        self,
+        selected_marks: AbstractSet[Type[Mark]],
+        only_marks: Optional[AbstractSet[Type[Mark]]] = None
+    ) -> FeatureSelection:
+        """ Select the registered features calculable given a set of marks.
+        Selections are compiled on first use and then reused.
+
+        Parameters
+        ----------
+        selected_marks : the marks which validated for some data
+        only_marks : if provided, reject features not marked with these
+
+        Returns
+        -------
+        The features selected, along with their families and product plans
+
+        """
+
+        key = (
+            frozenset(selected_marks), 
+            None if only_marks is None else frozenset(only_marks)
+        )
+        if key not in self.selections:
+            self.selections[key] = FeatureSelection(
+                self.features, selected_marks, only_marks)
+        return self.selections[key]
+
     def extract(
         self,
         data: Data,
         only_marks: Optional[AbstractSet[Type[Mark]]] = None,
-        required_marks: AbstractSet[Type[Mark]] = frozenset()
+        required_marks: AbstractSet[Type[Mark]] = frozenset(),
+        track_memory: bool = False,
+        result_cache: Optional[FeatureResultCache] = None,
+        num_processes: int = 1,
+        min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES
     ) -> FeatureExtractionRun:
         """ Run the feature extractor for a single dataset
 
@@ -78,6 +125,13 @@ class FeatureExtractor:
         only_marks : if provided, reject marks not in this set
         required_marks : if provided, raise an exception if any of these marks
             do not validate successfully
+        track_memory : if True, record the peak memory allocated by each 
+            feature and mark validation (see FeatureExtractionRun)
+        result_cache : if provided, reuse cached results rather than 
+            recalculating features, and cache newly calculated results
+        num_processes : calculate the features of large reconstructions (at 
+            least min_parallel_nodes nodes) using this many processes
+        min_parallel_nodes : see num_processes
 
         Returns
         -------
@@ -86,15 +140,65 @@ class FeatureExtractor:
 
         """
 
+        run = (
+            FeatureExtractionRun(
+                data, 
+                track_memory=track_memory, 
+                result_cache=result_cache,
+                num_processes=num_processes,
+                min_parallel_nodes=min_parallel_nodes
+            )
+                .select_marks(
+                    self.marks,
+                    required_marks=required_marks,
+                    mark_selections=self.mark_selections
+                )
+        )
+
         return (
+            run
+                .use_selection(self.select(run.selected_marks, only_marks))
+                .extract()
+        )
+
+    def plan(
+        self,
+        data: Optional[Data] = None,
+        only_marks: Optional[AbstractSet[Type[Mark]]] = None,
+        required_marks: AbstractSet[Type[Mark]] = frozenset()
+    ) -> FeaturePlan:
+        """ Report the intermediate products which would be computed (and 
+        the features consuming each) without carrying out any calculations.
+
+        Parameters
+        ----------
+        data : if provided, plan only for the features which would be 
+            selected for this dataset. Otherwise plan for all registered 
+            features.
+        only_marks : as in extract. Ignored if data is not provided.
+        required_marks : as in extract. Ignored if data is not provided.
+
+        Returns
+        -------
+        The plan. Its describe method summarizes each product, its 
+            parameters and its consumers.
+
+        """
+
+        if data is None:
+            return FeaturePlan(self.features)
+
+        run = (
             FeatureExtractionRun(data)
                 .select_marks(
                     self.marks,
-                    required_marks=required_marks
+                    required_marks=required_marks,
+                    mark_selections=self.mark_selections
                 )
-                .select_features(
-                    self.features,
-                    only_marks=only_marks
-                )
-                .extract()
+        )
+
+        return (
+            run
+                .use_selection(self.select(run.selected_marks, only_marks))
+                .plan()
         )
@@ -0,0 +1,287 @@
+""" A binary, typed alternative to csv output tables. Numeric features are
+stored as a (reconstruction X feature) float64 matrix in an HDF5 file, which
+load_feature_table memory-maps. Features with other types (e.g. strings) are
+stored as text alongside.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import logging
+import numbers
+import os
+
+import h5py
+import numpy as np
+import pandas as pd
+
+
+# rows are buffered, then written to the partial table (and later copied to 
+# the final table) in blocks of this many reconstructions
+TABLE_BLOCK_ROWS = 1024
+
+# chunk shape of the partial table's (resizable) datasets
+TABLE_CHUNKS = (256, 128)
+
+
+# the common numeric types, checked before the (slower) general test
+_NUMERIC_TYPES = frozenset({
+    float, int, bool, type(None), np.float64, np.float32, np.int64, np.int32,
+    np.bool_
+})
+
+
+def is_numeric(value: Any) -> bool:
+    """ Whether a feature value belongs in the float64 matrix. None (missing)
+    counts as numeric.
+    """
+
+    if type(value) in _NUMERIC_TYPES:
+        return True
+    return (
+        isinstance(value, (numbers.Number, np.number, np.bool_))
+        and not isinstance(value, complex)
+    )
+
+
+class FeatureTableWriter:
+
+    def __init__(self, path: str):
+        """ Writes a reconstructions X features table to an HDF5 file, one
+        reconstruction at a time. Rows are accumulated on disk in a resizable
+        partial file (path + ".partial"), which close converts to the final,
+        contiguous layout. Rows are buffered in memory and written in blocks
+        (see TABLE_BLOCK_ROWS and flush).
+
+        Parameters
+        ----------
+        path : the table will be written here
+
+        Notes
+        -----
+        Each column's type is determined by its first value. Numeric values
+        (including bools and None, which is stored as nan) go to the "values"
+        matrix. Other values are converted to strings and stored in the
+        "text_values" matrix. Numeric columns receiving non-numeric values
+        store nan (and warn).
+
+        """
+
+        self.path = path
+        self.partial_path = path + ".partial"
+        self.partial = h5py.File(self.partial_path, "w")
+
+        self.reconstruction_ids: List[str] = []
+        self.columns: List[str] = []
+        self.text_columns: List[str] = []
+
+        # maps column names to (is numeric, index within type)
+        self._index: Dict[str, Tuple[bool, int]] = {}
+
+        # rows not yet written to the partial table: numeric and text values,
+        # keyed by column index
+        self._buffer: List[Tuple[Dict[int, Any], Dict[int, str]]] = []
+        self._num_written = 0
+
+        self._values = self.partial.create_dataset(
+            "values",
+            shape=(0, 0),
+            maxshape=(None, None),
+            chunks=TABLE_CHUNKS,
+            dtype="f8",
+            fillvalue=np.nan
+        )
+        self._text_values = self.partial.create_dataset(
+            "text_values",
+            shape=(0, 0),
+            maxshape=(None, None),
+            chunks=TABLE_CHUNKS,
+            dtype=h5py.string_dtype()
+        )
+
+    def _add_column(self, key: str, value: Any) -> Tuple[bool, int]:
+        if is_numeric(value):
+            self._index[key] = (True, len(self.columns))
+            self.columns.append(key)
+        else:
+            self._index[key] = (False, len(self.text_columns))
+            self.text_columns.append(key)
+        return self._index[key]
+
+    def append(self, identifier: str, features: Dict[str, Any]):
+        """ Add one reconstruction's (flattened) features to this table
+        """
+
+        self.reconstruction_ids.append(str(identifier))
+
+        values: Dict[int, Any] = {}
+        text_values: Dict[int, str] = {}
+        for key, value in features.items():
+            entry = self._index.get(key)
+            if entry is None:
+                entry = self._add_column(key, value)
+            numeric, index = entry
+
+            if not numeric:
+                text_values[index] = "" if value is None else str(value)
+            elif is_numeric(value):
+                # converted to float64 (None to nan) when written
+                values[index] = value
+            else:
+                logging.warning(
+                    f"non-numeric value for numeric feature {key} of "
+                    f"{identifier}; storing nan"
+                )
+
+        self._buffer.append((values, text_values))
+        if len(self._buffer) >= TABLE_BLOCK_ROWS:
+            self._write_buffer()
+
+    def _write_buffer(self):
+        """ Write buffered rows to the partial table as a block
+        """
+
+        if not self._buffer:
+            return
+
+        start = self._num_written
+        stop = start + len(self._buffer)
+
+        values = np.full((len(self._buffer), len(self.columns)), np.nan)
+        text_values = np.full(
+            (len(self._buffer), len(self.text_columns)), "", dtype=object)
+        for ii, (row_values, row_text) in enumerate(self._buffer):
+            values[ii, list(row_values)] = list(row_values.values())
+            text_values[ii, list(row_text)] = list(row_text.values())
+
+        self._values.resize((stop, len(self.columns)))
+        self._text_values.resize((stop, len(self.text_columns)))
+        if self.columns:
+            self._values[start:stop] = values
+        if self.text_columns:
+            self._text_values[start:stop] = text_values
+
+        self._num_written = stop
+        self._buffer = []
+
+    def flush(self):
+        """ Write buffered rows to disk
+        """
+
+        self._write_buffer()
+        self.partial.flush()
+
+    def close(self):
+        """ Write the final table and remove the partial file
+        """
+
+        self._write_buffer()
+        num_rows = len(self.reconstruction_ids)
+        strings = h5py.string_dtype()
+
+        with h5py.File(self.path, "w") as table:
+            table.create_dataset(
+                "reconstruction_id",
+                data=np.array(self.reconstruction_ids, dtype=object),
+                dtype=strings
+            )
+            table.create_dataset(
+                "columns",
+                data=np.array(self.columns, dtype=object),
+                dtype=strings
+            )
+            table.create_dataset(
+                "text_columns",
+                data=np.array(self.text_columns, dtype=object),
+                dtype=strings
+            )
+
+            # contiguous (unchunked, uncompressed), so that it can be
+            # memory-mapped
+            values = table.create_dataset(
+                "values", shape=(num_rows, len(self.columns)), dtype="f8")
+            text_values = table.create_dataset(
+                "text_values",
+                shape=(num_rows, len(self.text_columns)),
+                dtype=strings
+            )
+
+            for start in range(0, num_rows, TABLE_BLOCK_ROWS):
+                stop = min(start + TABLE_BLOCK_ROWS, num_rows)
+                if self.columns:
+                    values[start:stop] = self._values[start:stop]
+                if self.text_columns:
+                    text_values[start:stop] = self._text_values[start:stop]
+
+        self.partial.close()
+        os.remove(self.partial_path)
+
+
+class FeatureTable(NamedTuple):
+    """ A reconstructions X features table, as read by load_feature_table
+    """
+
+    # identifies the reconstruction in each row
+    reconstruction_ids: List[str]
+
+    # names of the numeric features, in column order
+    columns: List[str]
+
+    # (reconstruction X numeric feature) float64 array. Memory-mapped where
+    # possible.
+    values: np.ndarray
+
+    # names of the non-numeric features, in column order
+    text_columns: List[str]
+
+    # (reconstruction X non-numeric feature) array of strings
+    text_values: np.ndarray
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """ Convert this table to a pandas DataFrame indexed by
+        reconstruction_id. Numeric columns precede text columns.
+        """
+
+        index = pd.Index(self.reconstruction_ids, name="reconstruction_id")
+        frame = pd.DataFrame(
+            np.asarray(self.values), index=index, columns=self.columns)
+        if self.text_columns:
+            text = pd.DataFrame(
+                self.text_values, index=index, columns=self.text_columns)
+            frame = pd.concat([frame, text], axis=1)
+        return frame
+
+
+def load_feature_table(path: str, mmap: bool = True) -> FeatureTable:
+    """ Read a table written by FeatureTableWriter.
+
+    Parameters
+    ----------
+    path : the table to read
+    mmap : if True, the numeric values are memory-mapped (read-only) rather
+        than read into memory. Falls back to reading if the values are not
+        stored contiguously.
+
+    Returns
+    -------
+    The table
+
+    """
+
+    values: Optional[np.ndarray] = None
+    with h5py.File(path, "r") as table:
+        reconstruction_ids = list(table["reconstruction_id"].asstr()[:])
+        columns = list(table["columns"].asstr()[:])
+        text_columns = list(table["text_columns"].asstr()[:])
+        text_values = table["text_values"].asstr()[:]
+
+        dataset = table["values"]
+        shape = dataset.shape
+        offset = dataset.id.get_offset() if mmap else None
+        if offset is None:
+            values = dataset[:]
+
+    if values is None:
+        values = np.memmap(
+            path, dtype="<f8", mode="r", offset=offset, shape=shape)
+
+    return FeatureTable(
+        reconstruction_ids, columns, values, text_columns, text_values)
@@ -4,11 +4,16 @@ executable to format and write outputs.
 
 import os
 import copy as cp
+import csv
+import json
 import logging
+import math
+import tempfile
 import warnings
 
 from typing import (
-    Optional, Any, Dict, List, Iterable, Callable, NamedTuple, Union
+    Optional, Any, Dict, List, Iterable, Iterator, Callable, NamedTuple, 
+    Union, Tuple
 )
 
 import h5py
@@ -17,10 +22,18 @@ import numpy as np
 
 from neuron_morphology.features.layer.layer_histogram import LayerHistogram
 from neuron_morphology.feature_extractor.utilities import unnest
+from neuron_morphology.feature_extractor.feature_table import (
+    FeatureTableWriter)
 from neuron_morphology.features.layer.layer_histogram import \
     EarthMoversDistanceResult
 
 
+# heavy datasets grow (and are compressed) in chunks of this many 
+# reconstructions
+HEAVY_CHUNK_ROWS = 256
+HEAVY_COMPRESSION = "gzip"
+
+
 class FeatureWriter:
 
     def __init__(
@@ -51,7 +64,55 @@ class FeatureWriter:
         self.output: Dict[str, Any] = {}
 
         self.validate_table_extension()
-        self.heavy_file = h5py.File(self.heavy_path, driver="core")
+        self.heavy_file = self.open_heavy_file()
+
+    def open_heavy_file(self) -> h5py.File:
+        """ Open the file to which heavy outputs will be written. Outputs are 
+        written to disk as they are added (see add_heavy), rather than held 
+        in memory.
+        """
+
+        return h5py.File(self.heavy_path, "w")
+
+    def add_heavy(self, owner: str, key: str, arrays: Dict[str, Any]):
+        """ Add a reconstruction's array-valued outputs for some feature to 
+        this writer's heavy data. Each feature key is stored as a group, 
+        holding one (reconstruction X values) dataset per array along with 
+        an "owners" dataset, whose ith entry identifies the reconstruction 
+        in the ith row. Datasets are chunked and compressed, and grow as 
+        reconstructions are added.
+
+        Parameters
+        ----------
+        owner : identifies the reconstruction that owns this feature
+        key : the name of the feature
+        arrays : maps dataset names to 1D arrays. Rows shorter than their 
+            dataset are padded with its fill value (nan for floating point 
+            data, otherwise 0); longer rows widen it.
+
+        """
+
+        self.has_heavy = True
+
+        if key in self.heavy_file:
+            group = self.heavy_file[key]
+        else:
+            group = self.heavy_file.create_group(key)
+            group.create_dataset(
+                "owners", 
+                shape=(0,), 
+                maxshape=(None,), 
+                chunks=(HEAVY_CHUNK_ROWS,),
+                dtype=h5py.string_dtype()
+            )
+
+        owners = group["owners"]
+        row = owners.shape[0]
+        owners.resize((row + 1,))
+        owners[row] = owner
+
+        for name, values in arrays.items():
+            append_heavy_row(group, name, row, np.asarray(values))
 
 
     def add_run(self, identifier: str, run: Dict[str, Any]):
@@ -120,8 +181,7 @@ class FeatureWriter:
 
         """
 
-        if self.has_heavy:
-            self.heavy_file.close()
+        self.heavy_file.close()
 
         if self.table_path is not None:
             self.write_table()
@@ -137,7 +197,7 @@ class FeatureWriter:
             return
 
         self.table_extension = os.path.splitext(self.table_path)[1]
-        if self.table_extension not in {".csv"}:
+        if self.table_extension not in {".csv", ".h5"}:
             raise ValueError(f"unsupported extension: {self.table_extension}")
 
     def build_output_table(self) -> pd.DataFrame:
@@ -167,14 +227,18 @@ class FeatureWriter:
         writer.
         """
 
-        table = self.build_output_table()
-
         if self.table_extension == ".csv":
             logging.warning(
                 "writing additional outputs to csv. See output json for "
                 "record of selected features and marks"
             )
-            table.to_csv(self.table_path)
+            self.build_output_table().to_csv(self.table_path)
+
+        elif self.table_extension == ".h5":
+            table = FeatureTableWriter(self.table_path)
+            for reconstruction_id, data in self.output.items():
+                table.append(reconstruction_id, unnest(data["results"]))
+            table.close()
 
         else:
             # just being defensive here - we validate on construction
@@ -192,6 +256,223 @@ class FeatureWriter:
         self.formatters.extend(list(formatters))
 
 
+class StreamingFeatureWriter(FeatureWriter):
+
+    def __init__(
+        self, 
+        heavy_path: str, 
+        results_path: str,
+        table_path: Optional[str] = None, 
+        formatters: Optional[Iterable["FeatureFormatter"]] = None,
+        flush_every: int = 100
+    ):
+        """ Formats and writes feature extraction outputs as they arrive, 
+        rather than accumulating them. Only the reconstruction currently 
+        being added is held in memory, so a failure partway through a large 
+        extraction loses at most flush_every reconstructions.
+
+        Parameters
+        ----------
+        heavy_path : if "heavy" features (e.g. with array outputs) are 
+            calculated, write them here.
+        results_path : each reconstruction's outputs are appended to this 
+            file as a line of JSON (see read_results).
+        table_path : if provided, each reconstruction's flattened results are 
+            appended to this file as a row of a reconstructions X features 
+            table.
+        formatters : as in FeatureWriter
+        flush_every : flush outputs to disk after this many reconstructions
+
+        Notes
+        -----
+        The set of features calculated can vary between reconstructions. 
+        When a reconstruction has features not found in previous rows, those 
+        columns are appended to the table's header (this requires rewriting 
+        the table). Earlier rows are shorter than the header; csv readers 
+        (e.g. pandas.read_csv) treat the missing values as empty.
+
+        """
+
+        self.results_path = results_path
+        self.flush_every = flush_every
+
+        super(StreamingFeatureWriter, self).__init__(
+            heavy_path, table_path, formatters)
+
+        self.num_runs = 0
+        self.columns: List[str] = []
+
+        self.results_file = open(self.results_path, "w")
+        self.table_file = None
+        self.feature_table: Optional[FeatureTableWriter] = None
+        if self.table_path is not None and self.table_extension == ".h5":
+            self.feature_table = FeatureTableWriter(self.table_path)
+        elif self.table_path is not None:
+            self.table_file = open(self.table_path, "w", newline="")
+            self.table_writer = csv.writer(self.table_file)
+            self.table_writer.writerow(self.table_header())
+
+    def table_header(self) -> List[str]:
+        return ["reconstruction_id"] + self.columns
+
+    def add_run(self, identifier: str, run: Dict[str, Any]):
+        """ Format the results of a feature extraction run and append them to 
+        this writer's outputs.
+
+        Parameters
+        ----------
+        identifier : the unique identifier for this run
+        run : will be added. This is not modified.
+
+        """
+
+        features = unnest(run["results"])
+        for key in list(features.keys()):
+            features[key] = self.process_feature(identifier, key, features[key])
+
+        record = {"identifier": identifier}
+        record.update(run)
+        record["results"] = features
+
+        self.results_file.write(json.dumps(record, default=to_json_value))
+        self.results_file.write("\n")
+
+        if self.table_file is not None:
+            self.append_row(identifier, unnest(features))
+        elif self.feature_table is not None:
+            self.feature_table.append(identifier, unnest(features))
+
+        self.num_runs += 1
+        if self.num_runs % self.flush_every == 0:
+            self.flush()
+
+    def append_row(self, identifier: str, features: Dict[str, Any]):
+        """ Append one reconstruction's features to the output table, 
+        extending the header if needed.
+        """
+
+        known = set(self.columns)
+        new_columns = [key for key in features if key not in known]
+        if new_columns:
+            self.columns.extend(new_columns)
+            self.rewrite_table_header()
+
+        self.table_writer.writerow(
+            [identifier] 
+            + [to_table_value(features.get(key)) for key in self.columns]
+        )
+
+    def rewrite_table_header(self):
+        """ Replace the header of the output table with the current columns. 
+        The table is copied to a temporary file, which then replaces it.
+        """
+
+        self.table_file.close()
+
+        directory = os.path.dirname(os.path.abspath(self.table_path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".csv")
+        with open(handle, "w", newline="") as temp_file, \
+                open(self.table_path, "r", newline="") as table_file:
+            table_file.readline()
+            csv.writer(temp_file).writerow(self.table_header())
+            for line in table_file:
+                temp_file.write(line)
+        os.replace(temp_path, self.table_path)
+
+        self.table_file = open(self.table_path, "a", newline="")
+        self.table_writer = csv.writer(self.table_file)
+
+    def flush(self):
+        """ Flush this writer's outputs to disk
+        """
+
+        self.results_file.flush()
+        if self.table_file is not None:
+            self.table_file.flush()
+        if self.feature_table is not None:
+            self.feature_table.flush()
+        if self.has_heavy:
+            self.heavy_file.flush()
+
+    def write(self):
+        """ Finish writing and close this writer's outputs
+
+        Returns
+        -------
+        A dictionary describing where the outputs were written
+
+        """
+
+        self.results_file.close()
+        if self.table_file is not None:
+            self.table_file.close()
+        if self.feature_table is not None:
+            self.feature_table.close()
+        self.heavy_file.close()
+
+        output = {
+            "results_path": self.results_path,
+            "num_reconstructions": self.num_runs
+        }
+        if self.table_path is not None:
+            output["table_path"] = self.table_path
+        if self.has_heavy:
+            output["heavy_path"] = self.heavy_path
+
+        return output
+
+    def write_table(self):
+        """ Does nothing. A streaming writer appends to its output table as 
+        runs are added (see add_run), and finishes the table in write.
+        """
+
+
+def to_json_value(value: Any) -> Any:
+    """ Convert values not natively supported by json (e.g. numpy scalars 
+    and arrays) to equivalents which are.
+    """
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"cannot serialize {type(value)} to json")
+
+
+def to_table_value(value: Any) -> Any:
+    """ Format a feature value for a csv table, writing missing values 
+    (None and nan) as empty cells, as pandas.DataFrame.to_csv does.
+    """
+
+    if value is None:
+        return ""
+    if isinstance(value, (float, np.floating)) and math.isnan(value):
+        return ""
+    return value
+
+
+def read_results(results_path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """ Read, one at a time, the reconstruction outputs written by a 
+    StreamingFeatureWriter.
+
+    Yields
+    ------
+    identifier : of a reconstruction
+    that reconstruction's outputs (results, selected marks and features, 
+        timings)
+
+    """
+
+    with open(results_path, "r") as results_file:
+        for line in results_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record.pop("identifier"), record
+
+
 # owner, key, value, heavy data store -> transformed value for json
 FeatureOutputHandler = Callable[[FeatureWriter, str, str, Any], Any]
 
@@ -238,13 +519,76 @@ def add_layer_histogram(
 
     """
 
-    writer.has_heavy = True
+    writer.add_heavy(
+        owner, 
+        key, 
+        {"counts": histogram.counts, "bin_edges": histogram.bin_edges}
+    )
+    return writer.heavy_path
 
-    group = writer.heavy_file.create_group(f"{owner}/{key}")
-    group.create_dataset("counts", data=histogram.counts)
-    group.create_dataset("bin_edges", data=histogram.bin_edges)
 
-    return writer.heavy_path
+def append_heavy_row(
+    group: h5py.Group, 
+    name: str, 
+    row: int, 
+    values: np.ndarray
+):
+    """ Write a 1D array to a row of a (reconstruction X values) heavy 
+    dataset, creating or growing the dataset as needed.
+    """
+
+    values = values.ravel()
+
+    if name not in group:
+        group.create_dataset(
+            name,
+            shape=(0, len(values)),
+            maxshape=(None, None),
+            chunks=(HEAVY_CHUNK_ROWS, max(len(values), 1)),
+            dtype=values.dtype,
+            compression=HEAVY_COMPRESSION,
+            fillvalue=np.nan if values.dtype.kind == "f" else 0
+        )
+
+    dataset = group[name]
+    dataset.resize((row + 1, max(dataset.shape[1], len(values))))
+    dataset[row, :len(values)] = values
+
+
+def read_layer_histograms(
+    heavy_path: str, 
+    key: str
+) -> Dict[str, LayerHistogram]:
+    """ Read a layer histogram feature, for each reconstruction which has 
+    it, from a heavy output file (see add_layer_histogram). Each dataset is 
+    read once.
+
+    Parameters
+    ----------
+    heavy_path : the file to read
+    key : the name of the histogram feature
+
+    Returns
+    -------
+    A dictionary mapping reconstruction identifiers to histograms
+
+    """
+
+    with h5py.File(heavy_path, "r") as heavy_file:
+        group = heavy_file[key]
+        owners = group["owners"].asstr()[:]
+        counts = group["counts"][:]
+        bin_edges = group["bin_edges"][:]
+
+    histograms = {}
+    for owner, row_counts, row_edges in zip(owners, counts, bin_edges):
+        num_edges = int(np.isfinite(row_edges).sum())
+        histograms[owner] = LayerHistogram(
+            counts=row_counts[:max(num_edges - 1, 0)], 
+            bin_edges=row_edges[:num_edges]
+        )
+
+    return histograms
 
 
 def process_earth_movers_distance(
@@ -0,0 +1,495 @@
+""" Distributed feature extraction, coordinated through a sqlite job table
+on a shared filesystem. No services are required: any number of workers, on
+any hosts which can see the table, claim reconstructions, heartbeat while
+working on them and record their results. Tasks whose workers fail (or stop
+heartbeating) are released for retry. A coordinator then merges the results.
+
+    python -m neuron_morphology.feature_extractor.job_queue \
+        --mode submit --queue_path /shared/jobs.db --input_json inputs.json
+    python -m neuron_morphology.feature_extractor.job_queue \
+        --mode work --queue_path /shared/jobs.db    # on each host
+    python -m neuron_morphology.feature_extractor.job_queue \
+        --mode merge --queue_path /shared/jobs.db \
+        --heavy_output_path heavy.h5 --results_path results.jsonl
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from argschema import ArgSchemaParser
+
+from neuron_morphology.feature_extractor._schemas import JobQueueParameters
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    prepare_extraction, run_prepared_extraction)
+from neuron_morphology.feature_extractor.scheduling import (
+    estimate_cost, reconstruction_identifier)
+from neuron_morphology.feature_extractor.feature_writer import (
+    FeatureWriter, StreamingFeatureWriter, DEFAULT_FEATURE_FORMATTERS,
+    to_json_value)
+
+
+# job statuses
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def default_worker_id() -> str:
+    """ Identify this worker uniquely across hosts
+    """
+
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobQueue:
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = 3,
+        lease: float = 300.0,
+        timeout: float = 60.0
+    ):
+        """ A table of feature extraction jobs (one per reconstruction),
+        stored in a sqlite database.
+
+        Parameters
+        ----------
+        path : of the sqlite database. Created if it does not exist. Should
+            be on a filesystem shared by all workers.
+        max_attempts : a job which has been claimed this many times without
+            completing is marked failed
+        lease : a running job whose worker has not heartbeated for this long
+            (s) is released for retry. Workers' clocks should agree to well
+            within this.
+        timeout : wait this long (s) for other workers' locks
+
+        Notes
+        -----
+        The rollback journal (rather than WAL) is used, since WAL requires
+        shared memory, which is not available across hosts.
+
+        """
+
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease = lease
+
+        self.connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=DELETE")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "identifier TEXT PRIMARY KEY, "
+            "spec TEXT NOT NULL, "
+            "cost REAL NOT NULL, "
+            "status TEXT NOT NULL, "
+            "worker TEXT, "
+            "heartbeat REAL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "error TEXT, "
+            "run BLOB)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS settings ("
+            "name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def configure(self, settings: Dict[str, Any]):
+        """ Record the extraction settings (as argued to prepare_extraction:
+        feature_set, only_marks, required_marks, global_parameters and
+        engine) shared by all workers. Must be json serializable.
+        """
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO settings VALUES (?, ?)",
+            [(name, json.dumps(value)) for name, value in settings.items()]
+        )
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            name: json.loads(value) for name, value in
+            self.connection.execute("SELECT name, value FROM settings")
+        }
+
+    def submit(self, reconstructions: List[Dict[str, Any]]) -> int:
+        """ Add reconstructions (as argued to run_feature_extraction) to the
+        table. Reconstructions whose identifiers are already present are
+        ignored, so resubmitting a batch is harmless.
+
+        Returns
+        -------
+        The number of jobs added
+
+        """
+
+        rows = [
+            (
+                reconstruction_identifier(reconstruction),
+                json.dumps(reconstruction),
+                estimate_cost(reconstruction),
+                PENDING
+            )
+            for reconstruction in reconstructions
+        ]
+
+        before = len(self)
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO jobs "
+                "(identifier, spec, cost, status) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return len(self) - before
+
+    def _release_expired(self, now: float):
+        """ Release running jobs whose leases have expired. Must be called
+        within a transaction.
+        """
+
+        expired = self.connection.execute(
+            "SELECT identifier, attempts FROM jobs "
+            "WHERE status = ? AND heartbeat < ?",
+            (RUNNING, now - self.lease)
+        ).fetchall()
+
+        for identifier, attempts in expired:
+            logging.warning(f"lease expired for {identifier}; releasing")
+            self._release(identifier, attempts, "lease expired")
+
+    def _release(self, identifier: str, attempts: int, error: str):
+        status = FAILED if attempts >= self.max_attempts else PENDING
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, worker = NULL, heartbeat = NULL, "
+            "error = ? WHERE identifier = ?",
+            (status, error, identifier)
+        )
+
+    def claim(self, worker: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """ Claim the most expensive (see scheduling.estimate_cost) pending
+        job, first releasing any whose leases have expired.
+
+        Returns
+        -------
+        The claimed job's identifier and reconstruction specification, or
+            None if no jobs are pending.
+
+        """
+
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._release_expired(now)
+            row = self.connection.execute(
+                "SELECT identifier, spec FROM jobs WHERE status = ? "
+                "ORDER BY cost DESC LIMIT 1",
+                (PENDING,)
+            ).fetchone()
+
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, heartbeat = ?, "
+                    "attempts = attempts + 1 WHERE identifier = ?",
+                    (RUNNING, worker, now, row[0])
+                )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def heartbeat(self, identifier: str, worker: str) -> bool:
+        """ Renew a worker's lease on a job.
+
+        Returns
+        -------
+        False if the job is no longer held by this worker
+
+        """
+
+        cursor = self.connection.execute(
+            "UPDATE jobs SET heartbeat = ? "
+            "WHERE identifier = ? AND worker = ? AND status = ?",
+            (time.time(), identifier, worker, RUNNING)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, identifier: str, worker: str, run: Dict) -> bool:
+        """ Record a job's run (as returned by run_feature_extraction).
+
+        Returns
+        -------
+        False (and nothing is recorded) if the job is no longer held by this
+            worker, e.g. because its lease expired.
+
+        """
+
+        cursor = self.connection.execute(
+            "UPDATE jobs SET status = ?, heartbeat = ?, error = NULL, "
+            "run = ? WHERE identifier = ? AND worker = ? AND status = ?",
+            (
+                DONE, time.time(),
+                pickle.dumps(run, pickle.HIGHEST_PROTOCOL),
+                identifier, worker, RUNNING
+            )
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, identifier: str, worker: str, error: str):
+        """ Release a job which this worker could not complete. It will be
+        retried unless it has used up its attempts.
+        """
+
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(
+                "SELECT attempts FROM jobs "
+                "WHERE identifier = ? AND worker = ? AND status = ?",
+                (identifier, worker, RUNNING)
+            ).fetchone()
+            if row is not None:
+                self._release(identifier, row[0], error)
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def counts(self) -> Dict[str, int]:
+        """ The number of jobs with each status
+        """
+
+        counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED)}
+        counts.update(self.connection.execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return counts
+
+    def results(self) -> Iterator[Tuple[str, Dict]]:
+        """ Yield the identifier and run of each completed job
+        """
+
+        for identifier, run in self.connection.execute(
+            "SELECT identifier, run FROM jobs WHERE status = ? "
+            "ORDER BY identifier",
+            (DONE,)
+        ):
+            yield identifier, pickle.loads(run)
+
+    def failures(self) -> List[Dict[str, Any]]:
+        """ Describe the jobs which failed on every attempt
+        """
+
+        return [
+            {"identifier": identifier, "attempts": attempts, "error": error}
+            for identifier, attempts, error in self.connection.execute(
+                "SELECT identifier, attempts, error FROM jobs "
+                "WHERE status = ? ORDER BY identifier",
+                (FAILED,)
+            )
+        ]
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def _heartbeat(
+    path: str,
+    identifier: str,
+    worker: str,
+    interval: float,
+    stop: threading.Event
+):
+    """ Renew a lease every interval seconds until stopped. Uses its own
+    connection, since sqlite connections are not shared between threads.
+    """
+
+    with JobQueue(path) as queue:
+        while not stop.wait(interval):
+            if not queue.heartbeat(identifier, worker):
+                logging.warning(f"lost lease on {identifier}")
+                return
+
+
+def run_worker(
+    queue_path: str,
+    worker: Optional[str] = None,
+    heartbeat_interval: float = 30.0,
+    poll_interval: float = 5.0,
+    max_jobs: Optional[int] = None,
+    max_attempts: int = 3,
+    lease: float = 300.0
+) -> Dict[str, int]:
+    """ Claim and run jobs until none remain.
+
+    Parameters
+    ----------
+    queue_path : the job table
+    worker : identifies this worker. Defaults to a unique id built from the
+        host name and process id.
+    heartbeat_interval : renew this worker's lease on its current job this
+        often (s). Should be well below the lease.
+    poll_interval : when no jobs are pending, but others are still running
+        (and may be released), check again this often (s)
+    max_jobs : stop after running this many jobs
+    max_attempts, lease : see JobQueue
+
+    Returns
+    -------
+    The numbers of jobs completed and failed by this worker
+
+    """
+
+    worker = worker if worker is not None else default_worker_id()
+    stats = {"completed": 0, "failed": 0}
+
+    with JobQueue(queue_path, max_attempts, lease) as queue:
+        settings = queue.settings()
+        setup = prepare_extraction(
+            settings.get("feature_set", "aibs_default"),
+            settings.get("only_marks"),
+            settings.get("required_marks"),
+            settings.get("global_parameters") or {},
+            settings.get("engine", "reference")
+        )
+
+        while max_jobs is None or sum(stats.values()) < max_jobs:
+            job = queue.claim(worker)
+            if job is None:
+                if queue.counts()[RUNNING] == 0:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            identifier, spec = job
+            stop = threading.Event()
+            beat = threading.Thread(
+                target=_heartbeat,
+                args=(queue_path, identifier, worker, heartbeat_interval, stop),
+                daemon=True
+            )
+            beat.start()
+
+            try:
+                _, run = run_prepared_extraction(dict(spec), setup)
+            except Exception:
+                logging.warning(f"feature extraction failed for {identifier}")
+                queue.fail(identifier, worker, traceback.format_exc())
+                stats["failed"] += 1
+            else:
+                if queue.complete(identifier, worker, run):
+                    stats["completed"] += 1
+                else:
+                    logging.warning(
+                        f"discarding result for {identifier}; "
+                        "this worker no longer holds it"
+                    )
+            finally:
+                stop.set()
+                beat.join()
+
+    return stats
+
+
+def merge_results(queue: JobQueue, writer: FeatureWriter) -> Dict[str, Any]:
+    """ Write the runs of a queue's completed jobs.
+
+    Returns
+    -------
+    As returned by the writer's write method
+
+    """
+
+    for identifier, run in queue.results():
+        writer.add_run(identifier, run)
+    return writer.write()
+
+
+def main():
+    parser = ArgSchemaParser(schema_type=JobQueueParameters)
+    args = parser.args
+    logging.getLogger().setLevel(args["log_level"])
+
+    mode = args["mode"]
+    if mode == "submit" and not args.get("reconstructions"):
+        raise ValueError("submit mode requires reconstructions")
+    if mode == "merge" and args.get("heavy_output_path") is None:
+        raise ValueError("merge mode requires heavy_output_path")
+
+    queue_options = {
+        "max_attempts": args["max_attempts"], "lease": args["lease"]}
+    output: Dict[str, Any] = {"mode": mode}
+
+    if mode == "work":
+        output["worker"] = run_worker(
+            args["queue_path"],
+            worker=args.get("worker"),
+            heartbeat_interval=args["heartbeat_interval"],
+            poll_interval=args["poll_interval"],
+            max_jobs=args.get("max_jobs"),
+            **queue_options
+        )
+
+    with JobQueue(args["queue_path"], **queue_options) as queue:
+        if mode == "submit":
+            queue.configure({
+                name: args.get(name) for name in (
+                    "feature_set", "only_marks", "required_marks",
+                    "global_parameters", "engine"
+                )
+            })
+            output["submitted"] = queue.submit(args["reconstructions"])
+
+        elif mode == "merge":
+            if args.get("results_path") is not None:
+                writer: FeatureWriter = StreamingFeatureWriter(
+                    args["heavy_output_path"],
+                    args["results_path"],
+                    args.get("output_table_path"),
+                    formatters=DEFAULT_FEATURE_FORMATTERS
+                )
+            else:
+                writer = FeatureWriter(
+                    args["heavy_output_path"],
+                    args.get("output_table_path"),
+                    formatters=DEFAULT_FEATURE_FORMATTERS
+                )
+            output["results"] = merge_results(queue, writer)
+            output["failures"] = queue.failures()
+
+        output["counts"] = queue.counts()
+
+    if "output_json" in args:
+        parser.output(output, default=to_json_value)
+    else:
+        print(json.dumps(output["counts"]))
+
+
+if __name__ == "__main__":
+    main()
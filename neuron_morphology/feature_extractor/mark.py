@@ -1,4 +1,4 @@
-from typing import TypeVar, Type, Dict
+from typing import TypeVar, Type, Dict, Tuple
 import inspect
 
 import warnings
@@ -193,10 +193,49 @@ def check_nodes_have_key(data: Data, key: str) -> bool:
     """ Checks whether each node in a morphology is annotated with some key.
     """
 
-    has_key = True
-    for node in data.morphology.nodes():
-        has_key = has_key and key in node
-        if not has_key:
-            break
+    return data.morphology.nodes_have_key(key)
 
-    return has_key
+
+def validate_mark(mark: Type[Mark], data: Data) -> bool:
+    """ Validate a mark against some data. The result is memoized on the 
+    data, so that repeated runs on the same data validate each mark once.
+    """
+
+    validity = getattr(data, "_mark_validity", None)
+    if validity is None:
+        return mark.validate(data)
+
+    if mark not in validity:
+        validity[mark] = mark.validate(data)
+    return validity[mark]
+
+
+def determined_by_shape(mark: Type[Mark]) -> bool:
+    """ Whether a mark's validity depends only on the shape of the data (see
+    data_shape). This holds for the marks defined in this module (and marks
+    derived from them via factory). Marks which override validate elsewhere
+    are assumed not to.
+    """
+
+    for klass in mark.__mro__:
+        if "validate" in vars(klass):
+            return klass.__module__ == __name__
+    return False
+
+
+def data_shape(data: Data) -> Tuple:
+    """ Summarize the properties of some data which determine the validity 
+    of this module's marks: which attributes the data has and which node 
+    keys, node types and roots its morphology has. Data of the same shape 
+    select the same marks.
+    """
+
+    morphology = data.morphology
+    return (
+        frozenset(
+            name for name in vars(data) if not name.startswith("_")),
+        len(morphology) > 0,
+        morphology.get_node_keys(),
+        morphology.get_node_types(),
+        min(len(morphology.get_roots()), 2)
+    )
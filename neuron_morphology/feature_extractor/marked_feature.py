@@ -12,11 +12,12 @@ from neuron_morphology.feature_extractor.feature_specialization import (
 )
 
 FeatureFn = Callable[[Data], Any]
+BatchedFeatureFn = Callable[[Data, List[Dict[str, Any]]], List[Any]]
 M = TypeVar("M", bound="MarkedFeature")
 
 class MarkedFeature:
 
-    __slots__ = ["marks", "feature", "name"]
+    __slots__ = ["marks", "feature", "name", "products", "batched"]
 
     def __repr__(self):
         return (
@@ -38,6 +39,8 @@ class MarkedFeature:
         feature: 'Feature', 
         name: Optional[str] = None,
         preserve_marks: bool = True,
+        products: Optional[Sequence[Any]] = None,
+        batched: Optional[BatchedFeatureFn] = None,
     ):
         """ A feature-calculator with 0 or more marks.
 
@@ -49,15 +52,30 @@ class MarkedFeature:
             inferred
         preserve_marks : If True, any marks on the underlying feature will 
             be retained. Otherwise they will be discarded.
+        products : requests for intermediate products consumed by this 
+            feature (see neuron_morphology.feature_extractor.products). Any 
+            requests on the underlying feature are retained.
+        batched : an implementation which calculates several 
+            specializations of this feature at once (see batches). If not 
+            provided, any batched implementation of the underlying feature is 
+            retained.
 
         """
 
         self.marks: Set[Type[Mark]] = marks
         self.feature: Feature = feature
+        self.products: List[Any] = list(products or [])
 
         if preserve_marks and hasattr(feature, "marks"):
             self.marks |= set(feature.marks) # type: ignore[union-attr]
 
+        for request in getattr(feature, "products", []):
+            if request not in self.products:
+                self.products.append(request)
+
+        self.batched: Optional[BatchedFeatureFn] = (
+            batched or getattr(feature, "batched", None))
+
         if isinstance(self.feature, MarkedFeature):
             # prevent marked feature chains
             self.feature = self.feature.feature
@@ -90,6 +108,8 @@ class MarkedFeature:
             marks=cp.deepcopy(self.marks),
             feature=cp.deepcopy(self.feature),
             name=self.name,
+            products=self.products,
+            batched=self.batched,
         )
 
     def partial(self, *args, **kwargs):
@@ -236,3 +256,35 @@ def marked(mark: Type[Mark]):
     def _add_mark(feature):
         return MarkedFeature({mark}, feature)
     return _add_mark
+
+
+def batches(feature: MarkedFeature):
+    """ Decorator for registering a batched implementation of a feature. When 
+    several specializations of the feature are selected for a run, the 
+    extractor calls the batched implementation once rather than calling each 
+    specialization separately.
+
+    Parameters
+    ----------
+    feature : the (unspecialized) feature. Specializations made after 
+        registration share the batched implementation.
+
+    Notes
+    -----
+    The batched implementation is called as batched(data, variants), where 
+    variants is a list of dictionaries of keyword arguments (one per 
+    specialization). It must return a list of results, one per variant, 
+    matching those of feature(data, **variant).
+
+    Examples
+    --------
+    @batches(num_nodes)
+    def batched_num_nodes(data, variants):
+        ...
+
+    """
+
+    def _register(batched_feature):
+        feature.batched = batched_feature
+        return batched_feature
+    return _register
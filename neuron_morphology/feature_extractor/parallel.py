@@ -0,0 +1,165 @@
+""" Calculate the features of a single (large) reconstruction in parallel.
+Worker processes are forked after intermediate products have been computed,
+so that they share the morphology and its products (copy-on-write) rather
+than receiving copies.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import multiprocessing as mp
+import os
+
+from neuron_morphology.swc_io import count_swc_nodes
+from neuron_morphology.feature_extractor.data import get_morphology
+from neuron_morphology.feature_extractor.profiling import Timing, timed
+
+
+# reconstructions with fewer nodes than this are not worth forking for
+DEFAULT_MIN_PARALLEL_NODES = 100000
+
+
+# no swc line describing a node is shorter than this: 7 fields of at least 
+# one character, separated by single spaces (e.g. "2 2 1 0 0 1 1"). The line 
+# ending is not counted, since the last line need not have one.
+MIN_SWC_LINE_BYTES = 13
+
+
+# each forked worker inherits the run it is working on here
+_forked_run: Optional[Any] = None
+
+
+def can_fork() -> bool:
+    """ Determine whether this process can fork feature extraction workers.
+    Daemonic processes (such as multiprocessing.Pool workers) may not have
+    children, and some platforms do not support forking.
+    """
+
+    return (
+        "fork" in mp.get_all_start_methods()
+        and not mp.current_process().daemon
+    )
+
+
+def choose_num_processes(
+    data: Any,
+    max_processes: int,
+    min_nodes: int = DEFAULT_MIN_PARALLEL_NODES
+) -> int:
+    """ Decide how many processes should calculate features for a single
+    reconstruction.
+
+    Parameters
+    ----------
+    data : the reconstruction's data
+    max_processes : use no more than this many processes
+    min_nodes : reconstructions with fewer nodes are processed serially
+
+    Returns
+    -------
+    The number of processes to use. 1 means "calculate serially, in this
+        process".
+
+    """
+
+    if max_processes <= 1 or not can_fork():
+        return 1
+
+    try:
+        num_nodes = len(get_morphology(data))
+    except (AttributeError, TypeError):
+        return 1
+
+    return max_processes if num_nodes >= min_nodes else 1
+
+
+def is_large_swc(
+    swc_path: str, 
+    min_nodes: int = DEFAULT_MIN_PARALLEL_NODES
+) -> bool:
+    """ Determine whether an swc file describes at least min_nodes nodes. 
+    Files too small to contain that many nodes are not read. Files which 
+    can not be read are not large.
+    """
+
+    try:
+        if os.path.getsize(swc_path) < min_nodes * MIN_SWC_LINE_BYTES:
+            return False
+        return count_swc_nodes(swc_path) >= min_nodes
+    except OSError:
+        return False
+
+
+def _extract_group(indices: Sequence[int]) -> Tuple[Dict, Dict]:
+    """ Calculate a group of the forked run's selected features (which may
+    form a batchable family).
+    """
+
+    run = _forked_run
+    features = [run.selected_features[index] for index in indices]
+
+    results = run._extract_batched(features)
+    for feature in features:
+        if feature.name in results:
+            continue
+
+        try:
+            with timed(
+                run.timings["features"], feature.name, run.track_memory
+            ):
+                results[feature.name] = feature(run.data)
+        except:
+            logging.warning(f"feature extraction failed for {feature.name}")
+            raise
+
+    timings = {
+        feature.name: run.timings["features"][feature.name]
+        for feature in features
+    }
+    return results, timings
+
+
+def extract_in_parallel(
+    run: Any,
+    groups: List[List[int]],
+    num_processes: int
+) -> Tuple[Dict[str, Any], Dict[str, Timing]]:
+    """ Calculate groups of a run's selected features using a pool of
+    forked processes.
+
+    Parameters
+    ----------
+    run : a FeatureExtractionRun. Its data's intermediate products should
+        already have been computed.
+    groups : each is a list of indices into the run's selected features.
+        Each group is calculated by a single worker.
+    num_processes : the size of the pool
+
+    Returns
+    -------
+    results : maps feature names to results
+    timings : maps feature names to the resources used in calculating them
+
+    """
+
+    global _forked_run
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, Timing] = {}
+
+    # larger groups first, so that they do not hold up the end of the run
+    groups = sorted(groups, key=len, reverse=True)
+
+    _forked_run = run
+    try:
+        with mp.get_context("fork").Pool(
+            min(num_processes, len(groups))
+        ) as pool:
+            for group_results, group_timings in pool.imap_unordered(
+                _extract_group, groups
+            ):
+                results.update(group_results)
+                timings.update(group_timings)
+    finally:
+        _forked_run = None
+
+    return results, timings
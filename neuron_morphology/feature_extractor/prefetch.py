@@ -0,0 +1,197 @@
+""" Read swc files ahead of feature extraction, so that I/O latency (e.g. on
+a network filesystem) overlaps with computation rather than adding to it.
+"""
+
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+
+from neuron_morphology.feature_extractor.profiling import Timing
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    read_swc_data)
+from neuron_morphology.feature_extractor.scheduling import (
+    reconstruction_identifier)
+
+
+# by default, read at most this many reconstructions ahead
+DEFAULT_PREFETCH_DEPTH = 8
+
+# by default, hold at most this many bytes of prefetched swc data
+DEFAULT_MAX_PREFETCH_BYTES = 256 * 1024 ** 2
+
+
+class PrefetchStats:
+
+    def __init__(self):
+        """ Records the reads made by prefetch_swc_data. Shared across
+        threads.
+        """
+
+        self.num_read = 0
+        self.num_failed = 0
+        self.bytes_read = 0
+
+        # total wall time spent reading files (across reader threads)
+        self.read_time = 0.0
+
+        # time spent waiting for reads which had not finished when their
+        # reconstruction was needed
+        self.wait_time = 0.0
+
+        self.max_bytes_in_flight = 0
+
+        # the resources used to read each reconstruction, by identifier.
+        # Popped by batch.iter_extract as the reconstructions complete.
+        self.timings: Dict[str, Timing] = {}
+
+        self._lock = threading.Lock()
+
+    def record_read(self, identifier: str, num_bytes: int, timing: Timing):
+        with self._lock:
+            self.num_read += 1
+            self.bytes_read += num_bytes
+            self.read_time += timing.wall
+            self.timings[identifier] = timing
+
+    def summary(self) -> Dict[str, Any]:
+        """ A json-serializable description of these reads
+        """
+
+        return {
+            "num_read": self.num_read,
+            "num_failed": self.num_failed,
+            "bytes_read": self.bytes_read,
+            "read_time": self.read_time,
+            "wait_time": self.wait_time,
+            "max_bytes_in_flight": self.max_bytes_in_flight
+        }
+
+
+def _read(
+    reconstruction: Dict[str, Any],
+    identifier: str,
+    stats: PrefetchStats
+) -> Dict[str, Any]:
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+
+    loaded = read_swc_data(reconstruction)
+
+    timing = Timing(
+        time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+    stats.record_read(identifier, len(loaded["swc_data"]), timing)
+    return loaded
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def prefetch_swc_data(
+    reconstructions: Iterable[Dict[str, Any]],
+    depth: int = DEFAULT_PREFETCH_DEPTH,
+    max_bytes: int = DEFAULT_MAX_PREFETCH_BYTES,
+    stats: Optional[PrefetchStats] = None
+) -> Iterator[Dict[str, Any]]:
+    """ Read reconstructions' swc files on a pool of threads, ahead of their
+    use.
+
+    Parameters
+    ----------
+    reconstructions : each specifies a reconstruction by its swc_path
+    depth : read at most this many reconstructions ahead of the one most
+        recently yielded. Each outstanding read has its own thread.
+    max_bytes : do not start a read if it would bring the size of the files
+        read (or being read), but not yet yielded, above this. A single file
+        larger than this is still read, on its own.
+    stats : if provided, record reads here
+
+    Yields
+    ------
+    The reconstructions, in their original order, with their files'
+        contents under swc_data (see read_swc_data). A reconstruction whose
+        file can not be read is yielded unchanged, so that the error is
+        raised (and handled) where it is parsed.
+
+    """
+
+    if depth < 1:
+        raise ValueError("prefetch depth must be at least 1")
+    if stats is None:
+        stats = PrefetchStats()
+
+    pending = iter(reconstructions)
+    upcoming: Optional[Tuple[Dict[str, Any], int]] = None
+    in_flight: Deque[Tuple[Dict[str, Any], int, Future]] = deque()
+    bytes_in_flight = 0
+
+    with ThreadPoolExecutor(
+        depth, thread_name_prefix="swc-prefetch"
+    ) as executor:
+
+        def submit() -> bool:
+            nonlocal upcoming, bytes_in_flight
+
+            if upcoming is None:
+                reconstruction = next(pending, None)
+                if reconstruction is None:
+                    return False
+                upcoming = (
+                    reconstruction, _file_size(reconstruction["swc_path"]))
+
+            reconstruction, size = upcoming
+            if in_flight and bytes_in_flight + size > max_bytes:
+                return False
+
+            in_flight.append((
+                reconstruction,
+                size,
+                executor.submit(
+                    _read,
+                    reconstruction,
+                    reconstruction_identifier(reconstruction),
+                    stats
+                )
+            ))
+            upcoming = None
+            bytes_in_flight += size
+            stats.max_bytes_in_flight = max(
+                stats.max_bytes_in_flight, bytes_in_flight)
+            return True
+
+        while len(in_flight) < depth and submit():
+            pass
+
+        try:
+            while in_flight:
+                reconstruction, size, future = in_flight.popleft()
+
+                start = time.perf_counter()
+                try:
+                    loaded = future.result()
+                except OSError as err:
+                    logging.warning(
+                        f"unable to prefetch {reconstruction['swc_path']}: "
+                        f"{err}"
+                    )
+                    stats.num_failed += 1
+                    loaded = reconstruction
+                stats.wait_time += time.perf_counter() - start
+
+                bytes_in_flight -= size
+                while len(in_flight) < depth and submit():
+                    pass
+
+                yield loaded
+
+        finally:
+            # if closed early, do not start the remaining reads
+            for _, _, future in in_flight:
+                future.cancel()
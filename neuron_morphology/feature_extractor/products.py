@@ -0,0 +1,333 @@
+""" Intermediate products are calculations (such as coordinate lists or
+compartment lengths) which several features consume. Features declare the
+products they consume using the consumes decorator. A FeaturePlan collects
+these declarations into a dependency graph, so that each distinct product is
+computed exactly once per feature extraction run.
+"""
+
+from typing import (
+    Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+)
+import inspect
+import logging
+
+from neuron_morphology.feature_extractor.data import (
+    MorphologyLike, get_morphology, cached, memoize, cache_key)
+from neuron_morphology.feature_extractor.marked_feature import (
+    MarkedFeature, Feature)
+
+
+def _signature_parameters(fn: Callable) -> List[inspect.Parameter]:
+    """ List the parameters of a product calculation, skipping the first
+    (morphology) argument. Marked features are unwrapped.
+    """
+
+    fn = getattr(fn, "feature", fn)
+    return list(inspect.signature(fn).parameters.values())[1:]
+
+
+class Product:
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable,
+        requires: Optional[Mapping[str, "Product"]] = None
+    ):
+        """ A named intermediate calculation, which may be shared between
+        features.
+
+        Parameters
+        ----------
+        name : used to identify this product when reporting
+        fn : carries out the calculation. Its first argument is a morphology.
+            It is also passed the results of any required products (by
+            keyword) and the values of its own keyword parameters.
+        requires : maps argument names of fn to products whose results
+            should be supplied as those arguments.
+
+        Notes
+        -----
+        Calling a product without requirements is equivalent to calling
+        cached(data, fn, **kwargs), so features which use cached directly
+        share results with those which use the product.
+
+        """
+
+        self.name = name
+        self.fn = fn
+        self.requires: Dict[str, Product] = dict(requires or {})
+
+        self.defaults: Dict[str, Any] = {}
+        self.own_parameters: List[str] = []
+
+        for parameter in _signature_parameters(fn):
+            if parameter.name in self.requires:
+                continue
+            self.own_parameters.append(parameter.name)
+            self.defaults[parameter.name] = parameter.default
+
+        self.parameters: List[str] = list(self.own_parameters)
+        for product in self.requires.values():
+            for name in product.parameters:
+                if name not in self.parameters:
+                    self.parameters.append(name)
+                    self.defaults[name] = product.defaults[name]
+
+    def __repr__(self):
+        return f"Product({self.name})"
+
+    def bind(self, **kwargs) -> Dict[str, Any]:
+        """ Fill in defaults for any of this product's parameters not found in
+        kwargs.
+        """
+
+        unknown = set(kwargs) - set(self.parameters)
+        if unknown:
+            raise TypeError(
+                f"product {self.name} does not accept: {sorted(unknown)}")
+
+        bound = {}
+        for name in self.parameters:
+            value = kwargs.get(name, self.defaults[name])
+            if value is inspect.Parameter.empty:
+                raise TypeError(
+                    f"product {self.name} is missing parameter: {name}")
+            bound[name] = value
+        return bound
+
+    def __call__(self, data: MorphologyLike, **kwargs) -> Any:
+        """ Obtain this product for some data, computing it (and its
+        requirements) if it is not already cached.
+
+        Parameters
+        ----------
+        data : supplies the morphology (and possibly the computation cache)
+        **kwargs : values for this product's parameters. Parameters which are
+            not provided take their default values.
+
+        Returns
+        -------
+        The product. Treat this as read-only, as it may be shared.
+
+        """
+
+        kwargs = self.bind(**kwargs)
+
+        if not self.requires:
+            return cached(data, self.fn, **kwargs)
+
+        def compute():
+            arguments = {
+                argument: product(data, **{
+                    name: kwargs[name] for name in product.parameters
+                })
+                for argument, product in self.requires.items()
+            }
+            arguments.update({
+                name: kwargs[name] for name in self.own_parameters
+            })
+            return self.fn(get_morphology(data), **arguments)
+
+        return memoize(data, self.fn, kwargs, compute)
+
+
+class FeatureArgument(NamedTuple):
+    """ Indicates that a product parameter takes the value of a (differently
+    named) argument of the consuming feature.
+    """
+    name: str
+
+
+def argument(name: str) -> FeatureArgument:
+    """ Bind a product parameter to the consuming feature's argument called
+    name. See consumes.
+    """
+    return FeatureArgument(name)
+
+
+class ProductRequest(NamedTuple):
+    """ A feature's declaration that it consumes a product.
+    """
+    product: Product
+    bindings: Dict[str, Any]
+
+
+def consumes(product: Product, **bindings):
+    """ Decorator declaring that a feature consumes an intermediate product.
+
+    Parameters
+    ----------
+    product : the consumed product
+    **bindings : values for the product's parameters. A value may be a
+        literal, or argument("name") to use the value of the feature's
+        argument called name. Unbound product parameters take the value of
+        the feature argument with the same name, if there is one, and
+        otherwise the product's default.
+
+    Examples
+    --------
+    @marked(Geometric)
+    @consumes(coordinates, coordinate_type=argument("coord_type"))
+    def some_coordinate_feature(data, node_types=None, coord_type=...):
+        ...
+
+    """
+
+    request = ProductRequest(product, bindings)
+
+    def _add_request(feature):
+        feature = MarkedFeature.ensure(feature)
+        feature.products.append(request)
+        return feature
+    return _add_request
+
+
+def resolve_request(
+    feature: MarkedFeature,
+    request: ProductRequest
+) -> Optional[Dict[str, Any]]:
+    """ Determine the parameters with which a (possibly specialized) feature
+    will request a product.
+
+    Returns
+    -------
+    The product's keyword arguments, or None if they cannot be determined
+        ahead of time (e.g. because they depend on a feature argument with
+        no default or bound value).
+
+    """
+
+    feature_parameters = inspect.signature(feature.feature).parameters
+    product = request.product
+
+    def feature_value(name):
+        if name not in feature_parameters:
+            raise KeyError(name)
+        return feature_parameters[name].default
+
+    kwargs = {}
+    for name in product.parameters:
+        if name in request.bindings:
+            value = request.bindings[name]
+            if isinstance(value, FeatureArgument):
+                value = feature_value(value.name)
+        elif name in feature_parameters:
+            value = feature_value(name)
+        else:
+            value = product.defaults[name]
+
+        if value is inspect.Parameter.empty:
+            return None
+        kwargs[name] = value
+
+    return kwargs
+
+
+class PlannedProduct(NamedTuple):
+    """ A single step of a FeaturePlan
+    """
+    product: Product
+    kwargs: Dict[str, Any]
+    consumers: List[str]
+
+
+class FeaturePlan:
+
+    def __init__(self, features: Sequence[Feature]):
+        """ Orders the computation of the intermediate products consumed by a
+        collection of features. Each distinct (product, parameters) pair
+        appears once, after any products it requires.
+
+        Parameters
+        ----------
+        features : the features whose products will be planned
+
+        """
+
+        self.steps: List[PlannedProduct] = []
+        self.num_requests: int = 0
+        self.unresolved: List[Tuple[str, str]] = []
+
+        self._steps_by_key: Dict[Tuple, PlannedProduct] = {}
+
+        for feature in features:
+            feature = MarkedFeature.ensure(feature)
+
+            for request in feature.products:
+                self.num_requests += 1
+                kwargs = resolve_request(feature, request)
+
+                if kwargs is None:
+                    self.unresolved.append(
+                        (feature.name, request.product.name))
+                else:
+                    self._add(request.product, kwargs, feature.name)
+
+    def _add(self, product: Product, kwargs: Dict[str, Any], consumer: str):
+        """ Add a product (and, first, its requirements) to this plan
+        """
+
+        kwargs = product.bind(**kwargs)
+        key = cache_key(product.fn, kwargs)
+
+        if key not in self._steps_by_key:
+            for required in product.requires.values():
+                self._add(
+                    required,
+                    {name: kwargs[name] for name in required.parameters},
+                    product.name
+                )
+
+            step = PlannedProduct(product, kwargs, [])
+            self._steps_by_key[key] = step
+            self.steps.append(step)
+
+        consumers = self._steps_by_key[key].consumers
+        if consumer not in consumers:
+            consumers.append(consumer)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def execute(self, data: MorphologyLike):
+        """ Compute each planned product, in order. This is only useful
+        within an active computation cache (see Data.computation_cache).
+
+        Products which fail are skipped; consuming features will encounter
+        (and report) the error when they run.
+        """
+
+        for step in self.steps:
+            try:
+                step.product(data, **step.kwargs)
+            except Exception:
+                logging.debug(
+                    f"failed to precompute product: {step.product.name}",
+                    exc_info=True
+                )
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """ Report this plan's steps, in execution order
+        """
+
+        return [
+            {
+                "product": step.product.name,
+                "kwargs": dict(step.kwargs),
+                "consumers": list(step.consumers)
+            }
+            for step in self.steps
+        ]
+
+    def __repr__(self):
+        lines = [
+            f"FeaturePlan: {len(self.steps)} products "
+            f"for {self.num_requests} requests"
+        ]
+        for ii, step in enumerate(self.describe()):
+            lines.append(
+                f"{ii}: {step['product']}({step['kwargs']}) "
+                f"<- {step['consumers']}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,205 @@
+""" Utilities for recording how long (and how much memory) feature
+extraction takes, and for summarizing these records across reconstructions.
+"""
+
+from typing import (
+    Dict, Any, NamedTuple, Optional, Iterator, Iterable, Mapping, List, 
+    Tuple)
+from contextlib import contextmanager
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+
+class Timing(NamedTuple):
+    """ Resources used by a single step of feature extraction
+    """
+
+    # elapsed time, in seconds
+    wall: float
+
+    # processor time used by this process, in seconds
+    cpu: float
+
+    # peak memory (bytes) allocated above the level at the step's start.
+    # None if memory was not tracked
+    peak_memory: Optional[int] = None
+
+
+# tracemalloc.reset_peak was added in python 3.9. Where it is unavailable, 
+# it is emulated by clearing traces (see _reset_peak).
+_HAS_RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+
+class _MemoryState(threading.local):
+
+    def __init__(self):
+        # memory traced before the most recent clear_traces (when emulating 
+        # reset_peak), so that traced levels remain comparable across clears
+        self.cleared = 0
+
+        # for each enclosing timed block which is tracking memory, the 
+        # largest peak observed before a nested block reset the peak
+        self.enclosing_peaks: List[int] = []
+
+
+_memory_state = _MemoryState()
+
+
+def _traced_memory() -> Tuple[int, int]:
+    """ The current and peak traced memory (bytes), accounting for any 
+    clears made by _reset_peak
+    """
+
+    current, peak = tracemalloc.get_traced_memory()
+    return current + _memory_state.cleared, peak + _memory_state.cleared
+
+
+def _reset_peak():
+    """ Reset the traced peak to the current traced memory. Without 
+    tracemalloc.reset_peak, traces are cleared instead. In that case, memory 
+    allocated before the clear and freed afterwards is not subtracted, so 
+    subsequent peaks may be overestimated.
+    """
+
+    if _HAS_RESET_PEAK:
+        tracemalloc.reset_peak()
+    else:
+        _memory_state.cleared += tracemalloc.get_traced_memory()[0]
+        tracemalloc.clear_traces()
+
+
+@contextmanager
+def timed(
+    record: Dict[str, Timing],
+    key: str,
+    track_memory: bool = False
+) -> Iterator[None]:
+    """ Record the resources used within this context.
+
+    Parameters
+    ----------
+    record : the timing will be stored here, under key. It is recorded even
+        if the context exits with an exception.
+    key : identifies the step being timed
+    track_memory : if True, also record peak allocated memory. This requires
+        tracemalloc to be tracing (see tracking_memory); if it is not,
+        memory is not recorded. Timed blocks may be nested: the enclosing 
+        block's peak includes that of the nested block.
+
+    """
+
+    track_memory = track_memory and tracemalloc.is_tracing()
+    if track_memory:
+        # resetting the peak would lose the enclosing blocks' peaks so far
+        enclosing = _memory_state.enclosing_peaks
+        peak = _traced_memory()[1]
+        enclosing[:] = [max(previous, peak) for previous in enclosing]
+
+        _reset_peak()
+        start_memory = _traced_memory()[0]
+        enclosing.append(0)
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+
+        peak_memory = None
+        if track_memory:
+            peak = max(
+                _memory_state.enclosing_peaks.pop(), _traced_memory()[1])
+            peak_memory = max(0, peak - start_memory)
+
+        record[key] = Timing(wall, cpu, peak_memory)
+
+
+@contextmanager
+def tracking_memory(enabled: bool = True) -> Iterator[None]:
+    """ Trace memory allocations (see tracemalloc) within this context. If
+    tracing is already active, it is left running on exit.
+    """
+
+    started = enabled and not tracemalloc.is_tracing()
+    if started:
+        _memory_state.cleared = 0
+        tracemalloc.start()
+
+    try:
+        yield
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def serialize_timings(
+    timings: Mapping[str, Timing]
+) -> Dict[str, Dict[str, Any]]:
+    """ Convert a record of timings into json-serializable dictionaries,
+    omitting untracked memory.
+    """
+
+    serialized = {}
+    for key, timing in timings.items():
+        serialized[key] = {
+            name: value for name, value in timing._asdict().items()
+            if value is not None
+        }
+    return serialized
+
+
+def summarize_timings(
+    runs: Iterable[Mapping[str, Any]],
+    category: str = "features",
+    percentiles: Iterable[float] = (50, 95)
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """ Summarize the distribution of per-step timings across many feature
+    extraction runs.
+
+    Parameters
+    ----------
+    runs : serialized feature extraction runs (see
+        FeatureExtractionRun.serialize). Runs without timings are ignored.
+    category : which timings to summarize ("features" or "marks")
+    percentiles : report each of these percentiles, along with the maximum
+
+    Returns
+    -------
+    A dictionary mapping step names to measures (wall, cpu, peak_memory) to
+        statistics (e.g. "p50", "p95", "max", as well as "count", the number
+        of runs in which that measure was recorded).
+
+    Examples
+    --------
+    >>> summarize_timings(runs)["axon.num_nodes"]["wall"]["p95"]
+
+    """
+
+    percentiles = list(percentiles)
+    collected: Dict[str, Dict[str, List[float]]] = {}
+
+    for run in runs:
+        for key, timing in run.get("timings", {}).get(category, {}).items():
+            by_measure = collected.setdefault(key, {})
+            for measure, value in timing.items():
+                by_measure.setdefault(measure, []).append(value)
+
+    summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for key, by_measure in collected.items():
+        summary[key] = {}
+        for measure, values in by_measure.items():
+            stats = {
+                f"p{percentile:g}": float(np.percentile(values, percentile))
+                for percentile in percentiles
+            }
+            stats["max"] = float(np.max(values))
+            stats["count"] = len(values)
+            summary[key][measure] = stats
+
+    return summary
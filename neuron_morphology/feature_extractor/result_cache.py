@@ -0,0 +1,456 @@
+""" A persistent, size-limited cache of feature results, so that re-extracting
+features from a reconstruction only calculates features which are new or
+whose inputs have changed.
+"""
+
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+from functools import partial
+from types import BuiltinFunctionType, CodeType, FunctionType
+from enum import Enum
+import hashlib
+import logging
+import pickle
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+import neuron_morphology
+from neuron_morphology.feature_extractor.data import Data, get_morphology
+from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
+from neuron_morphology.feature_extractor.checkpoint import hash_parameters
+from neuron_morphology.morphology_hash import morphology_hash
+
+
+DEFAULT_MAX_BYTES = 2 ** 30
+
+
+def _update(hasher, tag: bytes, *parts: bytes):
+    hasher.update(tag)
+    for part in parts:
+        hasher.update(len(part).to_bytes(8, "little"))
+        hasher.update(part)
+
+
+def _encode_code(code: CodeType, hasher):
+    _update(hasher, b"code", code.co_code, repr(code.co_names).encode())
+    for constant in code.co_consts:
+        if isinstance(constant, CodeType):
+            _encode_code(constant, hasher)
+        else:
+            _encode(constant, hasher)
+
+
+def _encode(value: Any, hasher):
+    """ Feed a canonical encoding of a value to a hasher. The encoding does 
+    not depend on the process (e.g. on PYTHONHASHSEED or on memory 
+    addresses), so that equal values always produce equal digests.
+    
+    Raises
+    ------
+    TypeError : if the value (or something it contains) is of a type which 
+        can not be encoded
+
+    """
+
+    if value is None or isinstance(value, (bool, int, float, complex)):
+        _update(hasher, type(value).__name__.encode(), repr(value).encode())
+    elif isinstance(value, str):
+        _update(hasher, b"str", value.encode())
+    elif isinstance(value, (bytes, bytearray)):
+        _update(hasher, b"bytes", bytes(value))
+    elif isinstance(value, Enum):
+        _update(hasher, b"enum", _qualified_name(type(value)).encode(), 
+            value.name.encode())
+    elif isinstance(value, type):
+        _update(hasher, b"type", _qualified_name(value).encode())
+    elif isinstance(value, np.ndarray):
+        _update(
+            hasher, b"ndarray", value.dtype.str.encode(), 
+            repr(value.shape).encode()
+        )
+        if value.dtype.hasobject:
+            for item in value.ravel():
+                _encode(item, hasher)
+        else:
+            hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, np.generic):
+        _encode(value.item(), hasher)
+    elif isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        _update(hasher, _qualified_name(type(value)).encode())
+        if isinstance(value, pd.DataFrame):
+            _encode(list(value.columns), hasher)
+            _encode([str(dtype) for dtype in value.dtypes], hasher)
+        else:
+            _encode(value.name, hasher)
+            _encode(str(value.dtype), hasher)
+        hasher.update(
+            pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, (list, tuple)):
+        _update(
+            hasher, b"sequence", _qualified_name(type(value)).encode(), 
+            str(len(value)).encode()
+        )
+        for item in value:
+            _encode(item, hasher)
+    elif isinstance(value, (set, frozenset)):
+        _update(hasher, b"set", str(len(value)).encode())
+        for digest in sorted(_digest(item) for item in value):
+            hasher.update(digest)
+    elif isinstance(value, Mapping):
+        _update(hasher, b"mapping", str(len(value)).encode())
+        for digest in sorted(
+            _digest(key) + _digest(item) for key, item in value.items()
+        ):
+            hasher.update(digest)
+    elif isinstance(value, partial):
+        _update(hasher, b"partial")
+        _encode((value.func, value.args, value.keywords), hasher)
+    elif isinstance(value, FunctionType):
+        _update(hasher, b"function", _qualified_name(value).encode())
+        _encode_code(value.__code__, hasher)
+        _encode((value.__defaults__, value.__kwdefaults__), hasher)
+    elif isinstance(value, BuiltinFunctionType):
+        _update(hasher, b"builtin", _qualified_name(value).encode())
+    elif hasattr(value, "__dict__") and not callable(value):
+        _update(hasher, b"object", _qualified_name(type(value)).encode())
+        _encode(vars(value), hasher)
+    else:
+        raise TypeError(f"can not encode {type(value).__name__}")
+
+
+def _qualified_name(value: Any) -> str:
+    return (
+        f"{getattr(value, '__module__', '')}."
+        f"{getattr(value, '__qualname__', '')}"
+    )
+
+
+def _digest(value: Any) -> bytes:
+    hasher = hashlib.sha256()
+    _encode(value, hasher)
+    return hasher.digest()
+
+
+def hash_value(value: Any) -> str:
+    """ Calculate a stable digest of a value. Unlike a digest of the value's 
+    pickle, this does not vary between processes (e.g. with the iteration 
+    order of sets). Functions are identified by their qualified name and 
+    their code, so that editing a function changes its digest (though 
+    editing the functions it calls does not).
+
+    Raises
+    ------
+    TypeError : if the value can not be hashed
+
+    """
+
+    return _digest(value).hex()
+
+
+class SharedParameters(NamedTuple):
+    """ Parameters (e.g. hydrated global parameters) which are shared across 
+    many Datas, along with their digests. These are hashed once, rather than 
+    once per Data (see hash_data). 
+    """
+    values: Dict[str, Any]
+    digests: Dict[str, Optional[bytes]] # None if unhashable
+
+
+def share_parameters(parameters: Dict[str, Any]) -> SharedParameters:
+    """ Hash parameters which will be passed to many Datas.
+    """
+
+    digests: Dict[str, Optional[bytes]] = {}
+    for name, value in parameters.items():
+        try:
+            digests[name] = _digest(value)
+        except TypeError:
+            logging.debug(
+                f"unable to hash parameter {name}", exc_info=True)
+            digests[name] = None
+
+    return SharedParameters(dict(parameters), digests)
+
+
+def hash_data(
+    data: Data, 
+    shared: Optional[SharedParameters] = None
+) -> Optional[str]:
+    """ Identify the inputs to feature extraction: a morphology (see
+    morphology_hash) along with any other (public) things carried by a Data.
+
+    Parameters
+    ----------
+    data : to be hashed
+    shared : if provided, attributes of the data which are these very 
+        objects use their precalculated digests. The result is the same 
+        either way.
+
+    Returns
+    -------
+    A hex digest, or None if some of the data's contents can not be hashed
+        (in which case results for this data should not be cached).
+
+    """
+
+    hasher = hashlib.sha256()
+    hasher.update(morphology_hash(get_morphology(data)).encode())
+
+    if isinstance(data, Data):
+        for name in sorted(vars(data)):
+            # private attributes (e.g. memoized mark validity) are 
+            # bookkeeping, not inputs
+            if name == "morphology" or name.startswith("_"):
+                continue
+            value = getattr(data, name)
+
+            if shared is not None and shared.values.get(name) is value:
+                digest = shared.digests[name]
+            else:
+                try:
+                    digest = _digest(value)
+                except TypeError:
+                    logging.debug(
+                        f"unable to hash data attribute {name}", 
+                        exc_info=True
+                    )
+                    digest = None
+
+            if digest is None:
+                return None
+            _update(hasher, name.encode(), digest)
+
+    return hasher.hexdigest()
+
+
+def describe_feature(feature: MarkedFeature) -> Tuple[str, str]:
+    """ Identify a (possibly specialized) feature's calculation.
+
+    Returns
+    -------
+    name : the feature's name
+    A digest of the feature's implementation (qualified function name and 
+        code), bound arguments and this package's version.
+
+    """
+
+    fn = feature.feature
+    args: Tuple = ()
+    keywords: Dict[str, Any] = {}
+    if isinstance(fn, partial):
+        fn, args, keywords = fn.func, fn.args, fn.keywords
+
+    description = {
+        "function": (
+            f"{getattr(fn, '__module__', '')}."
+            f"{getattr(fn, '__qualname__', repr(fn))}"
+        ),
+        "args": args,
+        "kwargs": keywords,
+        "version": neuron_morphology.__version__
+    }
+
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        code = getattr(getattr(type(fn), "__call__", None), "__code__", None)
+
+    try:
+        if code is not None:
+            hasher = hashlib.sha256()
+            _encode_code(code, hasher)
+            description["code"] = hasher.hexdigest()
+        return feature.name, hash_value(description)
+    except TypeError:
+        # arguments which we can not encode canonically are identified by 
+        # their string representations
+        return feature.name, hash_parameters(description)
+
+
+class FeatureResultCache:
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """ Stores feature results (pickled) in a sqlite database, keyed by
+        reconstruction (see hash_data), feature name and a digest of the
+        feature's implementation and arguments (see describe_feature).
+
+        Parameters
+        ----------
+        path : of the sqlite database. Created if it does not exist. Several
+            processes may share a cache.
+        max_bytes : when the stored results exceed this size, the least
+            recently used are evicted.
+
+        """
+
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # parameters shared by the data whose results are cached here (see 
+        # share)
+        self.shared: Optional[SharedParameters] = None
+
+        # describing a feature hashes its code, so do this once per feature
+        self._descriptions: Dict[MarkedFeature, Tuple[str, str]] = {}
+
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "data_hash TEXT NOT NULL, "
+            "feature TEXT NOT NULL, "
+            "feature_hash TEXT NOT NULL, "
+            "value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL, "
+            "PRIMARY KEY (data_hash, feature, feature_hash))"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_used "
+            "ON results (last_used)"
+        )
+        self.connection.commit()
+
+    def share(self, parameters: Dict[str, Any]):
+        """ Hash parameters (e.g. hydrated global parameters) which will be 
+        passed to many of the datas whose results are cached here, so that 
+        they are not hashed again for each data.
+        """
+
+        self.shared = share_parameters(parameters)
+
+    def hash_data(self, data: Data) -> Optional[str]:
+        """ Identify a data (see hash_data), using this cache's shared 
+        parameters.
+        """
+
+        return hash_data(data, self.shared)
+
+    def describe(self, feature: MarkedFeature) -> Tuple[str, str]:
+        """ Identify a feature's calculation (see describe_feature)
+        """
+
+        if feature not in self._descriptions:
+            self._descriptions[feature] = describe_feature(feature)
+        return self._descriptions[feature]
+
+    def get(
+        self,
+        data_hash: str,
+        feature: MarkedFeature
+    ) -> Tuple[bool, Any]:
+        """ Look up a feature's result.
+
+        Returns
+        -------
+        found : whether a result was cached
+        The result (if found) or None
+
+        """
+
+        key = (data_hash,) + self.describe(feature)
+        row = self.connection.execute(
+            "SELECT value FROM results WHERE data_hash = ? AND feature = ? "
+            "AND feature_hash = ?",
+            key
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        self.connection.execute(
+            "UPDATE results SET last_used = ? WHERE data_hash = ? "
+            "AND feature = ? AND feature_hash = ?",
+            (time.time(),) + key
+        )
+        return True, pickle.loads(row[0])
+
+    def put(self, data_hash: str, feature: MarkedFeature, value: Any):
+        """ Store a feature's result. Results which can not be pickled are
+        not stored.
+        """
+
+        try:
+            encoded = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            logging.debug(
+                f"unable to cache result of {feature.name}", exc_info=True)
+            return
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (data_hash,) + self.describe(feature)
+            + (encoded, len(encoded), time.time())
+        )
+
+    def commit(self):
+        """ Persist pending changes, evicting the least recently used results
+        if the cache is over its size limit.
+        """
+
+        total = self.size()
+        if total > self.max_bytes:
+            rows = self.connection.execute(
+                "SELECT rowid, size FROM results ORDER BY last_used")
+
+            evict = []
+            for rowid, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evict.append((rowid,))
+                total -= size
+
+            self.connection.executemany(
+                "DELETE FROM results WHERE rowid = ?", evict)
+            self.evictions += len(evict)
+
+        self.connection.commit()
+
+    def size(self) -> int:
+        """ The total size (bytes) of the stored results
+        """
+
+        return self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def statistics(self) -> Dict[str, int]:
+        """ Report this cache's hits, misses and evictions (since it was
+        opened)
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+
+def summarize_cache_statistics(
+    runs: Iterable[Mapping[str, Any]]
+) -> Dict[str, int]:
+    """ Total the result cache hits and misses recorded in many serialized 
+    feature extraction runs (see FeatureExtractionRun.serialize). Runs which 
+    did not use a cache are ignored.
+    """
+
+    summary = {"hits": 0, "misses": 0}
+    for run in runs:
+        for key, value in run.get("result_cache", {}).items():
+            summary[key] = summary.get(key, 0) + value
+    return summary
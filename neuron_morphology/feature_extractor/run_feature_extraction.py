@@ -1,13 +1,24 @@
-from typing import Dict, Any, Tuple, List, Set, Optional, Type
+from typing import Dict, Any, Tuple, List, Set, Optional, Type, NamedTuple
 import inspect
+import cProfile
+import os
+import re
+import traceback
 
-from neuron_morphology.features.default_features import default_features
+import neuron_morphology.features.default_features as _default_features
+from neuron_morphology.features.fast import accelerate
 from neuron_morphology.feature_extractor.feature_extractor import \
     FeatureExtractor
 from neuron_morphology.feature_extractor.mark import Mark
 import neuron_morphology.feature_extractor.mark as _mark
 from neuron_morphology.swc_io import morphology_from_swc
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.profiling import (
+    Timing, timed, serialize_timings)
+from neuron_morphology.feature_extractor.result_cache import (
+    FeatureResultCache, DEFAULT_MAX_BYTES)
+from neuron_morphology.feature_extractor.parallel import (
+    DEFAULT_MIN_PARALLEL_NODES)
 from neuron_morphology.features.layer.reference_layer_depths import \
     ReferenceLayerDepths, WELL_KNOWN_REFERENCE_LAYER_DEPTHS
 from neuron_morphology.features.layer.layered_point_depths import \
@@ -31,11 +42,67 @@ for item_name in dir(_mark):
         well_known_marks[item_name] = item
 
 
-known_feature_sets = {
-    "aibs_default": default_features
+# values are lists of features, or callables which build them on first use
+known_feature_sets: Dict[str, Any] = {
+    "aibs_default": lambda: _default_features.default_features
 }
 
 
+# each engine converts a feature set into the features actually calculated
+known_engines = {
+    "reference": lambda features: features,
+    "fast": accelerate
+}
+_engine_feature_sets: Dict[Tuple[str, str], Any] = {
+    ("aibs_default", "fast"): lambda: _default_features.fast_default_features
+}
+
+
+def resolve_feature_set(feature_set: str, engine: str = "reference"):
+    """ Look up a named feature set, as implemented by a named engine.
+
+    Parameters
+    ----------
+    feature_set : the name of a known feature set
+    engine : "reference" calculates the features as defined. "fast" replaces 
+        features with array-backed equivalents (see 
+        neuron_morphology.features.fast) where these are available.
+
+    Returns
+    -------
+    The features to be registered on a FeatureExtractor
+
+    """
+
+    key = (feature_set, engine)
+    if key in _engine_feature_sets:
+        if callable(_engine_feature_sets[key]):
+            _engine_feature_sets[key] = _engine_feature_sets[key]()
+        return _engine_feature_sets[key]
+
+    try:
+        features = known_feature_sets[feature_set]
+        if callable(features):
+            features = known_feature_sets[feature_set] = features()
+    except KeyError:
+        print(
+            f"known feature sets: {list(known_feature_sets.keys())}\n"
+            f"you provided: {feature_set}"
+        )
+        raise
+
+    try:
+        convert = known_engines[engine]
+    except KeyError:
+        raise ValueError(
+            f"unknown engine: {engine} "
+            f"(known engines: {list(known_engines.keys())})"
+        )
+
+    _engine_feature_sets[key] = convert(features)
+    return _engine_feature_sets[key]
+
+
 def resolve_reference_layer_depths(key=None, names=None, boundaries=None):
     """ Given either the name of a well known depths set or a set of names and 
     corresponding boundaries, produce a ReferenceLayerDepths
@@ -90,16 +157,44 @@ def hydrate_parameters(parameters: Dict[str, Any]) -> Dict[str, Any]:
     return output
 
 
+def read_swc_data(reconstruction: Dict[str, Any]) -> Dict[str, Any]:
+    """ Read a reconstruction's swc file into memory, so that it can be
+    parsed without further I/O.
+
+    Parameters
+    ----------
+    reconstruction : specifies a reconstruction by its swc_path. Not
+        modified.
+
+    Returns
+    -------
+    A copy of the reconstruction, with the file's contents (as bytes) under 
+        swc_data. setup_data prefers these to the swc_path, which is retained 
+        (e.g. as a default identifier).
+
+    """
+
+    loaded = dict(reconstruction)
+    with open(loaded["swc_path"], "rb") as swc_file:
+        loaded["swc_data"] = swc_file.read()
+    return loaded
+
+
 def setup_data(
     reconstruction: Dict[str, Any], 
-    global_parameters: Dict[str, Any]
+    global_parameters: Dict[str, Any],
+    hydrated: bool = False
 ) -> Tuple[str, Data]:
     """ Construct a Data for extracting features from a single reconstruction.
 
     Parameters
     ----------
-    reconstruction : The reconstruction to be setup. Must specify an swc_path
+    reconstruction : The reconstruction to be setup. Must specify an 
+        swc_path or swc_data (the contents of an swc file, as bytes). If 
+        both are given, swc_data is used.
     global_parameters : any cross-reconstruction feature parameters
+    hydrated : if True, global_parameters have already been hydrated (see 
+        hydrate_parameters) and will be used as-is.
 
     Returns 
     -------
@@ -110,20 +205,158 @@ def setup_data(
 
     parameters: Dict[str, Any] = {}
     identifier = reconstruction.get("identifier", reconstruction.get("swc_path"))
-    swc_path = reconstruction.pop("swc_path")
-    morphology = morphology_from_swc(swc_path)
+    if "swc_data" in reconstruction:
+        reconstruction.pop("swc_path", None)
+        morphology = morphology_from_swc(reconstruction.pop("swc_data"))
+    else:
+        morphology = morphology_from_swc(reconstruction.pop("swc_path"))
 
-    parameters.update(hydrate_parameters(global_parameters))
+    if hydrated:
+        parameters.update(global_parameters)
+    else:
+        parameters.update(hydrate_parameters(global_parameters))
     parameters.update(hydrate_parameters(reconstruction))
 
     return identifier, Data(morphology, **parameters)
 
+
+def profile_path(profile_dir: str, identifier: str) -> str:
+    """ Determine where to write a reconstruction's cProfile statistics. 
+    Characters in the identifier which are unsafe in a file name are 
+    replaced.
+    """
+
+    safe_identifier = re.sub(r"[^\w.-]", "_", str(identifier))
+    return os.path.join(profile_dir, f"{safe_identifier}.prof")
+
+
+class ExtractionSetup(NamedTuple):
+    """ Everything needed to extract features from a reconstruction, other 
+    than the reconstruction itself. This is shared across reconstructions.
+    """
+    extractor: FeatureExtractor
+    only_marks: Optional[Set[Type[Mark]]]
+    required_marks: Set[Type[Mark]]
+    global_parameters: Dict[str, Any] # hydrated
+    track_memory: bool = False
+    profile_dir: Optional[str] = None
+    result_cache: Optional[FeatureResultCache] = None
+    num_processes: int = 1
+    min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES
+
+
+def prepare_extraction(
+    feature_set: str,
+    only_marks: Optional[List[str]], 
+    required_marks: Optional[List[str]],
+    global_parameter_spec: Dict[str, Any],
+    engine: str = "reference",
+    track_memory: bool = False,
+    profile_dir: Optional[str] = None,
+    result_cache_path: Optional[str] = None,
+    result_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    num_processes: int = 1,
+    min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES
+) -> ExtractionSetup:
+    """ Resolve the feature set and marks and hydrate the global parameters 
+    for a feature extraction run. Opens the result cache, if one is 
+    requested. See run_feature_extraction for a description of the 
+    parameters.
+    """
+
+    only_mark_set: Optional[Set[Type[Mark]]] = {
+        well_known_marks[name] for name in only_marks
+        } if only_marks is not None else None
+    required_mark_set: Set[Type[Mark]] = {
+        well_known_marks[name] for name in required_marks
+        } if required_marks is not None else set()
+
+    global_parameters = hydrate_parameters(global_parameter_spec)
+
+    result_cache: Optional[FeatureResultCache] = None
+    if result_cache_path is not None:
+        result_cache = FeatureResultCache(
+            result_cache_path, result_cache_max_bytes)
+        # these are passed to every reconstruction's data
+        result_cache.share(global_parameters)
+
+    return ExtractionSetup(
+        extractor=FeatureExtractor(resolve_feature_set(feature_set, engine)),
+        only_marks=only_mark_set,
+        required_marks=required_mark_set,
+        global_parameters=global_parameters,
+        track_memory=track_memory,
+        profile_dir=profile_dir,
+        result_cache=result_cache,
+        num_processes=num_processes,
+        min_parallel_nodes=min_parallel_nodes
+    )
+
+
+def run_prepared_extraction(
+    reconstruction_spec: Dict[str, Any],
+    setup: ExtractionSetup
+) -> Tuple[str, Dict]:
+    """ Run feature extraction for a single reconstruction, using a 
+    previously prepared setup (see prepare_extraction). Returns as 
+    run_feature_extraction.
+    """
+
+    # resources used to read, parse and extract features from this
+    # reconstruction
+    overall: Dict[str, Timing] = {}
+
+    # reconstructions prefetched by the caller (see prefetch_swc_data) are
+    # already in memory
+    if "swc_data" not in reconstruction_spec:
+        with timed(overall, "io"):
+            reconstruction_spec = read_swc_data(reconstruction_spec)
+
+    with timed(overall, "parse"):
+        identifier, data = setup_data(
+            dict(reconstruction_spec), setup.global_parameters, 
+            hydrated=True
+        )
+
+    profile_dir = setup.profile_dir
+    profiler = cProfile.Profile() if profile_dir is not None else None
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with timed(overall, "extract"):
+            run = setup.extractor.extract(
+                data,
+                only_marks=setup.only_marks,
+                required_marks=setup.required_marks,
+                track_memory=setup.track_memory,
+                result_cache=setup.result_cache,
+                num_processes=setup.num_processes,
+                min_parallel_nodes=setup.min_parallel_nodes
+            )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path(profile_dir, identifier))
+
+    serialized = run.serialize()
+    serialized["timings"]["reconstruction"] = serialize_timings(overall)
+    return identifier, serialized
+
+
 def run_feature_extraction(
     reconstruction_spec: Dict[str, Any], 
     feature_set: str,
     only_marks: List[str], 
     required_marks: List[str],
-    global_parameter_spec: Dict[str, Any]
+    global_parameter_spec: Dict[str, Any],
+    engine: str = "reference",
+    track_memory: bool = False,
+    profile_dir: Optional[str] = None,
+    result_cache_path: Optional[str] = None,
+    result_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    num_processes: int = 1,
+    min_parallel_nodes: int = DEFAULT_MIN_PARALLEL_NODES
 ) -> Tuple[str, Dict]:
     """ Run feature extraction for a single reconstruction.
 
@@ -137,6 +370,20 @@ def run_feature_extraction(
     required_marks : raise an exception if these named marks fail validation
     global_parameter_spec : a dictionary specifying cross-reconstruction 
         parameters
+    engine : which implementation of the feature set to use (see 
+        resolve_feature_set)
+    track_memory : if True, record the peak memory allocated by each feature
+    profile_dir : if provided, profile feature extraction (using cProfile) 
+        and write the statistics to a .prof file in this directory, named 
+        for the reconstruction's identifier
+    result_cache_path : if provided, look up results in (and add new results 
+        to) a persistent cache at this path (see FeatureResultCache). Only 
+        features which are not cached are calculated.
+    result_cache_max_bytes : evict the least recently used cached results 
+        when the cache exceeds this size
+    num_processes : if the reconstruction has at least min_parallel_nodes 
+        nodes, calculate its features using this many (forked) processes
+    min_parallel_nodes : see num_processes
 
     Returns
     -------
@@ -146,32 +393,77 @@ def run_feature_extraction(
         selected_marks - the set of marks that passed validation
         selected features - the set of features for which calculation was 
             attempted
+        timings - resources used by each feature and mark validation, as 
+            well as to read ("reconstruction" / "io"), parse 
+            ("reconstruction" / "parse") and extract features from 
+            ("reconstruction" / "extract") the reconstruction overall
+        result_cache - if a result cache was used, its hits and misses
+
+    Notes
+    -----
+    This prepares the extraction (see prepare_extraction) from scratch. When 
+    processing many reconstructions, prepare once and call 
+    run_prepared_extraction instead.
 
     """
 
-    try:
-        features = known_feature_sets[feature_set]
-    except KeyError:
-        print(
-            f"known feature sets: {list(known_feature_sets.keys())}\n"
-            f"you provided: {feature_set}"
-        )
-        raise
+    setup = prepare_extraction(
+        feature_set, 
+        only_marks, 
+        required_marks, 
+        global_parameter_spec, 
+        engine=engine,
+        track_memory=track_memory,
+        profile_dir=profile_dir,
+        result_cache_path=result_cache_path,
+        result_cache_max_bytes=result_cache_max_bytes,
+        num_processes=num_processes,
+        min_parallel_nodes=min_parallel_nodes
+    )
+    return run_prepared_extraction(reconstruction_spec, setup)
 
-    only_mark_set: Set[Type[Mark]] = {
-        well_known_marks[name] for name in only_marks
-        } if only_marks is not None else None
-    required_mark_set: Set[Type[Mark]] = {
-        well_known_marks[name] for name in required_marks
-        } if required_marks is not None else set()
 
-    identifier, data = setup_data(reconstruction_spec, global_parameter_spec)
+# each worker process in a feature extraction pool holds its setup here
+_worker_setup: Optional[ExtractionSetup] = None
 
-    extractor = FeatureExtractor(features)
-    run = extractor.extract(
-        data,
-        only_marks=only_mark_set,
-        required_marks=required_mark_set
-    )
 
-    return identifier, run.serialize()
\ No newline at end of file
+def initialize_worker(*args, **kwargs):
+    """ Initializer for feature extraction pool workers. Prepares a setup 
+    (see prepare_extraction, which accepts the same arguments) to be used 
+    for every reconstruction this worker processes.
+    """
+
+    global _worker_setup
+    _worker_setup = prepare_extraction(*args, **kwargs)
+
+
+def run_worker_extraction(
+    reconstruction_spec: Dict[str, Any]
+) -> Tuple[str, Dict]:
+    """ Run feature extraction for a single reconstruction within a pool 
+    worker set up by initialize_worker.
+    """
+
+    if _worker_setup is None:
+        raise RuntimeError("this worker has not been initialized")
+    return run_prepared_extraction(reconstruction_spec, _worker_setup)
+
+
+def try_worker_extraction(
+    reconstruction_spec: Dict[str, Any]
+) -> Tuple[bool, Any]:
+    """ As run_worker_extraction, but returns failures rather than raising 
+    them.
+
+    Returns
+    -------
+    succeeded : whether extraction completed
+    (identifier, run) as returned by run_worker_extraction if extraction 
+        succeeded. Otherwise a formatted traceback.
+
+    """
+
+    try:
+        return True, run_worker_extraction(reconstruction_spec)
+    except Exception:
+        return False, traceback.format_exc()
\ No newline at end of file
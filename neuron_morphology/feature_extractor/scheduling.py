@@ -0,0 +1,166 @@
+""" Order the reconstructions of a batch so that the most expensive start
+first (longest processing time first scheduling), and report how well the
+expected costs predicted the actual ones.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+import os
+
+import numpy as np
+
+
+known_schedules = ("largest_first", "input")
+
+
+def reconstruction_identifier(reconstruction: Mapping[str, Any]) -> str:
+    """ The label under which a reconstruction's outputs are written
+    """
+
+    return str(reconstruction.get("identifier", reconstruction["swc_path"]))
+
+
+def estimate_cost(reconstruction: Mapping[str, Any]) -> float:
+    """ Cheaply estimate the cost of extracting features from a
+    reconstruction. This is the size (bytes) of its swc file, which is
+    proportional to its number of nodes. A file which can not be read 
+    costs nothing; its extraction fails (and is recorded) when its turn 
+    comes.
+    """
+
+    try:
+        return float(os.path.getsize(reconstruction["swc_path"]))
+    except OSError:
+        return 0.0
+
+
+def order_reconstructions(
+    reconstructions: Sequence[Dict[str, Any]],
+    costs: Mapping[str, float],
+    schedule: str = "largest_first"
+) -> List[Dict[str, Any]]:
+    """ Order reconstructions for submission to a pool.
+
+    Parameters
+    ----------
+    reconstructions : to be ordered
+    costs : maps reconstruction identifiers to estimated costs
+    schedule : "largest_first" orders by decreasing estimated cost. "input"
+        leaves the order unchanged.
+
+    Returns
+    -------
+    the ordered reconstructions
+
+    """
+
+    if schedule == "input":
+        return list(reconstructions)
+    if schedule == "largest_first":
+        return sorted(
+            reconstructions,
+            key=lambda item: costs[reconstruction_identifier(item)],
+            reverse=True
+        )
+    raise ValueError(
+        f"unknown schedule: {schedule}. Options are: {known_schedules}")
+
+
+def actual_cost(run: Mapping[str, Any]) -> Optional[float]:
+    """ The wall time (seconds) spent loading a reconstruction and
+    extracting its features, as recorded by run_prepared_extraction. None if
+    this was not recorded.
+    """
+
+    timings = run.get("timings", {}).get("reconstruction")
+    if not timings:
+        return None
+    return sum(timing["wall"] for timing in timings.values())
+
+
+class ScheduleReport:
+
+    def __init__(self, schedule: str = "largest_first", num_slowest: int = 10):
+        """ Compares expected to actual costs across the reconstructions of
+        a batch.
+
+        Parameters
+        ----------
+        schedule : the ordering used (see order_reconstructions)
+        num_slowest : summarize this many of the slowest reconstructions
+            individually
+
+        """
+
+        self.schedule = schedule
+        self.num_slowest = num_slowest
+
+        self.expected: Dict[str, float] = {}
+        self.actual: Dict[str, float] = {}
+        self.makespan: Optional[float] = None
+
+    def expect(self, identifier: str, cost: float):
+        """ Record a reconstruction's estimated cost
+        """
+        self.expected[identifier] = cost
+
+    def record(self, identifier: str, run: Mapping[str, Any]):
+        """ Record a completed reconstruction's actual cost
+        """
+
+        cost = actual_cost(run)
+        if cost is not None:
+            self.actual[str(identifier)] = cost
+
+    def summary(self) -> Dict[str, Any]:
+        """ Summarize the batch's schedule.
+
+        Returns
+        -------
+        A dictionary with keys:
+            schedule - the ordering used
+            num_reconstructions - the number of (calculated) reconstructions
+            makespan - wall time (s) from the first submission to the last
+                completion
+            total_time - the sum of per-reconstruction wall times (s)
+            rank_correlation - Spearman correlation of expected and actual
+                costs. Near 1 if the estimates ordered reconstructions
+                correctly. None if there are fewer than 2 reconstructions.
+            slowest - the slowest reconstructions, with their expected
+                (bytes) and actual (s) costs
+
+        """
+
+        identifiers = [
+            identifier for identifier in self.actual
+            if identifier in self.expected
+        ]
+        expected = np.array([self.expected[key] for key in identifiers])
+        actual = np.array([self.actual[key] for key in identifiers])
+
+        rank_correlation = None
+        if len(identifiers) > 1:
+            ranks = [
+                np.argsort(np.argsort(values)) for values in (expected, actual)
+            ]
+            if np.std(ranks[0]) > 0 and np.std(ranks[1]) > 0:
+                rank_correlation = float(np.corrcoef(*ranks)[0, 1])
+
+        slowest = sorted(
+            identifiers, key=lambda key: self.actual[key], reverse=True
+        )[:self.num_slowest]
+
+        return {
+            "schedule": self.schedule,
+            "num_reconstructions": len(identifiers),
+            "makespan": self.makespan,
+            "total_time": float(actual.sum()),
+            "rank_correlation": rank_correlation,
+            "slowest": [
+                {
+                    "identifier": key,
+                    "expected_cost": self.expected[key],
+                    "actual_cost": self.actual[key]
+                }
+                for key in slowest
+            ]
+        }
@@ -0,0 +1,131 @@
+""" Compiled selections of features, shared by the runs of a batch which
+select the same marks.
+"""
+
+from typing import (
+    AbstractSet, Any, Collection, Dict, List, Optional, Sequence, Tuple, Type)
+from collections import defaultdict
+from functools import partial
+import logging
+
+from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
+from neuron_morphology.feature_extractor.products import FeaturePlan
+
+
+def select_features(
+    features: Collection[MarkedFeature],
+    selected_marks: AbstractSet[Type[Mark]],
+    only_marks: Optional[AbstractSet[Type[Mark]]] = None
+) -> List[MarkedFeature]:
+    """ Choose the features which are calculable given a set of selected
+    marks.
+
+    Parameters
+    ----------
+    features : candidates for selection
+    selected_marks : features marked with marks outside this set are
+        rejected
+    only_marks : if provided, reject features not marked with each mark in
+        this set
+
+    Returns
+    -------
+    The selected features, in their original order
+
+    """
+
+    if only_marks is None:
+        only_marks = set()
+
+    selected = []
+    for feature in features:
+        extra_marks = feature.marks - selected_marks
+        if extra_marks:
+            logging.info(
+                f"skipping feature: {feature.name}. "
+                f"Found extra marks: {[mark.__name__ for mark in extra_marks]}")
+        elif only_marks - feature.marks:
+            logging.info(f"skipping feature: {feature.name} (no marks from {only_marks})")
+        else:
+            selected.append(feature)
+
+    return selected
+
+
+def find_families(features: Sequence[MarkedFeature]) -> Dict[Any, List]:
+    """ Group features which could be calculated together by a batched
+    implementation (see marked_feature.batches).
+
+    Returns
+    -------
+    A dictionary mapping (base feature, batched implementation) to a list
+        of (feature, specialization kwargs) pairs.
+
+    """
+
+    families: Dict[Any, List] = defaultdict(list)
+    for feature in features:
+        if feature.batched is None:
+            continue
+
+        base = feature.feature
+        if isinstance(base, partial):
+            if base.args:
+                continue
+            families[(base.func, feature.batched)].append(
+                (feature, dict(base.keywords)))
+        else:
+            families[(base, feature.batched)].append((feature, {}))
+
+    return families
+
+
+class FeatureSelection:
+
+    def __init__(
+        self,
+        features: Collection[MarkedFeature],
+        selected_marks: AbstractSet[Type[Mark]],
+        only_marks: Optional[AbstractSet[Type[Mark]]] = None
+    ):
+        """ The features selected from a feature set for a combination of
+        marks, along with their batchable families and product plans. These
+        are computed once and reused by every run selecting the same marks
+        (see FeatureExtractor.select).
+
+        Parameters
+        ----------
+        features : candidates for selection
+        selected_marks : as in select_features
+        only_marks : as in select_features
+
+        """
+
+        self.features: List[MarkedFeature] = select_features(
+            features, selected_marks, only_marks)
+
+        self._families: Dict[Tuple[str, ...], Dict[Any, List]] = {}
+        self._plans: Dict[Tuple[str, ...], FeaturePlan] = {}
+
+    def __len__(self):
+        return len(self.features)
+
+    def families(self, features: Sequence[MarkedFeature]) -> Dict[Any, List]:
+        """ As find_families, memoized by the names of the features argued
+        """
+
+        key = tuple(feature.name for feature in features)
+        if key not in self._families:
+            self._families[key] = find_families(features)
+        return self._families[key]
+
+    def plan(self, features: Sequence[MarkedFeature]) -> FeaturePlan:
+        """ Plan the products of some of these features, memoized by their
+        names
+        """
+
+        key = tuple(feature.name for feature in features)
+        if key not in self._plans:
+            self._plans[key] = FeaturePlan(features)
+        return self._plans[key]
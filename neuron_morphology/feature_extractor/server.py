@@ -0,0 +1,446 @@
+""" A long-running local feature extraction service. Worker processes are
+started (and feature sets loaded) once, then reused across requests, so that
+each request pays only for its own feature calculations.
+
+Run with:
+
+    python -m neuron_morphology.feature_extractor.server --port 8321
+
+then POST to /extract either a json body:
+
+    {"reconstructions": [
+        {"swc_path": "/path/to/a.swc"},
+        {"swc": "<contents of an swc file>", "identifier": "b"}
+    ]}
+
+or the raw contents of a single swc file (with an optional ?identifier=
+query). Responses are json, with "results" (mapping identifiers to
+run_feature_extraction outputs) and "failures" (mapping identifiers to error
+messages). GET /health reports the service's status.
+
+The service does not authenticate its clients, who may name files for it to
+read. By default it only listens on the loopback interface. Use --path_root 
+to restrict the files which may be named; this is required in order to 
+listen on other interfaces.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import ipaddress
+import json
+import logging
+import math
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+from argschema import ArgSchemaParser
+
+from neuron_morphology.feature_extractor._schemas import ServerParameters
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    initialize_worker, try_worker_extraction)
+from neuron_morphology.feature_extractor.feature_writer import to_json_value
+
+
+def _extract_chunk(
+    reconstructions: List[Dict[str, Any]]
+) -> List[Tuple[bool, Any]]:
+    """ Extract features from several reconstructions within a worker (see 
+    try_worker_extraction)
+    """
+
+    return [
+        try_worker_extraction(reconstruction) 
+        for reconstruction in reconstructions
+    ]
+
+
+class ExtractionService:
+
+    def __init__(
+        self,
+        feature_set: str = "aibs_default",
+        only_marks: Optional[List[str]] = None,
+        required_marks: Optional[List[str]] = None,
+        global_parameters: Optional[Dict[str, Any]] = None,
+        engine: str = "reference",
+        num_processes: Optional[int] = None,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005
+    ):
+        """ Extracts features using a warm pool of worker processes.
+        Reconstructions submitted concurrently (e.g. by separate requests)
+        are gathered into batches, which are dispatched to the pool together.
+
+        Parameters
+        ----------
+        feature_set, only_marks, required_marks, global_parameters, engine :
+            as in extract_multiple. Fixed for the lifetime of the service.
+        num_processes : the number of workers. Defaults to the number of cpus.
+        max_batch_size : dispatch at most this many reconstructions at once
+        max_wait : after receiving a reconstruction, wait up to this long (s)
+            for others to batch with it
+
+        Notes
+        -----
+        If a worker dies (e.g. is killed for using too much memory), every 
+        reconstruction in progress fails, and the pool is restarted.
+
+        """
+
+        self.num_processes = num_processes if num_processes else mp.cpu_count()
+        self.feature_set = feature_set
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.num_submitted = 0
+        self.num_batches = 0
+        self.num_restarts = 0
+        self.started = time.time()
+
+        # requests are handled (and submit called) on many threads
+        self._lock = threading.Lock()
+
+        self._initargs = (
+            feature_set, only_marks, required_marks,
+            {} if global_parameters is None else global_parameters,
+            engine
+        )
+        self.pool = self._start_pool()
+
+        self._queue: "queue.Queue[Optional[Tuple[Dict, Future]]]" = \
+            queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            self.num_processes,
+            initializer=initialize_worker,
+            initargs=self._initargs
+        )
+
+    def _submit_chunk(self, reconstructions: List[Dict[str, Any]]) -> Future:
+        """ Submit reconstructions to the pool, restarting it if a worker 
+        has died
+        """
+
+        try:
+            return self.pool.submit(_extract_chunk, reconstructions)
+        except BrokenProcessPool:
+            logging.warning("a worker died; restarting the worker pool")
+            self.pool.shutdown(wait=False)
+            self.pool = self._start_pool()
+            self.num_restarts += 1
+            return self.pool.submit(_extract_chunk, reconstructions)
+
+    def _gather(self) -> Optional[List[Tuple[Dict, Future]]]:
+        """ Wait for a batch of submissions. Returns None on close.
+        """
+
+        item = self._queue.get()
+        if item is None:
+            return None
+
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _dispatch(self):
+        while True:
+            batch = self._gather()
+            if batch is None:
+                return
+
+            self.num_batches += 1
+            chunksize = max(1, math.ceil(len(batch) / self.num_processes))
+
+            for start in range(0, len(batch), chunksize):
+                chunk = batch[start: start + chunksize]
+                futures = [future for _, future in chunk]
+
+                # runs when the chunk completes, or fails (e.g. with 
+                # BrokenProcessPool if a worker dies)
+                def resolve(done: Future, futures=futures):
+                    try:
+                        outcomes = done.result()
+                    except Exception as error:
+                        for future in futures:
+                            future.set_exception(error)
+                        return
+                    for future, outcome in zip(futures, outcomes):
+                        future.set_result(outcome)
+
+                self._submit_chunk(
+                    [spec for spec, _ in chunk]).add_done_callback(resolve)
+
+    def submit(self, reconstruction: Dict[str, Any]) -> Future:
+        """ Queue a reconstruction (as argued to run_feature_extraction; may
+        specify swc_data rather than swc_path) for extraction.
+
+        Returns
+        -------
+        A future, whose result is as returned by try_worker_extraction
+
+        """
+
+        future: Future = Future()
+        with self._lock:
+            self.num_submitted += 1
+        self._queue.put((reconstruction, future))
+        return future
+
+    def extract(
+        self,
+        reconstructions: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """ Extract features from reconstructions, blocking until all are
+        done.
+
+        Returns
+        -------
+        results : maps identifiers to runs
+        failures : maps identifiers to error messages
+
+        Raises
+        ------
+        BrokenProcessPool : if a worker died while extracting features from 
+            one of these reconstructions
+
+        """
+
+        futures = [
+            (spec.get("identifier", spec.get("swc_path")), self.submit(spec))
+            for spec in reconstructions
+        ]
+
+        results: Dict[str, Dict] = {}
+        failures: Dict[str, str] = {}
+        for identifier, future in futures:
+            succeeded, outcome = future.result()
+            if succeeded:
+                results[str(outcome[0])] = outcome[1]
+            else:
+                failures[str(identifier)] = outcome
+
+        return results, failures
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "feature_set": self.feature_set,
+            "engine": self.engine,
+            "num_processes": self.num_processes,
+            "num_submitted": self.num_submitted,
+            "num_batches": self.num_batches,
+            "num_restarts": self.num_restarts,
+            "uptime": time.time() - self.started
+        }
+
+    def close(self):
+        """ Stop dispatching and shut down the worker pool
+        """
+
+        self._queue.put(None)
+        self._dispatcher.join()
+        self.pool.shutdown(wait=True)
+
+
+def is_within(path: str, root: str) -> bool:
+    """ Determine whether a path (after resolving symbolic links) lies 
+    within a root directory.
+    """
+
+    path = os.path.realpath(path)
+    root = os.path.realpath(root)
+    return os.path.commonpath([path, root]) == root
+
+
+class ExtractionRequestHandler(BaseHTTPRequestHandler):
+
+    server: "FeatureExtractionServer"
+
+    def log_message(self, format, *args):
+        logging.info("%s - " + format, self.address_string(), *args)
+
+    def respond(self, status: int, body: Dict[str, Any]):
+        encoded = json.dumps(body, default=to_json_value).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self.respond(200, self.server.service.status())
+        else:
+            self.respond(404, {"error": f"unknown path: {self.path}"})
+
+    def parse_reconstructions(self, body: bytes) -> List[Dict[str, Any]]:
+        """ Build reconstruction specifications from a request body
+        """
+
+        url = urlparse(self.path)
+        content_type = self.headers.get("Content-Type", "")
+
+        if not content_type.startswith("application/json"):
+            identifier = parse_qs(url.query).get("identifier", ["swc"])[0]
+            return [{"swc_data": body, "identifier": identifier}]
+
+        reconstructions = []
+        for index, item in enumerate(json.loads(body)["reconstructions"]):
+            spec = dict(item)
+            if "swc" in spec:
+                spec["swc_data"] = spec.pop("swc").encode()
+                spec.setdefault("identifier", f"swc_{index}")
+            elif "swc_path" not in spec:
+                raise ValueError("each reconstruction needs swc or swc_path")
+            self.check_paths(spec)
+            reconstructions.append(spec)
+        return reconstructions
+
+    def check_paths(self, spec: Dict[str, Any]):
+        """ Raise a PermissionError if a reconstruction names a file (e.g. 
+        its swc_path, or a layered_point_depths_path) outside of the 
+        server's path root.
+        """
+
+        root = self.server.path_root
+        if root is None:
+            return
+
+        for key, value in spec.items():
+            if key.endswith("_path") and not is_within(str(value), root):
+                raise PermissionError(f"{key} is outside of the path root")
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/extract":
+            self.respond(404, {"error": f"unknown path: {self.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        try:
+            reconstructions = self.parse_reconstructions(body)
+        except PermissionError as err:
+            self.respond(403, {"error": str(err)})
+            return
+        except (ValueError, KeyError, TypeError, AttributeError) as err:
+            self.respond(400, {"error": f"invalid request: {err}"})
+            return
+
+        try:
+            results, failures = self.server.service.extract(reconstructions)
+        except Exception as err:
+            # e.g. the worker pool failed to run a batch
+            logging.exception("feature extraction request failed")
+            self.respond(500, {"error": f"extraction failed: {err}"})
+            return
+        self.respond(200, {"results": results, "failures": failures})
+
+
+def is_loopback(address: str) -> bool:
+    try:
+        return ipaddress.ip_address(address).is_loopback
+    except ValueError:
+        return False
+
+
+class FeatureExtractionServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        service: ExtractionService,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        path_root: Optional[str] = None
+    ):
+        """ Serves feature extraction requests over http. Each request is
+        handled on its own thread, so concurrent requests are batched by the
+        service.
+
+        Parameters
+        ----------
+        service : carries out extraction
+        host : listen on this address. Defaults to localhost only.
+        port : listen on this port. 0 chooses a free port (see
+            server_address).
+        path_root : if provided, requests may only name files (e.g. 
+            swc_path) within this directory. Required if host is not a 
+            loopback address, since clients are not authenticated.
+
+        """
+
+        super().__init__((host, port), ExtractionRequestHandler)
+        self.service = service
+        self.path_root = path_root
+
+        if path_root is None and not is_loopback(self.server_address[0]):
+            super().server_close()
+            raise ValueError(
+                f"refusing to serve unrestricted paths on {host}: provide a "
+                "path_root"
+            )
+
+    def server_close(self):
+        super().server_close()
+        self.service.close()
+
+
+def main():
+    parser = ArgSchemaParser(schema_type=ServerParameters)
+    args = parser.args
+    logging.getLogger().setLevel(args["log_level"])
+
+    service = ExtractionService(
+        feature_set=args["feature_set"],
+        only_marks=args.get("only_marks"),
+        required_marks=args.get("required_marks"),
+        global_parameters=args.get("global_parameters"),
+        engine=args["engine"],
+        num_processes=args.get("num_processes"),
+        max_batch_size=args["max_batch_size"],
+        max_wait=args["max_wait"]
+    )
+    try:
+        server = FeatureExtractionServer(
+            service, args["host"], args["port"], args.get("path_root"))
+    except:
+        service.close()
+        raise
+
+    host, port = server.server_address[:2]
+    logging.warning(f"serving feature extraction at http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+""" A process pool which enforces per-task limits on wall time and memory.
+A worker which exceeds a limit (or dies) is killed and replaced, and its
+task is reported as failed, while the other workers carry on.
+"""
+
+from typing import (
+    Any, Callable, Collection, Dict, Iterable, Iterator, List, NamedTuple, 
+    Optional, Sequence, Tuple)
+from multiprocessing.connection import wait
+import logging
+import multiprocessing as mp
+import os
+import signal
+import time
+import traceback
+
+
+class TaskFailure(NamedTuple):
+    """ Describes why a supervised task did not complete
+    """
+
+    # one of "timeout", "memory", "error" or "crashed"
+    reason: str
+
+    # details, e.g. a traceback or the worker's exit code
+    message: str
+
+    # wall time (s) from the task's dispatch until the failure was detected
+    elapsed: float
+
+    # the largest memory use (bytes, see group_memory) observed for the 
+    # worker's process group while it was working on this task. None if not 
+    # observed (memory is only measured when it is limited).
+    peak_memory: Optional[int] = None
+
+
+def resident_memory(pid: int) -> Optional[int]:
+    """ Look up the resident set size (bytes) of a process. Returns None
+    where this is unavailable (/proc is read, so only Linux is supported).
+    """
+
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def _proportional_memory(pid: int) -> Optional[int]:
+    """ Look up the proportional set size (bytes) of a process: its resident 
+    memory, with each page shared by n processes counted 1 / n times. Falls 
+    back to the resident set size where this is unavailable.
+    """
+
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return resident_memory(pid)
+
+
+def _process_group(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            # the command name (in parentheses) may contain spaces
+            fields = stat.read().rsplit(")", 1)[1].split()
+        return int(fields[2])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def group_memory(pgids: Collection[int]) -> Dict[int, int]:
+    """ Measure the memory used by some process groups. Each group's use is 
+    the sum of its members' proportional set sizes (see 
+    _proportional_memory), so that pages which forked members share 
+    copy-on-write are counted once. 
+
+    Returns
+    -------
+    Maps each group to its memory use (bytes). Groups which could not be 
+        measured (e.g. where /proc is unavailable) are absent.
+
+    """
+
+    pgids = set(pgids)
+    if not pgids:
+        return {}
+
+    try:
+        pids = [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return {}
+
+    usage: Dict[int, int] = {}
+    for pid in pids:
+        pgid = _process_group(pid)
+        if pgid not in pgids:
+            continue
+
+        memory = _proportional_memory(pid)
+        if memory is not None:
+            usage[pgid] = usage.get(pgid, 0) + memory
+    return usage
+
+
+def _supervised_worker(
+    connection: Any,
+    fn: Callable,
+    initializer: Optional[Callable],
+    initargs: Sequence
+):
+    """ Run tasks received on a connection until told to stop (by None)
+    """
+
+    # lead a process group, so that the supervisor can kill this worker along
+    # with any processes it forks
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+
+    if initializer is not None:
+        initializer(*initargs)
+
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+
+        try:
+            connection.send(("ok", fn(task)))
+        except Exception:
+            connection.send(("error", traceback.format_exc()))
+
+
+class _Slot:
+    """ A worker process and the task (if any) it is working on
+    """
+
+    def __init__(self, process: Any, connection: Any):
+        self.process = process
+        self.connection = connection
+        self.task: Any = None
+        self.busy = False
+        self.started = 0.0
+        self.peak_memory: Optional[int] = None
+
+
+class SupervisedPool:
+
+    def __init__(
+        self,
+        fn: Callable,
+        processes: int,
+        initializer: Optional[Callable] = None,
+        initargs: Sequence = (),
+        timeout: Optional[float] = None,
+        max_memory: Optional[int] = None,
+        poll_interval: float = 0.1,
+        context: Optional[Any] = None
+    ):
+        """ A pool of worker processes, each of which applies fn to one task
+        at a time under supervision.
+
+        Parameters
+        ----------
+        fn : applied to each task. Must be picklable.
+        processes : the number of workers
+        initializer : if provided, each worker (including replacements)
+            calls this with initargs on startup
+        initargs : see initializer
+        timeout : a worker taking longer than this (s) on a single task is
+            killed
+        max_memory : a worker whose process group (the worker and any 
+            processes it forks) uses more memory than this (bytes, see 
+            group_memory) is killed. Only enforced where memory can be 
+            measured.
+        poll_interval : check workers' elapsed time and memory this often (s)
+        context : start workers with this multiprocessing context (e.g. 
+            mp.get_context("forkserver")). Defaults to the default context. 
+            Replacement workers are started while tasks are being drawn, so 
+            use a context which does not fork this process if drawing tasks 
+            starts threads.
+
+        Notes
+        -----
+        Unlike multiprocessing.Pool, workers are not daemonic, so they may
+        fork (e.g. see FeatureExtractionRun's num_processes). Each worker
+        leads a process group, which is killed as a whole.
+
+        """
+
+        self.fn = fn
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = tuple(initargs)
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.poll_interval = poll_interval
+        self.context = mp.get_context() if context is None else context
+
+        self.num_replaced = 0
+        self.slots: List[_Slot] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start(self) -> _Slot:
+        parent_connection, child_connection = self.context.Pipe()
+        process = self.context.Process(
+            target=_supervised_worker,
+            args=(child_connection, self.fn, self.initializer, self.initargs)
+        )
+        process.start()
+        child_connection.close()
+        return _Slot(process, parent_connection)
+
+    def _kill(self, slot: _Slot):
+        try:
+            os.killpg(slot.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            slot.process.kill()
+        slot.process.join()
+        slot.connection.close()
+
+    def _replace(self, slot: _Slot) -> _Slot:
+        self._kill(slot)
+        self.num_replaced += 1
+
+        replacement = self._start()
+        self.slots[self.slots.index(slot)] = replacement
+        return replacement
+
+    def _check(
+        self, 
+        slot: _Slot, 
+        memory: Optional[int]
+    ) -> Optional[TaskFailure]:
+        """ Determine whether a busy worker has exceeded a limit or died, 
+        given its process group's current memory use (None if unknown).
+        """
+
+        elapsed = time.perf_counter() - slot.started
+
+        if memory is not None:
+            slot.peak_memory = max(slot.peak_memory or 0, memory)
+
+        if self.timeout is not None and elapsed > self.timeout:
+            return TaskFailure(
+                "timeout", f"exceeded {self.timeout} s", elapsed,
+                slot.peak_memory
+            )
+        if (
+            self.max_memory is not None
+            and memory is not None
+            and memory > self.max_memory
+        ):
+            return TaskFailure(
+                "memory", f"exceeded {self.max_memory} bytes", elapsed,
+                slot.peak_memory
+            )
+        if not slot.process.is_alive():
+            return TaskFailure(
+                "crashed", f"exit code {slot.process.exitcode}", elapsed,
+                slot.peak_memory
+            )
+        return None
+
+    def imap_unordered(
+        self,
+        tasks: Iterable[Any]
+    ) -> Iterator[Tuple[Any, Any, Optional[TaskFailure]]]:
+        """ Apply this pool's function to tasks, in parallel.
+
+        Yields
+        ------
+        task : as argued
+        result : fn(task), or None if the task failed
+        failure : None if the task succeeded. Otherwise a description of the
+            failure.
+
+        """
+
+        pending = iter(tasks)
+        while len(self.slots) < self.processes:
+            self.slots.append(self._start())
+
+        def assign(slot: _Slot):
+            for task in pending:
+                slot.connection.send(task)
+                slot.task = task
+                slot.busy = True
+                slot.started = time.perf_counter()
+                slot.peak_memory = None
+                return
+            slot.task = None
+            slot.busy = False
+
+        for slot in list(self.slots):
+            assign(slot)
+
+        while any(slot.busy for slot in self.slots):
+            busy = [slot for slot in self.slots if slot.busy]
+            ready = wait(
+                [slot.connection for slot in busy], timeout=self.poll_interval)
+
+            # each worker leads a process group (see _supervised_worker). 
+            # Measuring scans /proc, so is skipped unless memory is limited.
+            memory: Dict[int, int] = {}
+            if self.max_memory is not None:
+                memory = group_memory([
+                    slot.process.pid for slot in busy 
+                    if slot.connection not in ready
+                ])
+
+            for slot in busy:
+                task = slot.task
+                result = None
+                failure = None
+                healthy = True
+
+                if slot.connection in ready:
+                    try:
+                        status, payload = slot.connection.recv()
+                    except (EOFError, OSError):
+                        slot.process.join()
+                        failure = TaskFailure(
+                            "crashed",
+                            f"exit code {slot.process.exitcode}",
+                            time.perf_counter() - slot.started,
+                            slot.peak_memory
+                        )
+                        healthy = False
+                    else:
+                        if status == "ok":
+                            result = payload
+                        else:
+                            failure = TaskFailure(
+                                "error", payload,
+                                time.perf_counter() - slot.started,
+                                slot.peak_memory
+                            )
+                else:
+                    failure = self._check(
+                        slot, memory.get(slot.process.pid))
+                    if failure is None:
+                        continue
+                    healthy = False
+
+                if not healthy:
+                    logging.warning(
+                        f"replacing worker {slot.process.pid} "
+                        f"({failure.reason})"
+                    )
+                    slot = self._replace(slot)
+
+                assign(slot)
+                yield task, result, failure
+
+    def close(self):
+        """ Stop all workers
+        """
+
+        for slot in self.slots:
+            try:
+                slot.connection.send(None)
+            except (OSError, ValueError):
+                pass
+
+        for slot in self.slots:
+            slot.process.join(timeout=1)
+            if slot.process.is_alive():
+                self._kill(slot)
+            else:
+                slot.connection.close()
+
+        self.slots = []
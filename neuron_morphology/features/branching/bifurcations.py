@@ -10,6 +10,8 @@ from neuron_morphology.feature_extractor.mark import (
 )
 from neuron_morphology.feature_extractor.data import (
     MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.products import consumes
+from neuron_morphology.features import intermediates
 from neuron_morphology.morphology import Morphology
 
 
@@ -66,6 +68,7 @@ def calculate_outer_bifs(
 @marked(Geometric)
 @marked(BifurcationFeatures)
 @marked(RequiresRoot)
+@consumes(intermediates.root)
 def num_outer_bifurcations(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None
@@ -84,7 +87,7 @@ def num_outer_bifurcations(
 
     return calculate_outer_bifs(
         data.morphology,
-        data.morphology.get_root(),
+        intermediates.root(data),
         node_types
     )
 
@@ -101,6 +104,7 @@ def angle_between(v1, v2):
 
 @marked(Geometric)
 @marked(BifurcationFeatures)
+@consumes(intermediates.nodes)
 def mean_bifurcation_angle_local(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None
@@ -126,7 +130,7 @@ def mean_bifurcation_angle_local(
     morphology = get_morphology(data)
     total_angle = 0.0
     n = 0
-    nodes = morphology.get_node_by_types(node_types)
+    nodes = intermediates.nodes(data, node_types=node_types)
     for node in nodes:
         if len(morphology.children_of(node)) == 2:
             node_vec = np.asarray([node['x'], node['y'], node['z']])
@@ -147,6 +151,7 @@ def mean_bifurcation_angle_local(
 
 @marked(Geometric)
 @marked(BifurcationFeatures)
+@consumes(intermediates.nodes)
 def mean_bifurcation_angle_remote(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None
@@ -176,7 +181,7 @@ def mean_bifurcation_angle_remote(
     morphology = get_morphology(data)
     total_angle = 0.0
     n = 0
-    nodes = morphology.get_node_by_types(node_types)
+    nodes = intermediates.nodes(data, node_types=node_types)
     for node in nodes:
         if len(morphology.children_of(node)) == 2:
             node_vec = np.asarray([node['x'], node['y'], node['z']])
@@ -0,0 +1,519 @@
+""" Vectorized calculation of cheap features across a cohort of many
+reconstructions at once. Rather than calculating each feature for each
+reconstruction in turn, the cohort's nodes are packed into a single set of
+arrays and each feature is calculated for every reconstruction using grouped
+NumPy reductions (np.bincount, ufunc.reduceat).
+
+The functions here match (within floating point tolerance) the per-
+reconstruction features they are named for, called with the same arguments.
+Where the per-reconstruction feature would fail (e.g. a reconstruction has no
+root or no nodes of the requested types), the result is nan.
+"""
+
+from typing import (
+    Any, Callable, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple,
+    Union)
+from functools import partial
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.morphology_arrays import MorphologyArrays
+from neuron_morphology.constants import SOMA
+from neuron_morphology.feature_extractor.feature_specialization import (
+    NEURITE_SPECIALIZATIONS)
+from neuron_morphology.feature_extractor.feature_table import FeatureTable
+from neuron_morphology.feature_extractor.utilities import unnest
+from neuron_morphology.features.statistics.coordinates import (
+    COORD_TYPE, COORD_TYPE_SPECIALIZATIONS)
+
+
+class Cohort:
+
+    def __init__(
+        self,
+        types: np.ndarray,
+        xyz: np.ndarray,
+        radius: np.ndarray,
+        parent: np.ndarray,
+        offsets: np.ndarray,
+        roots: Optional[np.ndarray] = None,
+        identifiers: Optional[Sequence[Hashable]] = None
+    ):
+        """ The nodes of many reconstructions, packed into aligned arrays.
+        Each reconstruction's nodes are stored contiguously.
+
+        Parameters
+        ----------
+        types : the (integer) type of each node
+        xyz : (n nodes, 3) array of node positions
+        radius : the radius of each node
+        parent : the (cohort-wide) index of each node's parent, or -1 for
+            roots. Parents must belong to the same reconstruction as their
+            children.
+        offsets : (n reconstructions + 1) array. The nodes of the ith
+            reconstruction are offsets[i]:offsets[i + 1].
+        roots : the index of each reconstruction's root (as reported by
+            Morphology.get_root), or -1 if it has none. Defaults to each
+            reconstruction's first node without a parent.
+        identifiers : label each reconstruction. Defaults to their
+            positions in the cohort.
+
+        """
+
+        self.types = np.asarray(types, dtype=int)
+        self.xyz = np.asarray(xyz, dtype=float).reshape((-1, 3))
+        self.radius = np.asarray(radius, dtype=float)
+        self.parent = np.asarray(parent, dtype=int)
+        self.offsets = np.asarray(offsets, dtype=int)
+
+        num_neurons = len(self.offsets) - 1
+        if identifiers is None:
+            identifiers = range(num_neurons)
+        self.identifiers: List[str] = [str(item) for item in identifiers]
+        if len(self.identifiers) != num_neurons:
+            raise ValueError(
+                f"found {len(self.identifiers)} identifiers for "
+                f"{num_neurons} reconstructions"
+            )
+
+        # the reconstruction to which each node belongs
+        self.neuron = np.repeat(
+            np.arange(num_neurons, dtype=int), np.diff(self.offsets))
+
+        self.num_children = np.bincount(
+            self.parent[self.parent >= 0], minlength=len(self.types))
+
+        if roots is None:
+            roots = np.full((num_neurons,), -1, dtype=int)
+            parentless = np.flatnonzero(self.parent < 0)
+            owners, first = np.unique(
+                self.neuron[parentless], return_index=True)
+            roots[owners] = parentless[first]
+        self.roots = np.asarray(roots, dtype=int)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Sequence[MorphologyArrays],
+        roots: Optional[Sequence[int]] = None,
+        identifiers: Optional[Sequence[Hashable]] = None
+    ) -> "Cohort":
+        """ Pack the array-backed node data of several reconstructions.
+
+        Parameters
+        ----------
+        arrays : one per reconstruction
+        roots : the index of each reconstruction's root within its arrays
+            (-1 for none). Defaults as in Cohort.
+        identifiers : label each reconstruction
+
+        """
+
+        sizes = [len(member) for member in arrays]
+        offsets = np.concatenate([[0], np.cumsum(sizes, dtype=int)])
+
+        def packed(name, shape=(0,), dtype=float):
+            return np.concatenate(
+                [getattr(member, name) for member in arrays]
+                + [np.zeros(shape, dtype=dtype)]
+            )
+
+        parent = packed("parent", dtype=int)
+        parent = np.where(
+            parent >= 0, parent + np.repeat(offsets[:-1], sizes), -1)
+
+        if roots is not None:
+            roots = np.asarray(roots, dtype=int)
+            roots = np.where(roots >= 0, roots + offsets[:-1], -1)
+
+        return cls(
+            types=packed("types", dtype=int),
+            xyz=packed("xyz", shape=(0, 3)),
+            radius=packed("radius"),
+            parent=parent,
+            offsets=offsets,
+            roots=roots,
+            identifiers=identifiers
+        )
+
+    @classmethod
+    def from_morphologies(
+        cls,
+        morphologies: Sequence[Morphology],
+        identifiers: Optional[Sequence[Hashable]] = None
+    ) -> "Cohort":
+        """ Pack the nodes of several reconstructions.
+
+        Parameters
+        ----------
+        morphologies : the reconstructions
+        identifiers : label each reconstruction
+
+        """
+
+        arrays = []
+        roots = []
+        for morphology in morphologies:
+            current = MorphologyArrays.from_morphology(morphology)
+            root = morphology.get_root()
+            arrays.append(current)
+            roots.append(
+                -1 if root is None
+                else current.index[morphology.node_id_cb(root)]
+            )
+
+        return cls.from_arrays(arrays, roots, identifiers)
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def node_weights(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ How many times each node would be selected by
+        Morphology.get_node_by_types. This is 0 or 1, except when node_types
+        contains repeats.
+        """
+
+        if not node_types:
+            return np.ones(self.types.shape, dtype=int)
+
+        weights = np.zeros(self.types.shape, dtype=int)
+        for node_type in node_types:
+            weights += self.types == node_type
+        return weights
+
+    def indices_by_types(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ Select nodes by type, including repeats (see node_weights)
+        """
+
+        weights = self.node_weights(node_types)
+        return np.repeat(np.arange(len(weights), dtype=int), weights)
+
+    def points(
+        self,
+        coordinate_type: COORD_TYPE = COORD_TYPE.NODE,
+        node_types: Optional[Sequence[int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ The points considered by features of a coordinate type. See
+        neuron_morphology.features.statistics.coordinates.get_coordinates.
+        As there, node_types has no effect on compartment coordinates.
+
+        Returns
+        -------
+        xyz : (n points, 3) array
+        neuron : the reconstruction to which each point belongs
+
+        """
+
+        if coordinate_type is COORD_TYPE.COMPARTMENT:
+            children = np.flatnonzero(self.parent >= 0)
+            midpoints = (
+                self.xyz[self.parent[children]] + self.xyz[children]) * 0.5
+            return midpoints, self.neuron[children]
+
+        if coordinate_type is COORD_TYPE.NODE:
+            indices = self.indices_by_types(node_types)
+        else:
+            if node_types:
+                indices = self.indices_by_types(node_types)
+            else:
+                indices = np.flatnonzero(self.types != SOMA)
+
+            if coordinate_type is COORD_TYPE.TIP:
+                indices = indices[self.num_children[indices] == 0]
+            elif coordinate_type is COORD_TYPE.BIFURCATION:
+                indices = indices[self.num_children[indices] > 1]
+            else:
+                raise ValueError(
+                    f"unrecognized coordinate type: {coordinate_type}")
+
+        return self.xyz[indices], self.neuron[indices]
+
+    def root_xyz(self) -> np.ndarray:
+        """ The position of each reconstruction's root. nan if it has none.
+        """
+
+        xyz = np.full((len(self), 3), np.nan)
+        has_root = self.roots >= 0
+        xyz[has_root] = self.xyz[self.roots[has_root]]
+        return xyz
+
+
+def grouped_sum(
+    values: np.ndarray,
+    groups: np.ndarray,
+    num_groups: int
+) -> np.ndarray:
+    """ Sum values (1D, or 2D along the first axis) within each group.
+    Empty groups sum to 0.
+    """
+
+    if values.ndim == 1:
+        return np.bincount(groups, weights=values, minlength=num_groups)
+    return np.stack([
+        np.bincount(groups, weights=column, minlength=num_groups)
+        for column in values.T
+    ], axis=1).reshape((num_groups,) + values.shape[1:])
+
+
+def grouped_reduce(
+    ufunc: np.ufunc,
+    values: np.ndarray,
+    groups: np.ndarray,
+    num_groups: int
+) -> np.ndarray:
+    """ Reduce values (along the first axis) within each group, using a
+    ufunc (e.g. np.minimum). Empty groups are nan.
+    """
+
+    order = np.argsort(groups, kind="stable")
+    values = values[order]
+
+    counts = np.bincount(groups, minlength=num_groups)
+    starts = np.cumsum(counts) - counts
+    nonempty = counts > 0
+
+    reduced = np.full((num_groups,) + values.shape[1:], np.nan)
+    if np.any(nonempty):
+        reduced[nonempty] = ufunc.reduceat(values, starts[nonempty], axis=0)
+    return reduced
+
+
+def cohort_num_nodes(
+    cohort: Cohort,
+    node_types: Optional[List[int]] = None
+) -> np.ndarray:
+    """ See neuron_morphology.features.intrinsic.num_nodes
+    """
+
+    return np.bincount(
+        cohort.neuron,
+        weights=cohort.node_weights(node_types),
+        minlength=len(cohort)
+    ).astype(int)
+
+
+def cohort_total_length(
+    cohort: Cohort,
+    node_types: Optional[List[int]] = None
+) -> np.ndarray:
+    """ See neuron_morphology.features.size.total_length
+    """
+
+    children = np.flatnonzero(cohort.parent >= 0)
+    parents = cohort.parent[children]
+
+    lengths = np.linalg.norm(
+        cohort.xyz[children] - cohort.xyz[parents], axis=1)
+    from_soma_root = (cohort.types[parents] == SOMA) \
+        & (cohort.parent[parents] < 0)
+    lengths[from_soma_root] = 0.0
+
+    # as intermediates.compartment_weights
+    weights = cohort.node_weights(node_types)[children]
+    if node_types:
+        weights = weights * np.isin(cohort.types[parents], node_types)
+
+    return grouped_sum(
+        lengths * weights, cohort.neuron[children], len(cohort))
+
+
+def cohort_dimension(
+    cohort: Cohort,
+    node_types: Optional[List[int]] = None,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE
+) -> Dict[str, np.ndarray]:
+    """ See neuron_morphology.features.dimension.dimension. Each value has
+    one row per reconstruction.
+    """
+
+    xyz, neuron = cohort.points(coord_type, node_types)
+    xyz = xyz - cohort.root_xyz()[neuron]
+
+    min_xyz = grouped_reduce(np.minimum, xyz, neuron, len(cohort))
+    max_xyz = grouped_reduce(np.maximum, xyz, neuron, len(cohort))
+    bias_xyz = np.absolute(np.absolute(max_xyz) - np.absolute(min_xyz))
+    size = max_xyz - min_xyz
+
+    return {
+        'width': size[:, 0],
+        'height': size[:, 1],
+        'depth': size[:, 2],
+        'min_xyz': min_xyz,
+        'max_xyz': max_xyz,
+        'bias_xyz': bias_xyz
+    }
+
+
+def cohort_moments(
+    cohort: Cohort,
+    node_types: Optional[List[int]] = None,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE
+) -> Dict[str, np.ndarray]:
+    """ See neuron_morphology.features.statistics.moments.moments. Each
+    value has one row per reconstruction. As in scipy.stats.describe, the
+    variance is unbiased, while the skewness and (Fisher) kurtosis are
+    biased and nan where the variance is (numerically) 0.
+    """
+
+    xyz, neuron = cohort.points(coord_type, node_types)
+    num_neurons = len(cohort)
+
+    counts = np.bincount(neuron, minlength=num_neurons)[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = grouped_sum(xyz, neuron, num_neurons) / counts
+
+        deviations = xyz - mean[neuron]
+        squared = deviations ** 2
+        m2 = grouped_sum(squared, neuron, num_neurons) / counts
+        m3 = grouped_sum(squared * deviations, neuron, num_neurons) / counts
+        m4 = grouped_sum(squared ** 2, neuron, num_neurons) / counts
+
+        variance = m2 * counts / (counts - 1)
+        zero = m2 <= (np.finfo(m2.dtype).resolution * mean) ** 2
+        skew = np.where(zero, np.nan, m3 / m2 ** 1.5)
+        kurt = np.where(zero, np.nan, m4 / m2 ** 2.0) - 3
+
+    return {
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'var': variance,
+        'skew': skew,
+        'kurt': kurt
+    }
+
+
+def cohort_soma_percentile(
+    cohort: Cohort,
+    node_types: Optional[List[int]] = None,
+    symmetrize_xz: bool = True
+) -> np.ndarray:
+    """ See neuron_morphology.features.soma.soma_percentile. Returns a
+    (reconstruction, 3) array.
+    """
+
+    indices = cohort.indices_by_types(node_types)
+    neuron = cohort.neuron[indices]
+
+    below = cohort.xyz[indices] < cohort.root_xyz()[neuron]
+    counts = np.bincount(neuron, minlength=len(cohort))[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentile = grouped_sum(
+            below.astype(float), neuron, len(cohort)) / counts
+
+    if symmetrize_xz:
+        for axis in (0, 2):
+            flip = percentile[:, axis] > 0.5
+            percentile[flip, axis] = 1.0 - percentile[flip, axis]
+
+    return percentile
+
+
+CohortFeature = Callable[[Cohort], Union[np.ndarray, Dict[str, np.ndarray]]]
+
+
+def build_cohort_features() -> Dict[str, CohortFeature]:
+    """ The cohort equivalents of the default num_nodes, total_length,
+    dimension and moments features, named as in default_features, along
+    with (unspecialized) soma_percentile.
+    """
+
+    neurites = sorted(NEURITE_SPECIALIZATIONS, key=lambda spec: spec.name)
+    coord_types = sorted(
+        COORD_TYPE_SPECIALIZATIONS, key=lambda spec: spec.name)
+
+    features: Dict[str, CohortFeature] = {}
+    for neurite in neurites:
+        for name, function in (
+            ("num_nodes", cohort_num_nodes),
+            ("total_length", cohort_total_length)
+        ):
+            features[f"{neurite.name}.{name}"] = partial(
+                function, **neurite.kwargs)
+
+    for name, function in (
+        ("dimension", cohort_dimension),
+        ("moments", cohort_moments)
+    ):
+        for neurite in neurites:
+            for coord_type in coord_types:
+                features[f"{neurite.name}.{coord_type.name}.{name}"] = \
+                    partial(function, **neurite.kwargs, **coord_type.kwargs)
+
+    features["soma_percentile"] = cohort_soma_percentile
+    return features
+
+
+def _columns(name: str, values: np.ndarray) -> Dict[str, np.ndarray]:
+    """ Split a (reconstruction X ...) array into named columns. Columns of
+    2D values are suffixed with their index (e.g. "dimension.min_xyz_0").
+    """
+
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        return {name: values}
+    values = values.reshape((len(values), -1))
+    return {
+        f"{name}_{index}": values[:, index] for index in range(values.shape[1])
+    }
+
+
+def cohort_feature_table(
+    cohort: Union[Cohort, Sequence[Morphology]],
+    features: Optional[Mapping[str, CohortFeature]] = None
+) -> FeatureTable:
+    """ Calculate features for every reconstruction in a cohort.
+
+    Parameters
+    ----------
+    cohort : the reconstructions. A sequence of morphologies will be packed
+        (see Cohort.from_morphologies).
+    features : maps feature names to cohort features (e.g. cohort_dimension
+        or a partial application thereof). Defaults to
+        build_cohort_features().
+
+    Returns
+    -------
+    A table whose values are a (reconstruction X feature) float64 array.
+        Dictionary results are flattened as by unnest.
+
+    Examples
+    --------
+    >>> table = cohort_feature_table(morphologies)
+    >>> table.values[:, table.columns.index("axon.total_length")]
+
+    """
+
+    if not isinstance(cohort, Cohort):
+        cohort = Cohort.from_morphologies(cohort)
+    if features is None:
+        features = build_cohort_features()
+
+    columns: Dict[str, np.ndarray] = {}
+    for name, feature in features.items():
+        result: Any = feature(cohort)
+        if not isinstance(result, Mapping):
+            result = {name: result}
+        else:
+            result = unnest({name: result})
+
+        for key, values in result.items():
+            columns.update(_columns(key, values))
+
+    values = np.empty((len(cohort), len(columns)))
+    for index, column in enumerate(columns.values()):
+        values[:, index] = column
+
+    return FeatureTable(
+        reconstruction_ids=list(cohort.identifiers),
+        columns=list(columns),
+        values=values,
+        text_columns=[],
+        text_values=np.empty((len(cohort), 0), dtype=object)
+    )
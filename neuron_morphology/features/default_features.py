@@ -38,49 +38,76 @@ from neuron_morphology.features.path import (
 )
 from neuron_morphology.features.statistics.overlap import overlap
 from neuron_morphology.features.statistics.moments import moments
+from neuron_morphology.features.fast import accelerate
 
 
-default_features = [
-    nested_specialize(
-            dimension,
-            [COORD_TYPE_SPECIALIZATIONS, NEURITE_SPECIALIZATIONS]),
-    specialize(num_nodes, NEURITE_SPECIALIZATIONS),
-    specialize(num_branches, NEURITE_SPECIALIZATIONS),
-    specialize(num_tips, NEURITE_SPECIALIZATIONS),
-    specialize(mean_fragmentation, NEURITE_SPECIALIZATIONS),
-    specialize(max_branch_order, NEURITE_SPECIALIZATIONS),
-    specialize(num_outer_bifurcations, NEURITE_SPECIALIZATIONS),
-    specialize(mean_bifurcation_angle_local, NEURITE_SPECIALIZATIONS),
-    specialize(mean_bifurcation_angle_remote, NEURITE_SPECIALIZATIONS),
-    specialize(total_length, NEURITE_SPECIALIZATIONS),
-    specialize(total_surface_area, NEURITE_SPECIALIZATIONS),
-    specialize(total_volume, NEURITE_SPECIALIZATIONS),
-    specialize(mean_diameter, NEURITE_SPECIALIZATIONS),
-    specialize(mean_parent_daughter_ratio, NEURITE_SPECIALIZATIONS),
-    specialize(max_euclidean_distance, NEURITE_SPECIALIZATIONS),
-    max_path_distance,
-    early_branch_path,
-    mean_contraction,
-    nested_specialize(
-            overlap,
-            [{AxonSpec, ApicalDendriteSpec, BasalDendriteSpec, DendriteSpec},
-             {AxonCompareSpec, ApicalDendriteCompareSpec,
-              BasalDendriteCompareSpec,
-              DendriteCompareSpec}]),
-    nested_specialize(
-            moments,
-            [COORD_TYPE_SPECIALIZATIONS, NEURITE_SPECIALIZATIONS]),
-    specialize(normalized_depth_histogram, NEURITE_SPECIALIZATIONS),
-    nested_specialize(
-        earth_movers_distance, 
-        [
-            {AxonSpec, ApicalDendriteSpec, BasalDendriteSpec, DendriteSpec},
-            {
-                AxonCompareSpec, ApicalDendriteCompareSpec,
-                BasalDendriteCompareSpec,
-                DendriteCompareSpec
-            },
-        ]
-    )
+def build_default_features():
+    """ Specialize the default features. Specialization copies each feature 
+    many times, so this is deferred until default_features is first used.
+    """
 
-]
+    return [
+        nested_specialize(
+                dimension,
+                [COORD_TYPE_SPECIALIZATIONS, NEURITE_SPECIALIZATIONS]),
+        specialize(num_nodes, NEURITE_SPECIALIZATIONS),
+        specialize(num_branches, NEURITE_SPECIALIZATIONS),
+        specialize(num_tips, NEURITE_SPECIALIZATIONS),
+        specialize(mean_fragmentation, NEURITE_SPECIALIZATIONS),
+        specialize(max_branch_order, NEURITE_SPECIALIZATIONS),
+        specialize(num_outer_bifurcations, NEURITE_SPECIALIZATIONS),
+        specialize(mean_bifurcation_angle_local, NEURITE_SPECIALIZATIONS),
+        specialize(mean_bifurcation_angle_remote, NEURITE_SPECIALIZATIONS),
+        specialize(total_length, NEURITE_SPECIALIZATIONS),
+        specialize(total_surface_area, NEURITE_SPECIALIZATIONS),
+        specialize(total_volume, NEURITE_SPECIALIZATIONS),
+        specialize(mean_diameter, NEURITE_SPECIALIZATIONS),
+        specialize(mean_parent_daughter_ratio, NEURITE_SPECIALIZATIONS),
+        specialize(max_euclidean_distance, NEURITE_SPECIALIZATIONS),
+        max_path_distance,
+        early_branch_path,
+        mean_contraction,
+        nested_specialize(
+                overlap,
+                [{AxonSpec, ApicalDendriteSpec, BasalDendriteSpec, DendriteSpec},
+                 {AxonCompareSpec, ApicalDendriteCompareSpec,
+                  BasalDendriteCompareSpec,
+                  DendriteCompareSpec}]),
+        nested_specialize(
+                moments,
+                [COORD_TYPE_SPECIALIZATIONS, NEURITE_SPECIALIZATIONS]),
+        specialize(normalized_depth_histogram, NEURITE_SPECIALIZATIONS),
+        nested_specialize(
+            earth_movers_distance, 
+            [
+                {AxonSpec, ApicalDendriteSpec, BasalDendriteSpec, DendriteSpec},
+                {
+                    AxonCompareSpec, ApicalDendriteCompareSpec,
+                    BasalDendriteCompareSpec,
+                    DendriteCompareSpec
+                },
+            ]
+        )
+
+    ]
+
+
+# built on first access (see __getattr__)
+_lazy_feature_sets = {
+    "default_features": build_default_features,
+
+    # the same features, calculated from array-backed morphology data where 
+    # possible (see neuron_morphology.features.fast)
+    "fast_default_features": lambda: accelerate(
+        __getattr__("default_features"))
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_feature_sets:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}")
+
+    if name not in globals():
+        globals()[name] = _lazy_feature_sets[name]()
+    return globals()[name]
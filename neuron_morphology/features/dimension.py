@@ -9,11 +9,15 @@ from neuron_morphology.feature_extractor.mark import (
     )
 
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.products import consumes, argument
 from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features import intermediates
 
 
 @marked(RequiresRoot)
 @marked(Geometric)
+@consumes(intermediates.coordinates, coordinate_type=argument("coord_type"))
+@consumes(intermediates.root)
 def dimension(
             data: Data,
             node_types: Optional[List] = None,
@@ -34,8 +38,8 @@ def dimension(
             (see neuron_morphology.features.statistics.coordinates for options)
 
     """
-    coordinates = coord_type.get_coordinates(
-                    data.morphology, node_types=node_types)
+    coordinates = intermediates.coordinates(
+        data, coordinate_type=coord_type, node_types=node_types)
     if not coordinates:
         nan_array = np.empty((3,))
         nan_array[:] = np.nan
@@ -51,7 +55,7 @@ def dimension(
         return dimension_features
     else:
         coordinates = np.asarray(coordinates)
-        root_node = data.morphology.get_root()
+        root_node = intermediates.root(data)
         root_xyz = np.asarray([root_node['x'], root_node['y'], root_node['z']])
         coordinates = coordinates - root_xyz
 
@@ -0,0 +1,758 @@
+""" Array-backed ("fast engine") implementations of the features in
+default_features. Each function here has the same signature and (within
+floating point tolerance) the same results as the reference feature it
+replaces, including that feature's edge case behavior. They operate on a
+MorphologyArrays (see intermediates.arrays) rather than on node dictionaries.
+
+Use accelerate to swap these implementations into a (specialized) feature
+set.
+"""
+
+from typing import (
+    Optional, List, Dict, Any, Callable, Sequence, Tuple, Union, Mapping,
+    Iterable)
+from collections import deque
+from functools import partial
+from statistics import StatisticsError
+import collections.abc
+
+import numpy as np
+from scipy import stats
+
+from neuron_morphology.constants import (
+    SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
+from neuron_morphology.morphology_arrays import MorphologyArrays
+from neuron_morphology.feature_extractor.data import (
+    MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.marked_feature import (
+    MarkedFeature, Feature)
+from neuron_morphology.feature_extractor.products import ProductRequest
+from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.statistics.overlap import (
+    calculate_coordinate_overlap_from_min_max)
+from neuron_morphology.features import intermediates
+from neuron_morphology.features import (
+    dimension as _dimension, intrinsic as _intrinsic, size as _size,
+    path as _path)
+from neuron_morphology.features.branching import bifurcations as _bifurcations
+from neuron_morphology.features.statistics import (
+    moments as _moments, overlap as _overlap)
+
+
+def _root_index(data: MorphologyLike, arrays: MorphologyArrays) -> int:
+    """ The index of the node reported by Morphology.get_root
+    """
+
+    morphology = get_morphology(data)
+    return arrays.index[morphology.node_id_cb(intermediates.root(data))]
+
+
+def _node_index(
+    data: MorphologyLike,
+    arrays: MorphologyArrays,
+    node: Optional[Dict]
+) -> Optional[int]:
+    """ The index of a node (as a dictionary), or None
+    """
+
+    if node is None:
+        return None
+    return arrays.index[get_morphology(data).node_id_cb(node)]
+
+
+def _coordinates(
+    data: MorphologyLike,
+    coord_type: COORD_TYPE,
+    node_types: Optional[List[int]]
+) -> np.ndarray:
+    return intermediates.coordinate_array(
+        data, coordinate_type=coord_type, node_types=node_types)
+
+
+def dimension(
+    data: MorphologyLike,
+    node_types: Optional[List] = None,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE,
+):
+    """ See neuron_morphology.features.dimension.dimension
+    """
+
+    coordinates = _coordinates(data, coord_type, node_types)
+    if len(coordinates) == 0:
+        nan_array = np.empty((3,))
+        nan_array[:] = np.nan
+
+        return {
+            'height': float('nan'),
+            'width': float('nan'),
+            'depth': float('nan'),
+            'min_xyz': nan_array,
+            'max_xyz': nan_array,
+            'bias_xyz': nan_array
+        }
+
+    arrays = intermediates.arrays(data)
+    coordinates = coordinates - arrays.xyz[_root_index(data, arrays)]
+
+    min_xyz = coordinates.min(axis=0)
+    max_xyz = coordinates.max(axis=0)
+    bias_xyz = np.absolute(np.absolute(max_xyz) - np.absolute(min_xyz))
+    size = max_xyz - min_xyz
+    return {
+        'width': size[0],
+        'height': size[1],
+        'depth': size[2],
+        'min_xyz': min_xyz,
+        'max_xyz': max_xyz,
+        'bias_xyz': bias_xyz
+    }
+
+
+def moments(
+    data: MorphologyLike,
+    node_types: Optional[List] = None,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE,
+):
+    """ See neuron_morphology.features.statistics.moments.moments
+    """
+
+    coordinates = _coordinates(data, coord_type, node_types)
+    if len(coordinates) == 0:
+        nan_array = np.empty((3,))
+        nan_array[:] = np.nan
+        return {
+            'mean': nan_array,
+            'std': nan_array,
+            'var': nan_array,
+            'skew': nan_array,
+            'kurt': nan_array
+        }
+
+    (_, _, mean, variance, skew, kurt) = stats.describe(coordinates, axis=0)
+    return {
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'var': variance,
+        'skew': skew,
+        'kurt': kurt
+    }
+
+
+def overlap(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None,
+    node_types_to_compare: Optional[List[int]] = None,
+    coord_type: COORD_TYPE = COORD_TYPE.NODE,
+    dimension: int = 1
+):
+    """ See neuron_morphology.features.statistics.overlap.overlap. As there,
+    comparisons are always made along the y axis.
+    """
+
+    coords_a = _coordinates(data, coord_type, node_types)
+    coords_b = _coordinates(data, coord_type, node_types_to_compare)
+
+    if len(coords_b) == 0:
+        above, overlapping, below = (-1, -1, -1)
+    else:
+        if len(coords_a) == 0:
+            # the reference implementation fails to index an empty list
+            raise IndexError("no coordinates to compare")
+
+        above, overlapping, below = calculate_coordinate_overlap_from_min_max(
+            coords_a, coords_b[:, 1].min(), coords_b[:, 1].max())
+
+    return {'above': above, 'overlap': overlapping, 'below': below}
+
+
+def num_nodes(data: MorphologyLike, node_types: Optional[List] = None):
+    """ See neuron_morphology.features.intrinsic.num_nodes
+    """
+
+    return len(intermediates.arrays(data).indices_by_types(node_types))
+
+
+def num_tips(data: MorphologyLike, node_types: Optional[List] = None):
+    """ See neuron_morphology.features.intrinsic.num_tips
+    """
+
+    return len(_coordinates(data, COORD_TYPE.TIP, node_types))
+
+
+def _children_by_types(
+    arrays: MorphologyArrays,
+    node_types: Optional[Sequence[int]]
+) -> List[List[int]]:
+    """ Each node's children, restricted to node_types (if provided)
+    """
+
+    if not node_types:
+        return arrays.children
+
+    allowed = set(node_types)
+    types = arrays.type_list
+    return [
+        [child for child in children if types[child] in allowed]
+        for children in arrays.children
+    ]
+
+
+def _breadth_first(start: int, children: List[List[int]]) -> Iterable[int]:
+    """ Yield node indices in breadth-first order
+    """
+
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        yield current
+        queue.extend(children[current])
+
+
+def num_branches(data: MorphologyLike, node_types: Optional[List] = None):
+    """ See neuron_morphology.features.intrinsic.num_branches
+    """
+
+    arrays = intermediates.arrays(data)
+    children = _children_by_types(arrays, node_types)
+
+    total = 0
+    for root in arrays.roots().tolist():
+        count = 0
+        for node in _breadth_first(root, children):
+            num_children = len(children[node])
+            if num_children > 1:
+                count += num_children + (num_children - 2)
+            elif count == 0:
+                count += 1
+        total += count
+    return total
+
+
+def mean_fragmentation(
+    data: MorphologyLike,
+    node_types: Optional[List] = None
+):
+    """ See neuron_morphology.features.intrinsic.mean_fragmentation
+    """
+
+    arrays = intermediates.arrays(data)
+    children = _children_by_types(arrays, node_types)
+
+    num_branches = 0
+    num_compartments = 0
+    for root in arrays.roots().tolist():
+        branches = 0
+        for node in _breadth_first(root, children):
+            num_children = len(children[node])
+            if num_children > 1:
+                branches += num_children + (num_children - 2)
+                num_compartments += num_children + (num_children - 2)
+            elif num_children == 1:
+                num_compartments += 1
+                if branches == 0:
+                    branches += 1
+
+        if branches == 0:
+            # the reference implementation reports a ratio for each root
+            raise ZeroDivisionError("division by zero")
+        num_branches += branches
+
+    return num_compartments / num_branches
+
+
+def max_branch_order(
+    data: MorphologyLike,
+    node_types: Optional[List] = None
+):
+    """ See neuron_morphology.features.intrinsic.max_branch_order
+    """
+
+    arrays = intermediates.arrays(data)
+    children = _children_by_types(arrays, node_types)
+
+    max_branches = 0
+    for root in arrays.roots().tolist():
+        stack = [(root, 0)]
+        while stack:
+            node, branches = stack.pop()
+            num_children = len(children[node])
+
+            if num_children > 1:
+                stack.extend((child, branches + 1) for child in children[node])
+            elif num_children == 1:
+                stack.append((children[node][0], max(branches, 1)))
+            elif branches > max_branches:
+                max_branches = branches
+
+    return max_branches
+
+
+def num_outer_bifurcations(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> int:
+    """ See neuron_morphology.features.branching.bifurcations.
+    num_outer_bifurcations
+    """
+
+    arrays = intermediates.arrays(data)
+    soma = intermediates.root(data)
+    soma_xyz = np.array([soma["x"], soma["y"], soma["z"]], dtype=float)
+
+    indices = arrays.indices_by_types(node_types)
+    distances = np.linalg.norm(arrays.xyz[indices] - soma_xyz, axis=1)
+
+    far = max(0.0, distances.max()) if len(distances) else 0.0
+    branching = arrays.num_children[indices] > 1
+    return int(np.count_nonzero(branching & (distances > far / 2.0)))
+
+
+def _mean_angle(
+    arrays: MorphologyArrays,
+    nodes: np.ndarray,
+    first: np.ndarray,
+    second: np.ndarray
+) -> float:
+    """ The mean angle, at each of nodes, between the vectors to first and
+    second. nan if there are no nodes.
+    """
+
+    if len(nodes) == 0:
+        return float('nan')
+
+    first_vec = arrays.xyz[first] - arrays.xyz[nodes]
+    second_vec = arrays.xyz[second] - arrays.xyz[nodes]
+
+    first_vec = first_vec / np.linalg.norm(first_vec, axis=1)[:, np.newaxis]
+    second_vec = second_vec / np.linalg.norm(second_vec, axis=1)[:, np.newaxis]
+
+    cosines = np.clip(np.sum(first_vec * second_vec, axis=1), -1.0, 1.0)
+    return float(np.arccos(cosines).sum() / len(nodes))
+
+
+def _bifurcations_and_children(
+    data: MorphologyLike,
+    node_types: Optional[List[int]]
+) -> Tuple[MorphologyArrays, np.ndarray, np.ndarray, np.ndarray]:
+    """ Find nodes of node_types with exactly two children, along with those
+    children
+    """
+
+    arrays = intermediates.arrays(data)
+    indices = arrays.indices_by_types(node_types)
+    nodes = indices[arrays.num_children[indices] == 2]
+
+    first = np.array(
+        [arrays.children[node][0] for node in nodes.tolist()], dtype=int)
+    second = np.array(
+        [arrays.children[node][1] for node in nodes.tolist()], dtype=int)
+
+    return arrays, nodes, first, second
+
+
+def mean_bifurcation_angle_local(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.branching.bifurcations.
+    mean_bifurcation_angle_local
+    """
+
+    arrays, nodes, first, second = _bifurcations_and_children(
+        data, node_types)
+    return _mean_angle(arrays, nodes, first, second)
+
+
+def _segment_ends(arrays: MorphologyArrays) -> np.ndarray:
+    """ For each node, the first node at or below it which does not have
+    exactly one child (i.e. the next branch point or tip)
+    """
+
+    order = [
+        node
+        for root in arrays.roots().tolist()
+        for node in _breadth_first(root, arrays.children)
+    ]
+
+    ends = np.arange(len(arrays), dtype=int)
+    for node in reversed(order):
+        if arrays.num_children[node] == 1:
+            ends[node] = ends[arrays.children[node][0]]
+    return ends
+
+
+def mean_bifurcation_angle_remote(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.branching.bifurcations.
+    mean_bifurcation_angle_remote
+    """
+
+    arrays, nodes, first, second = _bifurcations_and_children(
+        data, node_types)
+    ends = _segment_ends(arrays)
+    return _mean_angle(arrays, nodes, ends[first], ends[second])
+
+
+def total_length(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.size.total_length
+    """
+
+    return _size.batched_total_length(data, [{"node_types": node_types}])[0]
+
+
+def total_surface_area(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.size.total_surface_area
+    """
+
+    return _size.batched_total_surface_area(
+        data, [{"node_types": node_types}])[0]
+
+
+def total_volume(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.size.total_volume
+    """
+
+    return _size.batched_total_volume(data, [{"node_types": node_types}])[0]
+
+
+def mean_diameter(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.size.mean_diameter
+    """
+
+    arrays = intermediates.arrays(data)
+    radii = arrays.radius[arrays.indices_by_types(node_types)]
+    if len(radii) == 0:
+        raise StatisticsError("mean requires at least one data point")
+    return 2 * float(radii.mean())
+
+
+def mean_parent_daughter_ratio(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.size.mean_parent_daughter_ratio
+    """
+
+    arrays = intermediates.arrays(data)
+    children = arrays.has_parent()
+    parents = arrays.parent[children]
+
+    if node_types is not None:
+        included = np.isin(arrays.types[children], node_types) \
+            & np.isin(arrays.types[parents], node_types)
+        children = children[included]
+        parents = parents[included]
+
+    if len(children) == 0 or np.any(arrays.radius[children] == 0):
+        raise ZeroDivisionError("float division by zero")
+
+    ratios = arrays.radius[parents] / arrays.radius[children]
+    return float(ratios.sum()) / len(ratios)
+
+
+def max_euclidean_distance(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.size.max_euclidean_distance
+    """
+
+    arrays = intermediates.arrays(data)
+    soma = arrays.xyz[_root_index(data, arrays)]
+    nodes = arrays.xyz[arrays.indices_by_types(node_types)]
+
+    return float(np.linalg.norm(nodes - soma, axis=1).max())
+
+
+class _PathCalculator:
+
+    def __init__(
+        self,
+        arrays: MorphologyArrays,
+        node_types: Optional[List[int]]
+    ):
+        """ Array-backed equivalent of the path-tracing helpers in
+        neuron_morphology.features.path. Results are memoized by starting
+        node.
+        """
+
+        self.arrays = arrays
+        self.node_types = node_types
+        self._max_paths: Dict[int, float] = {}
+
+    def _compartment_length(self, node: int, node_types) -> Optional[float]:
+        """ Length of the compartment ending at node, or None if there is no
+        such compartment among node_types. See
+        Morphology.get_compartment_for_node.
+        """
+
+        arrays = self.arrays
+        parent = int(arrays.parent[node])
+        if parent < 0:
+            return None
+        if node_types and (
+            arrays.type_list[parent] not in node_types
+            or arrays.type_list[node] not in node_types
+        ):
+            return None
+        return arrays.distance(parent, node)
+
+    def max_path(self, start: int) -> float:
+        """ See path._calculate_max_path_distance
+        """
+
+        if start in self._max_paths:
+            return self._max_paths[start]
+
+        arrays = self.arrays
+        node_types = self.node_types
+        if node_types is None:
+            node_types = [SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE]
+
+        total = 0.0
+        current = start
+        while arrays.children[current]:
+            children = arrays.children[current]
+
+            if len(children) == 1:
+                if arrays.type_list[current] != SOMA \
+                        and arrays.type_list[current] in node_types:
+                    length = self._compartment_length(current, node_types)
+                    if length is not None:
+                        total += length
+                current = children[0]
+
+            else:
+                max_sub_dist = 0.0
+                for child in arrays.children_by_types(current, node_types):
+                    dist = self.max_path(child)
+                    if dist > max_sub_dist:
+                        max_sub_dist = dist
+                total += max_sub_dist
+                break
+
+        if arrays.type_list[current] != SOMA:
+            length = self._compartment_length(current, node_types)
+            if length is not None:
+                total += length
+
+        self._max_paths[start] = total
+        return total
+
+    def roots_for_analysis(self, root: Optional[int]) -> List[int]:
+        """ See Morphology.get_roots_for_analysis
+        """
+
+        arrays = self.arrays
+        if root is not None:
+            return arrays.children_by_types(root, self.node_types)
+
+        nodes = arrays.indices_by_types(self.node_types).tolist()
+        selected = set(nodes)
+        return [
+            node for node in nodes
+            if int(arrays.parent[node]) not in selected
+        ]
+
+    def contraction(self, reference: int, root: int) -> Tuple[float, float]:
+        """ See path._calculate_mean_contraction
+        """
+
+        arrays = self.arrays
+        path_dist = arrays.distance(reference, root)
+        tot_path = 0.0
+        tot_euc = 0.0
+
+        children = arrays.children_by_types(root, self.node_types)
+        while len(children) > 0:
+            if len(children) == 1:
+                path_dist += arrays.distance(root, children[0])
+                root = children[0]
+                children = arrays.children_by_types(root, self.node_types)
+            else:
+                for child in children:
+                    euc, path = self.contraction(root, child)
+                    tot_euc += euc
+                    tot_path += path
+                break
+
+        euc_dist = arrays.distance(root, reference)
+        return tot_euc + euc_dist, tot_path + path_dist
+
+
+def max_path_distance(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.path.max_path_distance
+    """
+
+    arrays = intermediates.arrays(data)
+    calculator = _PathCalculator(arrays, node_types)
+    root = _node_index(data, arrays, intermediates.root(data))
+
+    max_path = 0.0
+    for node in calculator.roots_for_analysis(root):
+        path = calculator.max_path(node)
+        if path > max_path:
+            max_path = path
+    return max_path
+
+
+def early_branch_path(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None,
+    soma: Optional[Dict] = None
+) -> float:
+    """ See neuron_morphology.features.path.early_branch_path
+    """
+
+    arrays = intermediates.arrays(data)
+    calculator = _PathCalculator(arrays, node_types)
+    soma = soma or intermediates.root(data)
+
+    path_len = calculator.max_path(_node_index(data, arrays, soma))
+    if path_len == 0:
+        return 0.0
+
+    longest_short = 0.0
+    for node in arrays.indices_by_types(node_types).tolist():
+        if len(arrays.children_by_types(node, node_types)) < 2:
+            continue
+
+        current_short = min(
+            calculator.max_path(child) for child in arrays.children[node])
+        longest_short = max(longest_short, current_short)
+
+    return longest_short / path_len
+
+
+def mean_contraction(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> float:
+    """ See neuron_morphology.features.path.mean_contraction
+    """
+
+    arrays = intermediates.arrays(data)
+    calculator = _PathCalculator(arrays, node_types)
+    root = _node_index(data, arrays, intermediates.root(data))
+
+    euc_dist = 0.0
+    path_dist = 0.0
+    for ref in calculator.roots_for_analysis(root):
+        children = arrays.children_by_types(ref, node_types)
+        while len(children) == 1:
+            ref = children[0]
+            children = arrays.children_by_types(ref, node_types)
+
+        for child in children:
+            euc, path = calculator.contraction(ref, child)
+            euc_dist += euc
+            path_dist += path
+
+    if path_dist == 0.0:
+        return float('nan')
+    return 1.0 * euc_dist / path_dist
+
+
+# maps the underlying callables of reference features to their fast
+# equivalents
+FAST_IMPLEMENTATIONS: Dict[Callable, Callable] = {
+    _dimension.dimension.feature: dimension,
+    _moments.moments.feature: moments,
+    _overlap.overlap.feature: overlap,
+    _intrinsic.num_nodes.feature: num_nodes,
+    _intrinsic.num_tips.feature: num_tips,
+    _intrinsic.num_branches.feature: num_branches,
+    _intrinsic.mean_fragmentation.feature: mean_fragmentation,
+    _intrinsic.max_branch_order.feature: max_branch_order,
+    _bifurcations.num_outer_bifurcations.feature: num_outer_bifurcations,
+    _bifurcations.mean_bifurcation_angle_local.feature:
+        mean_bifurcation_angle_local,
+    _bifurcations.mean_bifurcation_angle_remote.feature:
+        mean_bifurcation_angle_remote,
+    _size.total_length.feature: total_length,
+    _size.total_surface_area.feature: total_surface_area,
+    _size.total_volume.feature: total_volume,
+    _size.mean_diameter.feature: mean_diameter,
+    _size.mean_parent_daughter_ratio.feature: mean_parent_daughter_ratio,
+    _size.max_euclidean_distance.feature: max_euclidean_distance,
+    _path.max_path_distance.feature: max_path_distance,
+    _path.early_branch_path.feature: early_branch_path,
+    _path.mean_contraction.feature: mean_contraction,
+}
+
+
+def accelerate_feature(feature: Feature) -> MarkedFeature:
+    """ Replace a (possibly specialized) feature's underlying callable with
+    its fast equivalent, if there is one. The name, marks and bound
+    arguments are retained.
+
+    Parameters
+    ----------
+    feature : the reference feature
+
+    Returns
+    -------
+    A new feature using the fast implementation, or the input feature if
+        none is available.
+
+    """
+
+    feature = MarkedFeature.ensure(feature)
+
+    base = feature.feature
+    args: Tuple = ()
+    keywords: Dict[str, Any] = {}
+    if isinstance(base, partial):
+        base, args, keywords = base.func, base.args, base.keywords
+
+    fast = FAST_IMPLEMENTATIONS.get(base)
+    if fast is None:
+        return feature
+
+    accelerated = feature.deepcopy()
+    accelerated.feature = partial(fast, *args, **keywords)
+    accelerated.products = [ProductRequest(intermediates.arrays, {})]
+    accelerated.batched = None
+    return accelerated
+
+
+def accelerate(
+    features: Iterable[Union[Feature, Mapping[Any, Feature], Iterable[Feature]]]
+) -> List[MarkedFeature]:
+    """ Apply accelerate_feature to a collection of features, structured as
+    accepted by FeatureExtractor.register_features.
+
+    Returns
+    -------
+    A flat list of features
+
+    """
+
+    accelerated: List[MarkedFeature] = []
+    for feature in features:
+        if isinstance(feature, collections.abc.Mapping):
+            members = list(feature.values())
+        elif isinstance(feature, collections.abc.Iterable):
+            members = list(feature)
+        else:
+            members = [feature]
+
+        accelerated.extend(accelerate_feature(member) for member in members)
+    return accelerated
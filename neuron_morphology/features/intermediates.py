@@ -0,0 +1,204 @@
+""" Intermediate calculations which are shared by many features. Features
+should obtain these by calling the products defined here (and declare them
+using neuron_morphology.feature_extractor.products.consumes), so that they are
+computed only once per feature extraction run.
+"""
+
+from typing import Optional, List, Dict, Sequence
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.morphology_arrays import MorphologyArrays
+from neuron_morphology.constants import SOMA
+from neuron_morphology.feature_extractor.products import Product
+from neuron_morphology.features.statistics.coordinates import (
+    COORD_TYPE, get_coordinates)
+
+
+def compartments_by_types(
+    morphology: Morphology,
+    node_types: Optional[List[int]] = None
+) -> List[Sequence[Dict]]:
+    """ List the compartments (parent, child node pairs) whose child is one
+    of node_types and whose parent is also one of node_types.
+
+    Parameters
+    ----------
+    morphology : the reconstruction whose compartments will be listed
+    node_types : restrict to compartments involving these types. If None,
+        all compartments are listed.
+
+    Returns
+    -------
+    a list of [parent, child] compartments
+
+    """
+
+    nodes = morphology.get_node_by_types(node_types)
+    return morphology.get_compartments(nodes, node_types)
+
+
+def lengths_of_compartments(
+    morphology: Morphology,
+    compartments: List[Sequence[Dict]]
+) -> np.ndarray:
+    """ Calculate the length of each of a list of compartments
+
+    Parameters
+    ----------
+    morphology : the reconstruction containing these compartments
+    compartments : a list of [parent, child] compartments
+
+    Returns
+    -------
+    an array of compartment lengths, in the same order as compartments
+
+    """
+
+    return np.array(
+        [morphology.get_compartment_length(compartment)
+         for compartment in compartments],
+        dtype=float
+    )
+
+
+def tabulate_compartments(morphology: Morphology) -> Dict[str, np.ndarray]:
+    """ Describe every compartment in a reconstruction as a set of aligned 
+    arrays, for use by vectorized (batched) features.
+
+    Parameters
+    ----------
+    morphology : the reconstruction whose compartments will be tabulated
+
+    Returns
+    -------
+    A dictionary of arrays, each with one element per compartment:
+        parent_type, child_type : node types of each end
+        parent_radius, child_radius : radii of each end
+        length : compartment length
+        from_soma_root : True where the parent is a soma root (such 
+            compartments are excluded from total_length)
+
+    """
+
+    compartments = morphology.get_compartments()
+
+    def column(index, key, dtype=float):
+        return np.array(
+            [compartment[index][key] for compartment in compartments], 
+            dtype=dtype
+        ).reshape((len(compartments),))
+
+    parent_xyz = np.array([
+        [parent["x"], parent["y"], parent["z"]] 
+        for parent, _ in compartments
+    ], dtype=float).reshape((-1, 3))
+    child_xyz = np.array([
+        [child["x"], child["y"], child["z"]] 
+        for _, child in compartments
+    ], dtype=float).reshape((-1, 3))
+
+    return {
+        "parent_type": column(0, "type", int),
+        "child_type": column(1, "type", int),
+        "parent_radius": column(0, "radius"),
+        "child_radius": column(1, "radius"),
+        "length": np.linalg.norm(child_xyz - parent_xyz, axis=1),
+        "from_soma_root": np.array([
+            parent["type"] == SOMA and morphology.parent_of(parent) is None
+            for parent, _ in compartments
+        ], dtype=bool).reshape((len(compartments),))
+    }
+
+
+def compartment_weights(
+    table: Dict[str, np.ndarray],
+    node_types: Optional[List[int]] = None
+) -> np.ndarray:
+    """ Determine how many times each tabulated compartment appears in 
+    compartments_by_types(morphology, node_types). This is 0 or 1, except 
+    when node_types contains repeats.
+
+    Parameters
+    ----------
+    table : as produced by tabulate_compartments
+    node_types : the node types used to select compartments
+
+    Returns
+    -------
+    An integer array with one element per compartment
+
+    """
+
+    if not node_types:
+        return np.ones(table["child_type"].shape, dtype=int)
+
+    weights = np.zeros(table["child_type"].shape, dtype=int)
+    for node_type in node_types:
+        weights += table["child_type"] == node_type
+    return weights * np.isin(table["parent_type"], node_types)
+
+
+def coordinates_from_arrays(
+    morphology: Morphology,
+    arrays: MorphologyArrays,
+    coordinate_type: COORD_TYPE = COORD_TYPE.NODE,
+    node_types: Optional[List[int]] = None
+) -> np.ndarray:
+    """ An array-backed equivalent of 
+    neuron_morphology.features.statistics.coordinates.get_coordinates. 
+    Coordinates are reported in the same order.
+
+    Parameters
+    ----------
+    morphology : the reconstruction (unused; arrays describes it)
+    arrays : array-backed node data for this reconstruction
+    coordinate_type : which points to report
+    node_types : restrict to points of these types. As in get_coordinates, 
+        this has no effect on compartment coordinates.
+
+    Returns
+    -------
+    A (number of points, 3) array
+
+    """
+
+    if coordinate_type is COORD_TYPE.COMPARTMENT:
+        children = arrays.has_parent()
+        return (arrays.xyz[arrays.parent[children]] + arrays.xyz[children]) \
+            * 0.5
+
+    if coordinate_type is COORD_TYPE.NODE:
+        return arrays.xyz[arrays.indices_by_types(node_types)]
+
+    indices = arrays.indices_by_types_or_non_soma(node_types)
+    if coordinate_type is COORD_TYPE.TIP:
+        indices = indices[arrays.num_children[indices] == 0]
+    elif coordinate_type is COORD_TYPE.BIFURCATION:
+        indices = indices[arrays.num_children[indices] > 1]
+    else:
+        raise ValueError(f"unrecognized coordinate type: {coordinate_type}")
+
+    return arrays.xyz[indices]
+
+
+root = Product("root", Morphology.get_root)
+roots = Product("roots", Morphology.get_roots)
+soma = Product("soma", Morphology.get_soma)
+nodes = Product("nodes", Morphology.get_node_by_types)
+coordinates = Product("coordinates", get_coordinates)
+compartments = Product("compartments", compartments_by_types)
+compartment_lengths = Product(
+    "compartment_lengths",
+    lengths_of_compartments,
+    requires={"compartments": compartments}
+)
+compartment_table = Product("compartment_table", tabulate_compartments)
+adjacency = Product("adjacency", Morphology.to_sparse_adjacency)
+arrays = Product("arrays", MorphologyArrays.from_morphology)
+coordinate_array = Product(
+    "coordinate_array",
+    coordinates_from_arrays,
+    requires={"arrays": arrays}
+)
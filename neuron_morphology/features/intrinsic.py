@@ -1,14 +1,19 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from functools import partial
+from collections import Counter
 
-from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.constants import SOMA
+from neuron_morphology.feature_extractor.data import Data, get_morphology
+from neuron_morphology.feature_extractor.products import consumes
 from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features import intermediates
 
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.marked_feature import marked, batches
 from neuron_morphology.feature_extractor.mark import Intrinsic
 
 
 @marked(Intrinsic)
+@consumes(intermediates.coordinates, coordinate_type=COORD_TYPE.TIP)
 def num_tips(
         data: Data,
         node_types: Optional[List] = None,
@@ -25,12 +30,13 @@ def num_tips(
 
     """
     # Alternative method:
-    num_tips = len(COORD_TYPE.TIP.get_coordinates(data.morphology,
-                                                  node_types=node_types))
+    num_tips = len(intermediates.coordinates(
+        data, coordinate_type=COORD_TYPE.TIP, node_types=node_types))
     return num_tips
 
 
 @marked(Intrinsic)
+@consumes(intermediates.nodes)
 def num_nodes(
         data: Data,
         node_types: Optional[List] = None,
@@ -46,10 +52,79 @@ def num_nodes(
         node_types: a list of node types (see neuron_morphology constants)
 
     """
-    num_nodes = len(data.morphology.get_node_by_types(node_types))
+    num_nodes = len(intermediates.nodes(data, node_types=node_types))
     return num_nodes
 
 
+def count_by_types(
+        type_counts: Counter,
+        node_types: Optional[List] = None,
+        default_types: Optional[List] = None,
+        ):
+    """
+        Helper for the batched counting features. Sum per-type counts over 
+        node_types, counting repeated types repeatedly (as 
+        Morphology.get_node_by_types does).
+
+        Parameters
+        ----------
+
+        type_counts: maps node types to counts
+
+        node_types: sum over these types. If empty or None, sum over 
+            default_types (or all types if that is also None)
+
+    """
+    if not node_types:
+        if default_types is None:
+            return sum(type_counts.values())
+        node_types = default_types
+    return sum(type_counts[node_type] for node_type in node_types)
+
+
+@batches(num_tips)
+def batched_num_tips(
+        data: Data,
+        variants: List[Dict[str, Any]],
+        ):
+    """
+        Calculate num_tips for several node type specializations, using a 
+        single pass over the reconstruction's nodes.
+
+    """
+    morphology = get_morphology(data)
+    tip_counts = Counter(
+        node['type'] for node in morphology.nodes()
+        if not morphology.get_children(node))
+    non_soma_types = [
+        node_type for node_type in tip_counts if node_type != SOMA]
+
+    return [
+        count_by_types(
+            tip_counts, variant.get("node_types"), non_soma_types)
+        for variant in variants
+    ]
+
+
+@batches(num_nodes)
+def batched_num_nodes(
+        data: Data,
+        variants: List[Dict[str, Any]],
+        ):
+    """
+        Calculate num_nodes for several node type specializations, using a 
+        single pass over the reconstruction's nodes.
+
+    """
+    type_counts = Counter(
+        node['type'] for node in get_morphology(data).nodes())
+
+    return [
+        count_by_types(type_counts, variant.get("node_types"))
+        for variant in variants
+    ]
+
+
 def child_ids_by_type(node_id, morphology, node_types=None):
     """ Helper function for the traversal functions"""
     node = morphology.node_by_id(node_id)
@@ -102,6 +177,7 @@ def calculate_branches_from_root(morphology,
 
 
 @marked(Intrinsic)
+@consumes(intermediates.roots)
 def num_branches(
         data: Data,
         node_types: Optional[List] = None,
@@ -118,7 +194,7 @@ def num_branches(
 
     """
     morphology = data.morphology
-    roots = morphology.get_roots()
+    roots = intermediates.roots(data)
     num_branches = 0
     for root in roots:
         num_branches += calculate_branches_from_root(
@@ -179,6 +255,7 @@ def calculate_mean_fragmentation_from_root(morphology,
 
 
 @marked(Intrinsic)
+@consumes(intermediates.roots)
 def mean_fragmentation(
         data: Data,
         node_types: Optional[List] = None,
@@ -195,7 +272,7 @@ def mean_fragmentation(
 
     """
     morphology = data.morphology
-    roots = morphology.get_roots()
+    roots = intermediates.roots(data)
     num_branches = 0
     num_compartments = 0
     for root in roots:
@@ -268,6 +345,7 @@ def calculate_max_branch_order_from_root(morphology,
 
 
 @marked(Intrinsic)
+@consumes(intermediates.roots)
 def max_branch_order(
         data: Data,
         node_types: Optional[List] = None,
@@ -284,7 +362,7 @@ def max_branch_order(
 
     """
     morphology = data.morphology
-    roots = morphology.get_roots()
+    roots = intermediates.roots(data)
     max_branch_order = 0
     for root in roots:
         local_max = calculate_max_branch_order_from_root(
@@ -7,6 +7,8 @@ from neuron_morphology.feature_extractor.mark import RequiresRoot, Geometric
 from neuron_morphology.feature_extractor.marked_feature import marked
 from neuron_morphology.feature_extractor.data import (
     MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.products import consumes
+from neuron_morphology.features import intermediates
 
 
 # TODO: There is a breadth_first_traversal method defined on Morphology. We 
@@ -76,6 +78,7 @@ def calculate_max_path_distance(morphology, root=None, node_types=None):
 
 @marked(RequiresRoot)
 @marked(Geometric)
+@consumes(intermediates.root)
 def max_path_distance(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None 
@@ -101,13 +104,14 @@ def max_path_distance(
     morphology = get_morphology(data)
     return calculate_max_path_distance(
         morphology,
-        morphology.get_root(),
+        intermediates.root(data),
         node_types
     )
 
 
 @marked(RequiresRoot)
 @marked(Geometric)
+@consumes(intermediates.root)
 def early_branch_path(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None,
@@ -134,7 +138,7 @@ def early_branch_path(
     """
 
     morphology = get_morphology(data)
-    soma = soma or morphology.get_root()
+    soma = soma or intermediates.root(data)
 
     path_len = _calculate_max_path_distance(morphology, soma, node_types)
     if path_len == 0:
@@ -238,6 +242,7 @@ def calculate_mean_contraction(morphology, root=None, node_types=None):
 
 @marked(Geometric)
 @marked(RequiresRoot)
+@consumes(intermediates.root)
 def mean_contraction(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None 
@@ -262,6 +267,6 @@ def mean_contraction(
     morphology = get_morphology(data)
     return calculate_mean_contraction(
         morphology,
-        morphology.get_root(),
+        intermediates.root(data),
         node_types
     )
\ No newline at end of file
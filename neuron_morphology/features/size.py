@@ -2,16 +2,23 @@ from typing import Optional, List, Union, Dict, Any
 from statistics import mean
 from collections import defaultdict
 from functools import partial
+import math
+
+import numpy as np
 
 from neuron_morphology.morphology import Morphology
 from neuron_morphology.constants import SOMA
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, batches)
 from neuron_morphology.feature_extractor.mark import (
     Geometric, RequiresRadii, RequiresRoot)
 from neuron_morphology.feature_extractor.data import (
     MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.products import consumes
+from neuron_morphology.features import intermediates
 
 @marked(Geometric)
+@consumes(intermediates.compartment_lengths)
 def total_length(
     data: MorphologyLike, 
     node_types: Optional[List[int]] = None
@@ -41,22 +48,23 @@ def total_length(
 
     morphology = get_morphology(data)
 
-    nodes = morphology.get_node_by_types(node_types)
-    compartment_list = morphology.get_compartments(nodes, node_types)
+    compartment_list = intermediates.compartments(data, node_types=node_types)
+    lengths = intermediates.compartment_lengths(data, node_types=node_types)
 
     total = 0.0
-    for compartment in compartment_list:
+    for compartment, length in zip(compartment_list, lengths):
         first_node_in_compartment = compartment[0]
         if first_node_in_compartment['type'] is SOMA \
             and not morphology.parent_of(first_node_in_compartment):
             continue
-        total += morphology.get_compartment_length(compartment)
+        total += length
 
     return total
 
 
 @marked(RequiresRadii)
 @marked(Geometric)
+@consumes(intermediates.compartments)
 def total_surface_area(
     data: MorphologyLike, 
     node_types: Optional[List[int]] = None
@@ -79,14 +87,14 @@ def total_surface_area(
     """
 
     morphology: Morphology = get_morphology(data)
-    nodes = morphology.get_node_by_types(node_types)
-    compartments = morphology.get_compartments(nodes, node_types)
+    compartments = intermediates.compartments(data, node_types=node_types)
 
     return sum(map(morphology.get_compartment_surface_area, compartments))
 
 
 @marked(RequiresRadii)
 @marked(Geometric)
+@consumes(intermediates.compartments)
 def total_volume(
     data: MorphologyLike, 
     node_types: Optional[List[int]] = None
@@ -108,13 +116,94 @@ def total_volume(
     """
     
     morphology = get_morphology(data)
-    nodes = morphology.get_node_by_types(node_types)
-    compartments = morphology.get_compartments(nodes, node_types)
+    compartments = intermediates.compartments(data, node_types=node_types)
 
     return sum(map(morphology.get_compartment_volume, compartments))
 
 
+def sum_over_compartment_variants(
+    variants: List[Dict[str, Any]],
+    values: np.ndarray,
+    table: Dict[str, np.ndarray]
+) -> List[float]:
+    """ Helper for batched compartment features. For each variant, sum 
+    per-compartment values over the compartments selected by that variant's 
+    node_types.
+
+    Parameters
+    ----------
+    variants : keyword arguments of each specialization
+    values : one per compartment, aligned with table
+    table : as produced by intermediates.compartment_table
+
+    Returns
+    -------
+    A list of sums, one per variant
+
+    """
+
+    return [
+        float(np.dot(
+            intermediates.compartment_weights(
+                table, variant.get("node_types")),
+            values
+        ))
+        for variant in variants
+    ]
+
+
+@batches(total_length)
+def batched_total_length(
+    data: MorphologyLike,
+    variants: List[Dict[str, Any]]
+) -> List[float]:
+    """ Calculate total_length for several node type specializations at 
+    once, from a single table of compartment lengths.
+    """
+
+    table = intermediates.compartment_table(data)
+    lengths = np.where(table["from_soma_root"], 0.0, table["length"])
+    return sum_over_compartment_variants(variants, lengths, table)
+
+
+@batches(total_surface_area)
+def batched_total_surface_area(
+    data: MorphologyLike,
+    variants: List[Dict[str, Any]]
+) -> List[float]:
+    """ Calculate total_surface_area for several node type specializations 
+    at once. See Morphology.get_compartment_surface_area.
+    """
+
+    table = intermediates.compartment_table(data)
+    radius_diff = table["child_radius"] - table["parent_radius"]
+    radius_sum = table["child_radius"] + table["parent_radius"]
+
+    slant_height = np.sqrt(radius_diff ** 2 + table["length"] ** 2)
+    areas = math.pi * radius_sum * slant_height
+    return sum_over_compartment_variants(variants, areas, table)
+
+
+@batches(total_volume)
+def batched_total_volume(
+    data: MorphologyLike,
+    variants: List[Dict[str, Any]]
+) -> List[float]:
+    """ Calculate total_volume for several node type specializations at 
+    once. See Morphology.get_compartment_volume.
+    """
+
+    table = intermediates.compartment_table(data)
+    first_rad = table["parent_radius"]
+    second_rad = table["child_radius"]
+
+    volumes = (math.pi * table["length"] / 3) * \
+        (first_rad ** 2 + first_rad * second_rad + second_rad ** 2)
+    return sum_over_compartment_variants(variants, volumes, table)
+
+
 @marked(RequiresRadii)
+@consumes(intermediates.nodes)
 def mean_diameter(
     data: MorphologyLike, 
     node_types: Optional[List[int]] = None
@@ -133,11 +222,8 @@ def mean_diameter(
 
     """
 
-    morphology = get_morphology(data)
-
-    return 2 * mean(
-        node["radius"] for node in morphology.get_node_by_types(node_types)
-    )
+    nodes = intermediates.nodes(data, node_types=node_types)
+    return 2 * mean(node["radius"] for node in nodes)
 
 
 
@@ -177,6 +263,7 @@ def parent_daughter_ratio_visitor(
     
 
 @marked(RequiresRadii)
+@consumes(intermediates.roots)
 def mean_parent_daughter_ratio(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None
@@ -200,7 +287,7 @@ def mean_parent_daughter_ratio(
     """
 
     morphology = get_morphology(data)
-    roots = morphology.get_roots()
+    roots = intermediates.roots(data)
     
     counters: Dict[str, int] = defaultdict(lambda *a, **k: 0)
     visitor = partial(
@@ -221,6 +308,8 @@ def mean_parent_daughter_ratio(
 
 @marked(RequiresRoot)
 @marked(Geometric)
+@consumes(intermediates.root)
+@consumes(intermediates.nodes)
 def max_euclidean_distance(
     data: MorphologyLike,
     node_types: Optional[List[int]] = None
@@ -242,9 +331,7 @@ def max_euclidean_distance(
     """
 
     morphology = get_morphology(data)
-    soma = morphology.get_root()
+    soma = intermediates.root(data)
+    nodes = intermediates.nodes(data, node_types=node_types)
 
-    return max(
-        morphology.euclidean_distance(soma, node)
-        for node in morphology.get_node_by_types(node_types)
-    )
+    return max(morphology.euclidean_distance(soma, node) for node in nodes)
@@ -17,6 +17,8 @@ from neuron_morphology.feature_extractor.mark import (
     Geometric
 )
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.products import consumes
+from neuron_morphology.features import intermediates
 from neuron_morphology.constants import (
     SOMA, AXON, BASAL_DENDRITE, APICAL_DENDRITE
 )
@@ -33,6 +35,7 @@ __all__ = [
 
 @marked(Geometric)
 @marked(RequiresRoot)
+@consumes(intermediates.soma)
 def calculate_soma_surface(data: Data) -> float:
 
     """
@@ -50,7 +53,7 @@ def calculate_soma_surface(data: Data) -> float:
 
     """
 
-    soma = data.morphology.get_soma()
+    soma = intermediates.soma(data)
     return 4.0 * math.pi * soma['radius'] * soma['radius']
 
 
@@ -102,6 +105,8 @@ def calculate_soma_features(data: Data):
 @marked(Geometric)
 @marked(RequiresSoma)
 @marked(RequiresRoot)
+@consumes(intermediates.nodes)
+@consumes(intermediates.soma)
 def calculate_stem_exit_and_distance(data: Data, node_types: Optional[List[int]], z_scale=3.0):
     """
         Returns the relative radial position (stem_exit) on the soma where the
@@ -132,12 +137,12 @@ def calculate_stem_exit_and_distance(data: Data, node_types: Optional[List[int]]
 
     # find axon node, get its tree ID, fetch that tree, and see where
     #   it connects to the soma radially
-    nodes = data.morphology.get_node_by_types(node_types)
+    nodes = intermediates.nodes(data, node_types=node_types)
     tree_root = None
     stem_distance = 0
     stem_exit = 0
 
-    soma = data.morphology.get_soma()
+    soma = intermediates.soma(data)
 
     # find all root nodes
     root_nodes = []
@@ -175,6 +180,7 @@ def calculate_stem_exit_and_distance(data: Data, node_types: Optional[List[int]]
 
 @marked(RequiresSoma)
 @marked(RequiresRoot)
+@consumes(intermediates.soma)
 def calculate_number_of_stems(data: Data, node_types: Optional[List[int]]):
 
     """
@@ -195,11 +201,13 @@ def calculate_number_of_stems(data: Data, node_types: Optional[List[int]]):
 
     """
 
-    soma = data.morphology.get_soma()
+    soma = intermediates.soma(data)
     return len(data.morphology.children_of(soma))
 
 @marked(Geometric)
 @marked(RequiresRoot)
+@consumes(intermediates.root)
+@consumes(intermediates.nodes)
 def soma_percentile(data: Data,
                     node_types: Optional[List[int]],
                     symmetrize_xz: bool = True):
@@ -226,10 +234,10 @@ def soma_percentile(data: Data,
         percentiles: array of x, y, and z percentiles
 
     """
-    soma_node = data.morphology.get_root()
+    soma_node = intermediates.root(data)
     soma_coord = np.asarray([soma_node['x'], soma_node['y'], soma_node['z']])
 
-    nodes = data.morphology.get_node_by_types(node_types=node_types)
+    nodes = intermediates.nodes(data, node_types=node_types)
     coords = np.asarray([[node['x'], node['y'], node['z']] for node in nodes])
 
     num_less_than = coords < soma_coord
@@ -4,13 +4,16 @@ import numpy as np
 from scipy import stats
 
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.products import consumes, argument
 from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features import intermediates
 
 from neuron_morphology.feature_extractor.marked_feature import marked
 from neuron_morphology.feature_extractor.mark import Geometric
 
 
 @marked(Geometric)
+@consumes(intermediates.coordinates, coordinate_type=argument("coord_type"))
 def moments(data: Data,
             node_types: Optional[List] = None,
             coord_type: COORD_TYPE = COORD_TYPE.NODE,
@@ -29,8 +32,8 @@ def moments(data: Data,
             (see neuron_morphology.features.statistics.coordinates for options)
     """
 
-    coordinates = coord_type.get_coordinates(
-                    data.morphology, node_types=node_types)
+    coordinates = intermediates.coordinates(
+        data, coordinate_type=coord_type, node_types=node_types)
     if not coordinates:
         nan_array = np.empty((3,))
         nan_array[:] = np.nan
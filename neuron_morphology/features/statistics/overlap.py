@@ -3,7 +3,9 @@ from typing import Optional, List
 import numpy as np
 
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.products import consumes, argument
 from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features import intermediates
 
 from neuron_morphology.feature_extractor.marked_feature import marked
 from neuron_morphology.feature_extractor.mark import Geometric
@@ -81,6 +83,12 @@ def calculate_coordinate_overlap(coordinates_a,
 
 
 @marked(Geometric)
+@consumes(intermediates.coordinates, coordinate_type=argument("coord_type"))
+@consumes(
+    intermediates.coordinates,
+    coordinate_type=argument("coord_type"),
+    node_types=argument("node_types_to_compare")
+)
 def overlap(data: Data,
             node_types: Optional[List[int]] = None,
             node_types_to_compare: Optional[List[int]] = None,
@@ -109,8 +117,10 @@ def overlap(data: Data,
         dimension: dimension to compare (0, 1, 2 for x, y, z), default 1 (y)
 
     """
-    coords_a = coord_type.get_coordinates(data.morphology, node_types)
-    coords_b = coord_type.get_coordinates(data.morphology, node_types_to_compare)
+    coords_a = intermediates.coordinates(
+        data, coordinate_type=coord_type, node_types=node_types)
+    coords_b = intermediates.coordinates(
+        data, coordinate_type=coord_type, node_types=node_types_to_compare)
 
     overlap_features = calculate_coordinate_overlap(coords_a,
                                                     coords_b,
@@ -0,0 +1,180 @@
+""" Helpers for running scipy.sparse.csgraph algorithms on morphologies. These
+build on Morphology.to_sparse_adjacency and translate between node ids and
+matrix indices.
+"""
+
+from typing import Dict, List, Hashable, Optional, Sequence, Tuple, Iterable
+
+import numpy as np
+from scipy.sparse import csgraph
+
+from neuron_morphology.morphology import Morphology
+
+
+def node_indices(morphology: Morphology) -> Dict[Hashable, int]:
+    """ Build a lookup from node ids to row/column indices of the morphology's
+    sparse adjacency matrix.
+    """
+
+    return {node_id: ii for ii, node_id in enumerate(morphology.node_ids())}
+
+
+def indices_to_node_ids(
+    morphology: Morphology,
+    indices: Iterable[int]
+) -> List[Optional[Hashable]]:
+    """ Convert adjacency matrix indices (as returned by csgraph) to node ids.
+    Negative indices (csgraph uses -9999 to indicate "no predecessor") are
+    mapped to None.
+    """
+
+    node_ids = morphology.node_ids()
+    return [node_ids[ii] if ii >= 0 else None for ii in indices]
+
+
+def path_distances(
+    morphology: Morphology,
+    source_ids: Sequence[Hashable],
+    target_ids: Optional[Sequence[Hashable]] = None,
+    weighted: bool = True
+) -> np.ndarray:
+    """ Calculate along-path distances from a set of source nodes.
+
+    Parameters
+    ----------
+    morphology : the reconstruction to traverse
+    source_ids : calculate distances from each of these nodes
+    target_ids : if provided, only report distances to these nodes.
+        Otherwise report distances to all nodes, ordered as
+        morphology.node_ids()
+    weighted : if True, distances are summed compartment lengths. Otherwise
+        they are numbers of compartments.
+
+    Returns
+    -------
+    An array of shape (len(source_ids), number of targets). Unreachable
+        targets have distance inf.
+
+    """
+
+    index = node_indices(morphology)
+    distances = csgraph.dijkstra(
+        morphology.to_sparse_adjacency(weighted=weighted),
+        directed=False,
+        indices=[index[node_id] for node_id in source_ids]
+    )
+    distances = np.atleast_2d(distances)
+
+    if target_ids is not None:
+        distances = distances[:, [index[node_id] for node_id in target_ids]]
+    return distances
+
+
+def nearest_source_distances(
+    morphology: Morphology,
+    source_ids: Sequence[Hashable],
+    weighted: bool = True
+) -> Tuple[np.ndarray, List[Optional[Hashable]]]:
+    """ Calculate, for each node, the along-path distance to the nearest of
+    several source nodes.
+
+    Parameters
+    ----------
+    morphology : the reconstruction to traverse
+    source_ids : the candidate sources
+    weighted : if True, distances are summed compartment lengths. Otherwise
+        they are numbers of compartments.
+
+    Returns
+    -------
+    distances : for each node (ordered as morphology.node_ids()), the distance
+        to its nearest source
+    sources : for each node, the id of its nearest source (or None if no
+        source is reachable)
+
+    """
+
+    index = node_indices(morphology)
+    distances, _, sources = csgraph.dijkstra(
+        morphology.to_sparse_adjacency(weighted=weighted),
+        directed=False,
+        indices=[index[node_id] for node_id in source_ids],
+        min_only=True,
+        return_predecessors=True
+    )
+    return distances, indices_to_node_ids(morphology, sources)
+
+
+def tip_path_distances(
+    morphology: Morphology,
+    node_types: Optional[Sequence[int]] = None
+) -> Tuple[List[Hashable], np.ndarray]:
+    """ Calculate the along-path distance between each pair of tips (leaf
+    nodes).
+
+    Parameters
+    ----------
+    morphology : the reconstruction to traverse
+    node_types : if provided, only consider tips of these types
+
+    Returns
+    -------
+    tip_ids : the ids of the tips considered
+    distances : a square array of distances between tips, ordered as tip_ids
+
+    """
+
+    tip_ids = [
+        morphology.node_id_cb(tip)
+        for tip in morphology.get_leaf_nodes(node_types=node_types)
+    ]
+    if not tip_ids:
+        return tip_ids, np.zeros((0, 0))
+    return tip_ids, path_distances(morphology, tip_ids, tip_ids)
+
+
+def connected_components(morphology: Morphology) -> List[List[Hashable]]:
+    """ Partition a morphology's nodes into connected trees.
+
+    Returns
+    -------
+    A list of lists of node ids, one per connected component
+
+    """
+
+    num_components, labels = csgraph.connected_components(
+        morphology.to_sparse_adjacency(weighted=False), directed=False)
+
+    components: List[List[Hashable]] = [[] for _ in range(num_components)]
+    for node_id, label in zip(morphology.node_ids(), labels):
+        components[label].append(node_id)
+    return components
+
+
+def breadth_first_node_ids(
+    morphology: Morphology,
+    start_id: Optional[Hashable] = None
+) -> List[Hashable]:
+    """ List node ids in breadth-first order from a starting node.
+
+    Parameters
+    ----------
+    morphology : the reconstruction to traverse
+    start_id : begin the traversal here. Defaults to the morphology's root.
+
+    Returns
+    -------
+    ids of all nodes reachable from the start node, in breadth-first order
+
+    """
+
+    if start_id is None:
+        start_id = morphology.get_root_id()
+
+    order = csgraph.breadth_first_order(
+        morphology.to_sparse_adjacency(weighted=False, directed=True),
+        node_indices(morphology)[start_id],
+        directed=True,
+        return_predecessors=False
+    )
+    return indices_to_node_ids(morphology, order)
@@ -7,7 +7,9 @@ from allensdk.core.simple_tree import SimpleTree
 import neuron_morphology.validation as validation
 from neuron_morphology.validation.result import InvalidMorphology
 from neuron_morphology.constants import *
+from neuron_morphology.compact_node import CompactNode, SWC_FIELDS
 from scipy.spatial.distance import euclidean
+from scipy import sparse
 import numpy as np
 import copy
 import queue
@@ -32,6 +34,13 @@ class Morphology(SimpleTree):
         self.node_id_cb = node_id_cb
         self.parent_id_cb = self._parent_id_cb
         self.nodes_by_types = {}
+
+        # ids of root nodes, keys carried by every node and node types
+        # present. Computed on first use; reset when the topology changes.
+        self._root_ids = None
+        self._node_keys = None
+        self._node_types = None
+
         self._create_compartment_dictionary()
         self.compartments = self.get_compartments()
 
@@ -120,13 +129,17 @@ class Morphology(SimpleTree):
 
         """
         root_node = None
-        root_nodes = self.filter_nodes(lambda node: self.parent_id_cb(node) is None)
+        root_nodes = self.get_roots()
         if root_nodes:
             root_node = root_nodes[0]
         return root_node
 
     def get_roots(self):
-        return self.filter_nodes(lambda node: self.parent_id_cb(node) is None)
+        if self._root_ids is None:
+            self._root_ids = [
+                nid for nid, pid in iteritems(self._parent_ids) if pid is None
+            ]
+        return self.nodes(self._root_ids)
 
     def get_root_id(self):
         return self.node_id_cb(self.get_root())
@@ -216,12 +229,48 @@ class Morphology(SimpleTree):
             return self.nodes()
 
     def has_type(self, node_type):
-        if node_type not in self.nodes_by_types:
-            self.nodes_by_types[node_type] = self.filter_nodes(lambda node: node['type'] == node_type)
-        if self.nodes_by_types[node_type]:
-            return True
-        else:
-            return False
+        return node_type in self.get_node_types()
+
+    def get_node_types(self):
+        """ The set of types of this morphology's nodes. Computed once and
+        cached, like nodes_by_types.
+        """
+
+        if self._node_types is None:
+            self._node_types = frozenset(
+                node['type'] for node in self._nodes.values())
+        return self._node_types
+
+    def get_node_keys(self):
+        """ The set of keys present on every node of this morphology (e.g.
+        "radius" or "layer"). Computed once and cached, so nodes annotated 
+        after the first call are not reflected.
+        """
+
+        if self._node_keys is None:
+            keys = None
+            for node_class, nodes in self._nodes_by_class().items():
+                if issubclass(node_class, CompactNode):
+                    class_keys = set(SWC_FIELDS)
+                else:
+                    class_keys = set(nodes[0])
+                    for node in nodes[1:]:
+                        class_keys.intersection_update(node)
+                keys = class_keys if keys is None else keys & class_keys
+            self._node_keys = frozenset(keys or ())
+        return self._node_keys
+
+    def _nodes_by_class(self):
+        by_class = {}
+        for node in self._nodes.values():
+            by_class.setdefault(type(node), []).append(node)
+        return by_class
+
+    def nodes_have_key(self, key):
+        """ Determine whether every node of this morphology has some key
+        """
+
+        return not self._nodes or key in self.get_node_keys()
 
     def get_non_soma_nodes(self):
         return self.filter_nodes(lambda node: node['type'] != SOMA)
@@ -422,6 +471,60 @@ class Morphology(SimpleTree):
     def clone(self):
         return copy.deepcopy(self)
 
+    def view(self, node_types=None, node_ids=None):
+        """ Obtain a view of a subset of this morphology's nodes. The view 
+        shares node dictionaries with this morphology (node data is not 
+        copied), but builds its own topology (parent and child maps) and 
+        compartments. Constructing a view therefore takes time and memory 
+        proportional to the number of selected nodes.
+
+        Parameters
+        ----------
+        node_types : if provided, restrict the view to nodes of these types
+        node_ids : if provided, restrict the view to nodes with these ids
+
+        Returns
+        -------
+        A MorphologyView over the selected nodes. Nodes whose parents are not 
+            selected become roots of the view.
+
+        """
+
+        selected = self.node_ids()
+        if node_ids is not None:
+            node_ids = set(node_ids)
+            selected = [nid for nid in selected if nid in node_ids]
+        if node_types is not None:
+            selected = [
+                nid for nid in selected 
+                if self._nodes[nid]['type'] in node_types
+            ]
+
+        return MorphologyView(self, selected)
+
+    def subtree(self, node_id):
+        """ Obtain a view of the subtree rooted at a node. See 
+        Morphology.view.
+
+        Parameters
+        ----------
+        node_id : the id of the root of the subtree
+
+        Returns
+        -------
+        A MorphologyView over the argued node and all of its descendants.
+
+        """
+
+        subtree_ids = set()
+        to_visit = [node_id]
+        while to_visit:
+            current_id = to_visit.pop()
+            subtree_ids.add(current_id)
+            to_visit.extend(self._child_ids[current_id])
+
+        return self.view(node_ids=subtree_ids)
+
     def build_intermediate_nodes(self, make_intermediates_cb, set_parent_id_cb):
 
         visit = functools.partial(self._make_and_insert_intermediate, make_intermediates_cb, set_parent_id_cb)
@@ -447,6 +550,10 @@ class Morphology(SimpleTree):
 
         set_parent_id_cb(self._nodes[child_id], node_id)
 
+        self._root_ids = None
+        self._node_keys = None
+        self._node_types = None
+
     def _make_and_insert_intermediate(self, make_intermediates_cb, set_parent_id_cb, child):
 
         parent_id = self._parent_id_cb(child)
@@ -630,6 +737,65 @@ class Morphology(SimpleTree):
             new_node = merge_cb(node, parent)
             new_nodes.append(new_node)
 
+    def to_sparse_adjacency(self, weighted=True, directed=False):
+        """ Export this morphology's topology as a sparse adjacency matrix, 
+        suitable for use with scipy.sparse.csgraph. Rows and columns are 
+        ordered as self.node_ids().
+
+        Parameters
+        ----------
+        weighted : if True, edges are weighted by compartment length. 
+            Otherwise each edge has weight 1.
+        directed : if True, only store parent -> child edges. Otherwise the 
+            matrix is symmetric.
+
+        Returns
+        -------
+        A scipy.sparse.csr_matrix of shape (len(self), len(self))
+
+        Notes
+        -----
+        Use neuron_morphology.graph to map csgraph outputs back to node ids. 
+        Zero-length compartments are stored as explicit zeros.
+
+        """
+
+        node_ids = self.node_ids()
+        index = {node_id: ii for ii, node_id in enumerate(node_ids)}
+
+        child_indices = []
+        parent_indices = []
+        for node_id in node_ids:
+            parent_id = self._parent_ids[node_id]
+            if parent_id is not None:
+                child_indices.append(index[node_id])
+                parent_indices.append(index[parent_id])
+
+        child_indices = np.asarray(child_indices, dtype=int)
+        parent_indices = np.asarray(parent_indices, dtype=int)
+
+        if weighted:
+            positions = np.array(
+                [[node['x'], node['y'], node['z']] for node in self.nodes()],
+                dtype=float
+            ).reshape(-1, 3)
+            weights = np.linalg.norm(
+                positions[child_indices] - positions[parent_indices], axis=1)
+        else:
+            weights = np.ones(len(child_indices))
+
+        if not directed:
+            parent_indices, child_indices = (
+                np.concatenate([parent_indices, child_indices]),
+                np.concatenate([child_indices, parent_indices])
+            )
+            weights = np.concatenate([weights, weights])
+
+        return sparse.csr_matrix(
+            (weights, (parent_indices, child_indices)), 
+            shape=(len(node_ids), len(node_ids))
+        )
+
     @staticmethod
     def _get_node_attributes(attributes, nodes):
 
@@ -677,3 +843,29 @@ class Morphology(SimpleTree):
         py = (node1['y'] + node2['y']) * 0.5
         pz = (node1['z'] + node2['z']) * 0.5
         return [px, py, pz]
+
+
+class MorphologyView(Morphology):
+
+    def __init__(self, base, node_ids):
+        """ A Morphology presenting a subset of the nodes of another 
+        Morphology. Node dictionaries are shared with the base morphology, so 
+        node data is not copied and changes to node attributes are visible 
+        through both. Topology (parent and child ids) and derived caches 
+        (e.g. nodes_by_types and compartments) are rebuilt for, and scoped 
+        to, the view. This is not zero-copy: construction is O(n) in the 
+        number of viewed nodes, in both time and memory.
+
+        Parameters
+        ----------
+        base : the morphology being viewed
+        node_ids : ids of the nodes (in base) to include in this view
+
+        """
+
+        self.base = base
+        super(MorphologyView, self).__init__(
+            base.nodes(node_ids),
+            node_id_cb=base.node_id_cb,
+            parent_id_cb=base.parent_id_cb
+        )
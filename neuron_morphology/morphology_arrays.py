@@ -0,0 +1,166 @@
+""" An array-backed, read-only representation of a morphology's nodes, for
+calculations which would otherwise loop over node dictionaries in Python.
+"""
+
+from typing import Dict, Hashable, List, Optional, Sequence
+import math
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.constants import SOMA
+
+
+class MorphologyArrays:
+
+    def __init__(
+        self,
+        node_ids: Sequence[Hashable],
+        types: np.ndarray,
+        xyz: np.ndarray,
+        radius: np.ndarray,
+        parent: np.ndarray
+    ):
+        """ Node data stored as aligned arrays. Nodes are identified by their
+        position (index) in these arrays.
+
+        Parameters
+        ----------
+        node_ids : the id of each node
+        types : the (integer) type of each node
+        xyz : (n nodes, 3) array of node positions
+        radius : the radius of each node
+        parent : the index of each node's parent, or -1 for roots
+
+        Notes
+        -----
+        Children are listed in the order in which they appear in the arrays.
+        This matches the order reported by Morphology.children_of, so
+        traversals over these arrays visit nodes in the same order as
+        traversals over the source morphology.
+
+        """
+
+        self.node_ids: List[Hashable] = list(node_ids)
+        self.types = np.asarray(types, dtype=int)
+        self.xyz = np.asarray(xyz, dtype=float).reshape((-1, 3))
+        self.radius = np.asarray(radius, dtype=float)
+        self.parent = np.asarray(parent, dtype=int)
+
+        self.index: Dict[Hashable, int] = {
+            node_id: ii for ii, node_id in enumerate(self.node_ids)
+        }
+
+        self.children: List[List[int]] = [[] for _ in self.node_ids]
+        for ii, parent_index in enumerate(self.parent.tolist()):
+            if parent_index >= 0:
+                self.children[parent_index].append(ii)
+
+        self.num_children = np.array(
+            [len(children) for children in self.children], dtype=int)
+
+        # plain lists are faster than arrays for per-node access in loops
+        self.type_list: List[int] = self.types.tolist()
+        self.xyz_list: List[List[float]] = self.xyz.tolist()
+
+        self._indices_by_type: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_morphology(cls, morphology: Morphology) -> "MorphologyArrays":
+        """ Build arrays describing a morphology's nodes, in the order of
+        morphology.nodes()
+        """
+
+        nodes = morphology.nodes()
+        node_ids = [morphology.node_id_cb(node) for node in nodes]
+        index = {node_id: ii for ii, node_id in enumerate(node_ids)}
+
+        parent = []
+        for node in nodes:
+            parent_id = morphology.parent_id_cb(node)
+            parent.append(-1 if parent_id is None else index[parent_id])
+
+        return cls(
+            node_ids=node_ids,
+            types=[node["type"] for node in nodes],
+            xyz=[[node["x"], node["y"], node["z"]] for node in nodes],
+            radius=[node["radius"] for node in nodes],
+            parent=parent
+        )
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def indices_of_type(self, node_type: int) -> np.ndarray:
+        """ The indices of all nodes of one type, in order
+        """
+
+        if node_type not in self._indices_by_type:
+            self._indices_by_type[node_type] = np.flatnonzero(
+                self.types == node_type)
+        return self._indices_by_type[node_type]
+
+    def indices_by_types(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ Select nodes by type, in the same order as
+        Morphology.get_node_by_types (all nodes if node_types is empty or
+        None; otherwise the nodes of each type in turn).
+        """
+
+        if not node_types:
+            return np.arange(len(self), dtype=int)
+        return np.concatenate(
+            [self.indices_of_type(node_type) for node_type in node_types]
+            + [np.zeros((0,), dtype=int)]
+        )
+
+    def indices_by_types_or_non_soma(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ Select nodes by type. If node_types is empty or None, select all
+        non-soma nodes. This matches the selection used by
+        Morphology.get_leaf_nodes and Morphology.get_branching_nodes.
+        """
+
+        if not node_types:
+            return np.flatnonzero(self.types != SOMA)
+        return self.indices_by_types(node_types)
+
+    def roots(self) -> np.ndarray:
+        """ The indices of all nodes without a parent
+        """
+
+        return np.flatnonzero(self.parent < 0)
+
+    def has_parent(self) -> np.ndarray:
+        """ The indices of all nodes which have a parent, in order. These
+        identify compartments by their child node.
+        """
+
+        return np.flatnonzero(self.parent >= 0)
+
+    def children_by_types(
+        self,
+        index: int,
+        node_types: Optional[Sequence[int]] = None
+    ) -> List[int]:
+        """ The children of a node, optionally restricted to some types.
+        Matches Morphology.get_children.
+        """
+
+        children = self.children[index]
+        if not node_types:
+            return children
+        return [
+            child for child in children 
+            if self.type_list[child] in node_types
+        ]
+
+    def distance(self, first: int, second: int) -> float:
+        """ The euclidean distance between two nodes
+        """
+
+        return math.dist(self.xyz_list[first], self.xyz_list[second])
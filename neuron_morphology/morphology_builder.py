@@ -2,6 +2,7 @@ import warnings
 import random
 
 from neuron_morphology.morphology import Morphology
+from neuron_morphology.compact_node import CompactNode
 from neuron_morphology.constants import (
     SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
 
@@ -120,13 +121,23 @@ class MorphologyBuilder:
         """
         return self.child(x, y, z, BASAL_DENDRITE, radius)
         
-    def build(self):
+    def build(self, compact=False):
         """ Construct a Morphology object using this builder. This is a non-
         destructive operation. The Morphology will be validated at this stage.
+
+        Parameters
+        ----------
+        compact : if True, the Morphology's nodes will be CompactNode records 
+            rather than dicts.
+
         """
 
+        nodes = self.nodes
+        if compact:
+            nodes = [CompactNode.from_dict(node) for node in nodes]
+
         return Morphology(
-            self.nodes, 
+            nodes, 
             node_id_cb=lambda node: node["id"],
             parent_id_cb=lambda node: node["parent"]
         )
@@ -0,0 +1,173 @@
+""" Canonical, content-based hashes of morphologies. Hashes are computed
+bottom-up (Merkle-style), so that each subtree gets its own hash. These are
+independent of node id numbering and of the order in which nodes (e.g. SWC
+rows) or siblings are listed.
+"""
+
+from typing import Dict, Any, Sequence, Optional, List, Hashable
+import hashlib
+import numbers
+
+from neuron_morphology.morphology import Morphology
+
+
+# node attributes which contribute to a node's hash
+DEFAULT_HASH_KEYS = ("type", "x", "y", "z", "radius")
+
+
+def encode_value(value: Any, precision: Optional[int] = None) -> str:
+    """ Produce a canonical string representation of a node attribute. Numbers
+    are compared by value, so that (e.g.) 1, 1.0 and np.float64(1) produce the
+    same representation.
+
+    Parameters
+    ----------
+    value : the attribute value to be encoded
+    precision : if provided, round real numbers to this many decimal places
+        before encoding
+
+    Returns
+    -------
+    a string representation of the value
+
+    """
+
+    if isinstance(value, numbers.Integral) and not isinstance(value, bool):
+        return repr(float(value))
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if precision is not None:
+            value = round(value, precision) + 0.0 # avoid distinct -0.0
+        return repr(value)
+    return repr(value)
+
+
+def subtree_hashes(
+    morphology: Morphology,
+    keys: Sequence[str] = DEFAULT_HASH_KEYS,
+    precision: Optional[int] = None
+) -> Dict[Hashable, str]:
+    """ Calculate a hash for each subtree of a morphology. The hash of a
+    subtree depends on its root node's attributes and on the (unordered)
+    collection of its children's subtree hashes.
+
+    Parameters
+    ----------
+    morphology : the reconstruction to be hashed
+    keys : the node attributes which contribute to the hash. Missing
+        attributes are treated as None.
+    precision : if provided, round real-valued attributes to this many decimal
+        places before hashing. Use this to ignore float formatting noise.
+
+    Returns
+    -------
+    A dictionary mapping each node id to the hex digest of the subtree rooted
+        at that node.
+
+    """
+
+    hashes: Dict[Hashable, str] = {}
+
+    for root_id in morphology.node_ids():
+        if morphology.parent_ids([root_id])[0] is not None:
+            continue
+
+        # iterative postorder, so that very deep reconstructions do not hit
+        # the recursion limit
+        stack = [(root_id, False)]
+        while stack:
+            node_id, children_done = stack.pop()
+            child_ids = morphology.child_ids([node_id])[0]
+
+            if not children_done:
+                stack.append((node_id, True))
+                stack.extend((child_id, False) for child_id in child_ids)
+                continue
+
+            node = morphology.node_by_id(node_id)
+            hasher = hashlib.sha256()
+            for key in keys:
+                hasher.update(
+                    f"{key}={encode_value(node.get(key), precision)};"
+                    .encode()
+                )
+            for child_hash in sorted(hashes[cid] for cid in child_ids):
+                hasher.update(child_hash.encode())
+            hashes[node_id] = hasher.hexdigest()
+
+    return hashes
+
+
+def morphology_hash(
+    morphology: Morphology,
+    keys: Sequence[str] = DEFAULT_HASH_KEYS,
+    precision: Optional[int] = None
+) -> str:
+    """ Calculate a single canonical hash for a whole morphology. This is
+    suitable for use as a cache key or for detecting re-uploads of
+    geometrically identical reconstructions.
+
+    Parameters
+    ----------
+    morphology : the reconstruction to be hashed
+    keys : the node attributes which contribute to the hash
+    precision : if provided, round real-valued attributes to this many decimal
+        places before hashing.
+
+    Returns
+    -------
+    A hex digest describing this morphology.
+
+    """
+
+    hashes = subtree_hashes(morphology, keys=keys, precision=precision)
+    root_hashes = sorted(
+        hashes[node_id] for node_id in hashes
+        if morphology.parent_ids([node_id])[0] is None
+    )
+
+    hasher = hashlib.sha256()
+    for root_hash in root_hashes:
+        hasher.update(root_hash.encode())
+    return hasher.hexdigest()
+
+
+def changed_subtrees(
+    reference: Morphology,
+    candidate: Morphology,
+    keys: Sequence[str] = DEFAULT_HASH_KEYS,
+    precision: Optional[int] = None
+) -> List[Hashable]:
+    """ Find the subtrees of a candidate morphology which do not occur in a
+    reference morphology. Since a change to a node alters the hashes of all
+    of its ancestors, only the deepest changed subtrees are reported: those
+    whose hash is new, but whose children's hashes all occur in the reference.
+
+    Parameters
+    ----------
+    reference : the (e.g. previous) version of a reconstruction
+    candidate : the (e.g. new) version of a reconstruction
+    keys : the node attributes which contribute to the hash
+    precision : if provided, round real-valued attributes to this many decimal
+        places before hashing.
+
+    Returns
+    -------
+    Ids (in the candidate) of the root nodes of the changed subtrees. Empty if
+        the morphologies are identical.
+
+    """
+
+    known = set(
+        subtree_hashes(reference, keys=keys, precision=precision).values())
+    hashes = subtree_hashes(candidate, keys=keys, precision=precision)
+
+    changed = []
+    for node_id, node_hash in hashes.items():
+        if node_hash in known:
+            continue
+        child_ids = candidate.child_ids([node_id])[0]
+        if all(hashes[child_id] in known for child_id in child_ids):
+            changed.append(node_id)
+
+    return changed
@@ -1,5 +1,8 @@
+import io
+
 import pandas as pd
 from neuron_morphology.morphology import Morphology
+from neuron_morphology.compact_node import CompactNode
 
 
 SWC_COLUMNS = ('id', 'type', 'x', 'y', 'z', 'radius', 'parent',)
@@ -12,7 +15,8 @@ COLUMN_CASTS = {
 
 def read_swc(path, columns=SWC_COLUMNS, sep=' ', casts=COLUMN_CASTS):
 
-    """ Read an swc file into a pandas dataframe
+    """ Read an swc file into a pandas dataframe. path may also be a readable 
+    file-like object.
     """
 
     df = pd.read_csv(path, names=columns, comment='#', sep=sep)
@@ -37,22 +41,57 @@ def write_swc(data, path, comments=None, sep=' ', columns=SWC_COLUMNS, casts=COL
     data.to_csv(path, sep=sep, index=False, header=None, mode='a')
 
 
+def count_swc_nodes(path):
+    """ Count the nodes in an swc file without parsing it (non-empty, 
+    non-comment lines are counted)
+    """
+
+    count = 0
+    with open(path, 'rb') as swc_file:
+        for line in swc_file:
+            line = line.strip()
+            if line and not line.startswith(b'#'):
+                count += 1
+    return count
+
+
 def apply_casts(df, casts):
 
     for key, typ in casts.items():
         df[key] = df[key].astype(typ)
 
 
-def morphology_from_swc(swc_path):
+def morphology_from_swc(swc_path, compact=False):
+    """ Read an swc file into a Morphology
+
+    Parameters
+    ----------
+    swc_path : path to the swc file. Alternatively, the file's contents 
+        (bytes) or a readable file-like object.
+    compact : if True, nodes will be CompactNode records rather than dicts. 
+        These use substantially less memory.
+
+    """
+
+    if isinstance(swc_path, (bytes, bytearray)):
+        swc_path = io.BytesIO(swc_path)
 
     swc_data = read_swc(swc_path, sep=' ')
 
-    nodes = swc_data.to_dict('record')
-    for node in nodes:
-        # unfortunately, pandas automatically promotes numeric types to float in to_dict
-        node['parent'] = int(node['parent'])
-        node['id'] = int(node['id'])
-        node['type'] = int(node['type'])
+    if compact:
+        nodes = [
+            CompactNode(int(nid), int(typ), x, y, z, radius, int(parent))
+            for nid, typ, x, y, z, radius, parent in zip(
+                *(swc_data[column].tolist() for column in SWC_COLUMNS)
+            )
+        ]
+    else:
+        nodes = swc_data.to_dict('record')
+        for node in nodes:
+            # unfortunately, pandas automatically promotes numeric types to float in to_dict
+            node['parent'] = int(node['parent'])
+            node['id'] = int(node['id'])
+            node['type'] = int(node['type'])
 
     return Morphology(
         nodes,
@@ -0,0 +1,163 @@
+import unittest
+import tempfile
+import shutil
+import asyncio
+import os
+
+import pandas as pd
+
+from neuron_morphology.feature_extractor.batch import iter_extract, aextract
+from neuron_morphology.feature_extractor.checkpoint import CheckpointLedger
+from neuron_morphology.feature_extractor.scheduling import ScheduleReport
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.identifiers = []
+        for ii in range(4):
+            builder = MorphologyBuilder().root()
+            for _ in range(ii + 2):
+                builder.axon()
+            path = os.path.join(self.tmpdir, f"{ii}.swc")
+            write_swc(pd.DataFrame(builder.nodes), path)
+            self.identifiers.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def reconstructions(self):
+        return [{"swc_path": path} for path in self.identifiers]
+
+    def test_iter_extract(self):
+        results = dict(iter_extract(self.reconstructions(), num_processes=2))
+
+        self.assertEqual(set(results), set(self.identifiers))
+        for run in results.values():
+            self.assertIn("axon.num_nodes", run["results"])
+
+    def test_iter_extract_missing(self):
+        missing = os.path.join(self.tmpdir, "missing.swc")
+        failures = []
+        results = dict(iter_extract(
+            self.reconstructions()[:2] + [{"swc_path": missing}],
+            num_processes=2, task_timeout=30, failures=failures
+        ))
+
+        self.assertEqual(set(results), set(self.identifiers[:2]))
+        self.assertEqual(
+            [failure["identifier"] for failure in failures], [missing])
+
+    def test_iter_extract_missing_checkpoint(self):
+        missing = os.path.join(self.tmpdir, "missing.swc")
+        ledger = CheckpointLedger(os.path.join(self.tmpdir, "ledger.sqlite"))
+        try:
+            for resume in (False, True):
+                failures = []
+                results = dict(iter_extract(
+                    self.reconstructions()[:2] + [{"swc_path": missing}],
+                    num_processes=2, task_timeout=60, failures=failures,
+                    checkpoint=ledger, resume=resume
+                ))
+
+                self.assertEqual(set(results), set(self.identifiers[:2]))
+                self.assertEqual(
+                    [failure["identifier"] for failure in failures], 
+                    [missing]
+                )
+            self.assertEqual(len(ledger), 2)
+            self.assertEqual(ledger.num_skipped, 2)
+        finally:
+            ledger.close()
+
+    def test_iter_extract_close(self):
+        runs = iter_extract(self.reconstructions(), num_processes=2)
+        identifier, _ = next(runs)
+        runs.close()
+
+        self.assertIn(identifier, self.identifiers)
+
+    def test_aextract(self):
+        drawn = []
+
+        def lazy():
+            for reconstruction in self.reconstructions():
+                drawn.append(reconstruction["swc_path"])
+                yield reconstruction
+
+        async def consume():
+            results = {}
+            async for identifier, run in aextract(
+                lazy(), num_processes=2, max_in_flight=2
+            ):
+                # no more than max_in_flight reconstructions are outstanding
+                self.assertLessEqual(len(drawn) - len(results), 2)
+                results[identifier] = run
+            return results
+
+        results = asyncio.run(consume())
+        self.assertEqual(set(results), set(self.identifiers))
+        self.assertEqual(
+            results[self.identifiers[0]]["results"]["axon.num_nodes"], 2)
+
+    def test_aextract_invalid(self):
+        async def consume():
+            async for _ in aextract(self.reconstructions(), max_in_flight=0):
+                pass
+
+        with self.assertRaises(ValueError):
+            asyncio.run(consume())
+
+    def collect(self, reconstructions, **kwargs):
+        async def consume():
+            return {
+                identifier: run async for identifier, run in aextract(
+                    reconstructions, num_processes=2, **kwargs)
+            }
+        return asyncio.run(consume())
+
+    def test_aextract_worker_options(self):
+        results = self.collect(
+            self.reconstructions(),
+            track_memory=True,
+            result_cache_path=os.path.join(self.tmpdir, "cache.sqlite")
+        )
+
+        self.assertEqual(set(results), set(self.identifiers))
+        for run in results.values():
+            self.assertEqual(run["result_cache"]["hits"], 0)
+            self.assertIsNotNone(
+                run["timings"]["stages"]["features"]["peak_memory"])
+
+    def test_aextract_resume(self):
+        ledger = CheckpointLedger(os.path.join(self.tmpdir, "ledger.sqlite"))
+        try:
+            self.collect(self.reconstructions()[:2], checkpoint=ledger)
+
+            report = ScheduleReport()
+            results = self.collect(
+                self.reconstructions(), checkpoint=ledger, resume=True,
+                schedule_report=report
+            )
+        finally:
+            ledger.close()
+
+        self.assertEqual(set(results), set(self.identifiers))
+        self.assertEqual(ledger.num_skipped, 2)
+        self.assertEqual(set(report.actual), set(self.identifiers[2:]))
+        self.assertEqual(report.schedule, "input")
+        self.assertIsNotNone(report.makespan)
+
+    def test_aextract_unsupported(self):
+        for options in (
+            {"task_timeout": 10},
+            {"prefetch_depth": 2},
+            {"schedule": "largest_first"},
+            {"chunksize": 2}
+        ):
+            with self.assertRaisesRegex(ValueError, list(options)[0]):
+                self.collect(self.reconstructions(), **options)
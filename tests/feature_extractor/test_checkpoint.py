@@ -0,0 +1,127 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import pandas as pd
+
+from neuron_morphology.feature_extractor.checkpoint import (
+    CheckpointLedger, feature_set_version, hash_parameters)
+from neuron_morphology.feature_extractor.__main__ import extract_multiple
+from neuron_morphology.feature_extractor.feature_writer import read_results
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+def write_morphology(path, num_axon_nodes):
+    builder = MorphologyBuilder().root()
+    for _ in range(num_axon_nodes):
+        builder.axon()
+    write_swc(pd.DataFrame(builder.nodes), path)
+
+
+class TestCheckpointLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.swc_path = os.path.join(self.tmpdir, "a.swc")
+        write_morphology(self.swc_path, 2)
+
+        self.ledger = CheckpointLedger(
+            os.path.join(self.tmpdir, "ledger.sqlite"))
+        self.version = feature_set_version("set", "reference", ["b", "a"])
+
+    def tearDown(self):
+        self.ledger.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_hash_parameters(self):
+        self.assertEqual(
+            hash_parameters({"a": 1, "b": [2]}),
+            hash_parameters({"b": [2], "a": 1})
+        )
+
+    def test_version(self):
+        self.assertEqual(
+            self.version, feature_set_version("set", "reference", ["a", "b"]))
+        self.assertNotEqual(
+            self.version, feature_set_version("set", "fast", ["a", "b"]))
+
+    def test_record(self):
+        key = self.ledger.key_for({"swc_path": self.swc_path}, self.version, {})
+        self.assertIsNone(self.ledger.get(key))
+
+        self.ledger.record(key, self.swc_path, {"results": {"a": 1}})
+        self.assertEqual(
+            self.ledger.get(key), (self.swc_path, {"results": {"a": 1}}))
+        self.assertEqual(len(self.ledger), 1)
+
+    def test_stale(self):
+        spec = {"swc_path": self.swc_path, "identifier": "a"}
+        key = self.ledger.key_for(spec, self.version, {"x": 1})
+        self.ledger.record(key, "a", {"results": {}})
+
+        self.assertIsNone(self.ledger.get(
+            self.ledger.key_for(spec, self.version, {"x": 2})))
+
+        write_morphology(self.swc_path, 3)
+        self.assertIsNone(self.ledger.get(
+            self.ledger.key_for(spec, self.version, {"x": 1})))
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.swc_paths = []
+        for ii in range(3):
+            path = os.path.join(self.tmpdir, f"{ii}.swc")
+            write_morphology(path, ii + 2)
+            self.swc_paths.append(path)
+
+        self.ledger_path = os.path.join(self.tmpdir, "ledger.sqlite")
+        self.results_path = os.path.join(self.tmpdir, "results.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def extract(self, resume):
+        ledger = CheckpointLedger(self.ledger_path)
+        extract_multiple(
+            [{"swc_path": path} for path in self.swc_paths],
+            "aibs_default",
+            os.path.join(self.tmpdir, "heavy.h5"),
+            num_processes=1,
+            results_path=self.results_path,
+            checkpoint=ledger,
+            resume=resume
+        )
+        ledger.close()
+
+        results = {
+            identifier: run["results"]["axon.num_nodes"]
+            for identifier, run in read_results(self.results_path)
+        }
+        return ledger.summary(), results
+
+    def test_resume(self):
+        summary, first = self.extract(resume=False)
+        self.assertEqual(summary["computed"], 3)
+        self.assertEqual(summary["skipped"], 0)
+
+        write_morphology(self.swc_paths[0], 5)
+
+        summary, second = self.extract(resume=True)
+        self.assertEqual(summary["computed"], 1)
+        self.assertEqual(summary["skipped"], 2)
+
+        self.assertEqual(first[self.swc_paths[0]], 2)
+        self.assertEqual(second[self.swc_paths[0]], 5)
+        self.assertEqual(second[self.swc_paths[2]], 4)
+
+    def test_resume_requires_ledger(self):
+        with self.assertRaises(ValueError):
+            extract_multiple(
+                [], "aibs_default", os.path.join(self.tmpdir, "heavy.h5"),
+                resume=True
+            )
@@ -1,6 +1,7 @@
 import unittest
 
-from neuron_morphology.feature_extractor.data import Data, get_morphology
+from neuron_morphology.feature_extractor.data import (
+    Data, get_morphology, cached)
 from neuron_morphology.morphology_builder import MorphologyBuilder
 
 class TestData(unittest.TestCase):
@@ -30,4 +31,36 @@ class TestData(unittest.TestCase):
 
     def test_hash(self):
         dat = Data(self.morphology)
-        self.assertEqual({dat}, {dat})
\ No newline at end of file
+        self.assertEqual({dat}, {dat})
+
+    def test_cached(self):
+        calls = []
+        def count_nodes(morphology, node_types=None):
+            calls.append(node_types)
+            return len(morphology.get_node_by_types(node_types))
+
+        dat = Data(self.morphology)
+        with dat.computation_cache():
+            self.assertEqual(cached(dat, count_nodes, node_types=[2]), 3)
+            self.assertEqual(cached(dat, count_nodes, node_types=[2]), 3)
+            self.assertEqual(cached(dat, count_nodes), 4)
+        self.assertEqual(calls, [[2], None])
+
+    def test_cached_scope(self):
+        calls = []
+        def count_nodes(morphology):
+            calls.append(True)
+            return len(morphology.nodes())
+
+        dat = Data(self.morphology)
+        with dat.computation_cache():
+            with dat.computation_cache():
+                cached(dat, count_nodes)
+            cached(dat, count_nodes)
+        self.assertIsNone(dat._computation_cache)
+
+        # outside of a cache scope, nothing is memoized
+        cached(dat, count_nodes)
+        cached(self.morphology, count_nodes)
+        self.assertEqual(len(calls), 3)
+
@@ -0,0 +1,112 @@
+import unittest
+import os
+
+from tests.objects import (
+    test_morphology_large, test_morphology_small,
+    test_morphology_small_branching, test_morphology_small_multiple_trees,
+    synthetic_morphology, assert_results_close)
+from neuron_morphology.swc_io import morphology_from_swc
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    resolve_feature_set)
+from neuron_morphology.features.default_features import default_features
+from neuron_morphology.features import fast
+from neuron_morphology.features.intrinsic import num_nodes
+from neuron_morphology.features.path import max_path_distance
+
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+class TestFastEngine(unittest.TestCase):
+
+    reference = {
+        feature.name: feature
+        for feature in FeatureExtractor(default_features).features
+    }
+    accelerated = {
+        feature.name: feature for feature in fast.accelerate(default_features)
+    }
+
+    def check_parity(self, morphology):
+        num_checked = 0
+
+        for name, reference in self.reference.items():
+            accelerated = self.accelerated[name]
+            if accelerated is reference:
+                continue
+
+            try:
+                expected = reference(Data(morphology))
+            except Exception as err:
+                # the fast engine reproduces the reference's failures
+                with self.assertRaises(type(err), msg=name):
+                    accelerated(Data(morphology))
+                continue
+
+            obtained = accelerated(Data(morphology))
+            assert_results_close(self, expected, obtained, name)
+            num_checked += 1
+
+        self.assertGreater(num_checked, 0)
+
+    def test_parity_objects(self):
+        for morphology in (
+            test_morphology_large(),
+            test_morphology_small(),
+            test_morphology_small_branching(),
+            test_morphology_small_multiple_trees()
+        ):
+            self.check_parity(morphology)
+
+    def test_parity_swc(self):
+        # tests/data/test_swc.swc is omitted: the reference engine takes 
+        # several minutes to process it
+        for name in (
+            "Ctgf-2A-dgCre-D_Ai14_BT_-245170.06.06.01_539748835_m_pia.swc",
+            "17545-6151-X24259-Y36270.swc"
+        ):
+            self.check_parity(
+                morphology_from_swc(os.path.join(DATA_DIR, name)))
+
+    def test_parity_synthetic(self):
+        for seed in range(3):
+            self.check_parity(synthetic_morphology(seed))
+
+    def test_accelerate_feature(self):
+        accelerated = fast.accelerate_feature(num_nodes)
+        self.assertEqual(accelerated.name, "num_nodes")
+        self.assertEqual(accelerated.marks, num_nodes.marks)
+        self.assertIsNone(accelerated.batched)
+        self.assertEqual(
+            accelerated(Data(test_morphology_large())),
+            num_nodes(Data(test_morphology_large()))
+        )
+
+    def test_accelerate_unknown(self):
+        def not_accelerated(data):
+            return 1
+
+        self.assertIs(
+            fast.accelerate_feature(not_accelerated).feature, not_accelerated)
+
+    def test_extract(self):
+        morphology = synthetic_morphology(5)
+        run = FeatureExtractor(resolve_feature_set("aibs_default", "fast")) \
+            .extract(Data(morphology))
+        reference = FeatureExtractor([max_path_distance]) \
+            .extract(Data(morphology))
+
+        self.assertAlmostEqual(
+            run.results["max_path_distance"],
+            reference.results["max_path_distance"]
+        )
+        self.assertIn(fast.intermediates.arrays.name, [
+            step["product"] for step in run.plan().describe()])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            resolve_feature_set("aibs_default", "slow")
@@ -1,8 +1,10 @@
 import unittest
 
 from neuron_morphology.feature_extractor.data import Data
-from neuron_morphology.feature_extractor.mark import Mark
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.mark import (
+    Mark, RequiresRoot, RequiresAxon)
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, batches, MarkedFeature)
 from neuron_morphology.feature_extractor.feature_extraction_run import \
     FeatureExtractionRun
 from neuron_morphology.morphology_builder import MorphologyBuilder
@@ -51,6 +53,43 @@ class TestFeatureExtractionRun(unittest.TestCase):
         self.assertEqual(run.selected_marks, {self.amark})
 
 
+    def test_select_marks_memoized(self):
+        calls = []
+
+        class CMark(Mark):
+            @classmethod
+            def validate(cls, data):
+                calls.append(data)
+                return True
+
+        data = Data(self.morphology)
+        FeatureExtractionRun(data).select_marks([CMark])
+        FeatureExtractionRun(data).select_marks([CMark])
+        self.assertEqual(len(calls), 1)
+
+    def test_select_marks_by_shape(self):
+        selections = {}
+        first = (
+            FeatureExtractionRun(Data(self.morphology, a=3))
+                .select_marks(
+                    [RequiresRoot, RequiresAxon, self.amark],
+                    mark_selections=selections
+                )
+        )
+        self.assertEqual(first.selected_marks, {RequiresRoot})
+        self.assertEqual(len(selections), 1)
+
+        other = MorphologyBuilder().root().build()
+        second = (
+            FeatureExtractionRun(Data(other, a=2))
+                .select_marks(
+                    [RequiresRoot, RequiresAxon, self.amark],
+                    mark_selections=selections
+                )
+        )
+        self.assertEqual(second.selected_marks, {RequiresRoot, self.amark})
+        self.assertEqual(set(second.timings["marks"]), {self.amark.__name__})
+
     def test_select_features(self):
         run = (
             FeatureExtractionRun(Data(self.morphology, a=2, b=4))
@@ -74,3 +113,63 @@ class TestFeatureExtractionRun(unittest.TestCase):
 
         self.assertEqual(run.results["foo"], True)
         self.assertEqual(len(run.results), 1)
+
+    def test_extract_batched(self):
+        calls = []
+
+        def base(data, scale=1):
+            calls.append("single")
+            return data.a * scale
+
+        base_feature = MarkedFeature.ensure(base)
+
+        @batches(base_feature)
+        def batched_base(data, variants):
+            calls.append("batched")
+            return [data.a * variant.get("scale", 1) for variant in variants]
+
+        features = [
+            base_feature.partial(scale=2),
+            base_feature.partial(scale=3),
+            self.foo
+        ]
+        features[0].name = "double"
+        features[1].name = "triple"
+
+        run = (
+            FeatureExtractionRun(Data(self.morphology, a=2))
+                .select_marks([self.amark])
+                .select_features(features)
+                .extract()
+        )
+
+        self.assertEqual(run.results, {"double": 4, "triple": 6, "foo": True})
+        self.assertEqual(calls, ["batched"])
+
+    def test_timings(self):
+        @marked(self.amark)
+        def big(data):
+            return len([0] * 100000)
+
+        run = (
+            FeatureExtractionRun(Data(self.morphology, a=2), track_memory=True)
+                .select_marks([self.amark, self.bmark])
+                .select_features([self.foo, big])
+                .extract()
+        )
+
+        serialized = run.serialize()["timings"]
+        self.assertEqual(
+            set(serialized["marks"]), {self.amark.__name__, self.bmark.__name__})
+        self.assertEqual(set(serialized["features"]), {"foo", "big"})
+        self.assertGreaterEqual(serialized["features"]["big"]["wall"], 0.0)
+        self.assertGreater(
+            serialized["features"]["big"]["peak_memory"], 100000)
+
+    def test_timings_untracked_memory(self):
+        run = FeatureExtractionRun(Data(self.morphology, a=2))
+        run.selected_features = [self.foo]
+        run.extract()
+
+        timing = run.serialize()["timings"]["features"]["foo"]
+        self.assertEqual(set(timing), {"wall", "cpu"})
@@ -0,0 +1,67 @@
+import unittest
+import shutil
+import tempfile
+import os
+
+import numpy as np
+
+from neuron_morphology.feature_extractor.feature_table import (
+    FeatureTableWriter, load_feature_table)
+
+
+class TestFeatureTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "table.h5")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, rows):
+        writer = FeatureTableWriter(self.path)
+        for identifier, features in rows:
+            writer.append(identifier, features)
+        writer.close()
+
+    def test_round_trip(self):
+        values = [0.1, 1.0 / 3.0, np.pi, 1e-300]
+        self.write([
+            ("a", {"x": values[0], "y": values[1], "name": "salmon"}),
+            ("b", {"x": values[2], "y": values[3], "count": 7, "flag": True}),
+        ])
+
+        table = load_feature_table(self.path)
+        self.assertIsInstance(table.values, np.memmap)
+        self.assertEqual(table.reconstruction_ids, ["a", "b"])
+        self.assertEqual(table.columns, ["x", "y", "count", "flag"])
+        self.assertEqual(table.text_columns, ["name"])
+
+        self.assertEqual(table.values[0, 0], values[0])
+        self.assertEqual(table.values[0, 1], values[1])
+        self.assertEqual(table.values[1, 0], values[2])
+        self.assertEqual(table.values[1, 1], values[3])
+        self.assertTrue(np.isnan(table.values[0, 2]))
+        self.assertEqual(table.values[1, 3], 1.0)
+        self.assertEqual(list(table.text_values[:, 0]), ["salmon", ""])
+
+        self.assertFalse(os.path.exists(self.path + ".partial"))
+
+    def test_to_dataframe(self):
+        self.write([("a", {"x": 1.5, "name": "pike"}), ("b", {"x": None})])
+        frame = load_feature_table(self.path).to_dataframe()
+
+        self.assertEqual(frame.loc["a", "x"], 1.5)
+        self.assertTrue(np.isnan(frame.loc["b", "x"]))
+        self.assertEqual(frame.loc["a", "name"], "pike")
+
+    def test_no_mmap(self):
+        self.write([("a", {"x": 2.0})])
+        table = load_feature_table(self.path, mmap=False)
+        self.assertNotIsInstance(table.values, np.memmap)
+        self.assertEqual(table.values[0, 0], 2.0)
+
+    def test_empty(self):
+        self.write([])
+        table = load_feature_table(self.path)
+        self.assertEqual(table.values.shape, (0, 0))
@@ -9,6 +9,8 @@ import pandas as pd
 from neuron_morphology.feature_extractor.feature_extraction_run import \
     FeatureExtractionRun
 import neuron_morphology.feature_extractor.feature_writer as fw
+from neuron_morphology.feature_extractor.feature_table import \
+    load_feature_table
 from neuron_morphology.features.layer.layer_histogram import (
     EarthMoversDistanceResult, 
     LayerHistogram, 
@@ -89,6 +91,16 @@ class TestFeatureWriter(unittest.TestCase):
             check_like=True
         )
 
+    def test_write_h5_table(self):
+        table_path = os.path.join(self.tmpdir, "table.h5")
+        writer = fw.FeatureWriter(self.heavy_path, table_path)
+        writer.output = {"a": {"results": {"x": 1.25, "y": {"z": 3}}}}
+        writer.write_table()
+
+        table = load_feature_table(table_path)
+        self.assertEqual(table.columns, ["x", "y.z"])
+        self.assertTrue(np.allclose(table.values, [[1.25, 3.0]]))
+
 class TestFeatureFormatters(TestFeatureWriter):
 
     def test_add_layer_histogram(self):
@@ -99,9 +111,26 @@ class TestFeatureFormatters(TestFeatureWriter):
 
         self.assertTrue(writer.has_heavy)
         assert np.allclose(
-            writer.heavy_file["fish/fowl/counts"][:],
+            writer.heavy_file["fowl/counts"][0],
             [1, 2, 3]
         )
+        self.assertEqual(
+            list(writer.heavy_file["fowl/owners"].asstr()[:]), ["fish"])
+
+    def test_layer_histograms_consolidated(self):
+
+        writer = fw.FeatureWriter(self.heavy_path)
+        fw.add_layer_histogram(
+            writer, "a", "hist", LayerHistogram([1, 2], [0.0, 1.0, 2.0]))
+        fw.add_layer_histogram(
+            writer, "b", "hist", LayerHistogram([3, 4, 5], [0.0, 1.0, 2.0, 3.0]))
+        writer.write()
+
+        histograms = fw.read_layer_histograms(self.heavy_path, "hist")
+        self.assertEqual(set(histograms), {"a", "b"})
+        self.assertTrue(np.allclose(histograms["a"].counts, [1, 2]))
+        self.assertTrue(np.allclose(histograms["a"].bin_edges, [0, 1, 2]))
+        self.assertTrue(np.allclose(histograms["b"].counts, [3, 4, 5]))
 
     def test_has_subkey(self):
         self.assertTrue(fw.has_subkey("fish", "fowl.fish.mammal"))
@@ -115,3 +144,115 @@ class TestFeatureFormatters(TestFeatureWriter):
 
         self.assertEqual(obtained["interpretation"], "BothPresent")
         self.assertEqual(obtained["result"], 1.0)
+
+
+class TestStreamingFeatureWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.heavy_path = os.path.join(self.tmpdir, "heavy.h5")
+        self.table_path = os.path.join(self.tmpdir, "table.csv")
+        self.results_path = os.path.join(self.tmpdir, "results.jsonl")
+
+        self.outputs = {
+            "a": {"results": {"fish": "salmon", "fowl": "hawk"}},
+            "b": {"results": {"fish": "pike", "mammal": { "marsupial": "koala"} } }
+        }
+        self.expected_output_table = pd.DataFrame(
+            {
+                "fish": ["salmon", "pike"], 
+                "fowl": ["hawk", None], 
+                "mammal.marsupial": [None, "koala"]
+            },
+            index=pd.Index(name="reconstruction_id", data=["a", "b"])
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def streaming_writer(self, table_path=None, flush_every=100):
+        return fw.StreamingFeatureWriter(
+            self.heavy_path, 
+            self.results_path, 
+            table_path, 
+            fw.DEFAULT_FEATURE_FORMATTERS,
+            flush_every=flush_every
+        )
+
+    def test_stream_table(self):
+        writer = self.streaming_writer(self.table_path)
+        for identifier, run in self.outputs.items():
+            writer.add_run(identifier, run)
+        writer.write_table()
+        output = writer.write()
+
+        self.assertEqual(output["num_reconstructions"], 2)
+        self.assertEqual(output["table_path"], self.table_path)
+
+        obt = pd.read_csv(self.table_path)
+        obt.set_index("reconstruction_id", inplace=True)
+
+        pd.testing.assert_frame_equal(
+            obt, 
+            self.expected_output_table,
+            check_like=True
+        )
+
+    def test_stream_results(self):
+        writer = self.streaming_writer()
+        writer.add_run("a", {
+            "results": {
+                "count": np.int64(3), 
+                "array": np.arange(3), 
+                "nested": {"value": np.float64(1.5)}
+            },
+            "selected_marks": ["AMark"]
+        })
+        writer.add_run("b", {"results": {"count": 4}})
+        writer.write()
+
+        obtained = list(fw.read_results(self.results_path))
+        self.assertEqual(obtained[0], ("a", {
+            "results": {"count": 3, "array": [0, 1, 2], "nested.value": 1.5},
+            "selected_marks": ["AMark"]
+        }))
+        self.assertEqual(obtained[1], ("b", {"results": {"count": 4}}))
+
+    def test_flush(self):
+        writer = self.streaming_writer(self.table_path, flush_every=1)
+        writer.add_run("a", self.outputs["a"])
+
+        # readable before the writer is finished
+        self.assertEqual(len(list(fw.read_results(self.results_path))), 1)
+        self.assertEqual(
+            pd.read_csv(self.table_path)["fish"].tolist(), ["salmon"])
+        writer.write()
+
+    def test_stream_h5_table(self):
+        table_path = os.path.join(self.tmpdir, "table.h5")
+        writer = self.streaming_writer(table_path)
+        writer.add_run("a", {"results": {"x": 0.1, "fish": "salmon"}})
+        writer.add_run("b", {"results": {"x": 1.0 / 3.0, "y": 2}})
+        writer.write()
+
+        table = load_feature_table(table_path)
+        self.assertEqual(table.columns, ["x", "y"])
+        self.assertEqual(table.values[1, 0], 1.0 / 3.0)
+        self.assertEqual(table.values[1, 1], 2.0)
+        self.assertEqual(list(table.text_values[:, 0]), ["salmon", ""])
+
+    def test_heavy(self):
+        writer = self.streaming_writer()
+        writer.add_run("a", {"results": {
+            "axon.normalized_depth_histogram": 
+                LayerHistogram([1, 2, 3], [4, 5, 6])
+        }})
+        output = writer.write()
+
+        self.assertEqual(output["heavy_path"], self.heavy_path)
+        record = next(fw.read_results(self.results_path))[1]
+        self.assertEqual(
+            record["results"]["axon.normalized_depth_histogram"], 
+            self.heavy_path
+        )
@@ -62,6 +62,18 @@ class TestIntrinsic(unittest.TestCase):
             extractor.extract(self.data).results
         )
 
+    def test_batched_num_nodes(self):
+        variants = [{}, {"node_types": [2]}, {"node_types": [3, 2]}]
+        self.assertEqual(
+            ic.batched_num_nodes(self.data, variants),
+            [ic.num_nodes(self.data, **variant) for variant in variants])
+
+    def test_batched_num_tips(self):
+        variants = [{}, {"node_types": [1, 3]}, {"node_types": [3, 3]}]
+        self.assertEqual(
+            ic.batched_num_tips(self.data, variants),
+            [ic.num_tips(self.data, **variant) for variant in variants])
+
     def test_all_neurites_num_nodes(self):
         self.assertEqual(
             self.extract(self.num_nodes)['all_neurites.num_nodes'],
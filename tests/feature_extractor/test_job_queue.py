@@ -0,0 +1,117 @@
+import unittest
+import tempfile
+import shutil
+import multiprocessing as mp
+import os
+
+import pandas as pd
+
+from neuron_morphology.feature_extractor.job_queue import (
+    JobQueue, run_worker, merge_results, PENDING, RUNNING, DONE, FAILED)
+from neuron_morphology.feature_extractor.feature_writer import (
+    StreamingFeatureWriter, read_results)
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.queue_path = os.path.join(self.tmpdir, "jobs.db")
+
+        self.identifiers = []
+        for ii in range(6):
+            builder = MorphologyBuilder().root()
+            for _ in range(ii + 2):
+                builder.axon()
+            path = os.path.join(self.tmpdir, f"{ii}.swc")
+            write_swc(pd.DataFrame(builder.nodes), path)
+            self.identifiers.append(path)
+
+        self.queue = JobQueue(self.queue_path, max_attempts=2)
+        self.queue.configure({"feature_set": "aibs_default"})
+        self.queue.submit([{"swc_path": path} for path in self.identifiers])
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_submit_idempotent(self):
+        added = self.queue.submit([{"swc_path": self.identifiers[0]}])
+        self.assertEqual(added, 0)
+        self.assertEqual(self.queue.counts()[PENDING], 6)
+        self.assertEqual(
+            self.queue.settings(), {"feature_set": "aibs_default"})
+
+    def test_claim_largest_first(self):
+        identifier, spec = self.queue.claim("w")
+        self.assertEqual(identifier, self.identifiers[-1])
+        self.assertEqual(spec, {"swc_path": self.identifiers[-1]})
+        self.assertEqual(self.queue.counts()[RUNNING], 1)
+
+    def test_fail_retries(self):
+        identifier, _ = self.queue.claim("w")
+        self.queue.fail(identifier, "w", "boom")
+        self.assertEqual(self.queue.counts()[PENDING], 6)
+
+        self.assertEqual(self.queue.claim("w")[0], identifier)
+        self.queue.fail(identifier, "w", "boom again")
+        self.assertEqual(self.queue.counts()[FAILED], 1)
+        self.assertEqual(self.queue.failures(), [
+            {"identifier": identifier, "attempts": 2, "error": "boom again"}
+        ])
+
+    def test_lease_expiry(self):
+        identifier, _ = self.queue.claim("slow")
+
+        self.queue.lease = -1.0
+        reclaimed, _ = self.queue.claim("fast")
+        self.assertEqual(reclaimed, identifier)
+
+        # the original worker no longer holds the job
+        self.assertFalse(self.queue.heartbeat(identifier, "slow"))
+        self.assertFalse(self.queue.complete(identifier, "slow", {}))
+        self.assertTrue(self.queue.complete(identifier, "fast", {}))
+        self.assertEqual(self.queue.counts()[DONE], 1)
+
+    def test_workers(self):
+        workers = [
+            mp.Process(
+                target=run_worker,
+                args=(self.queue_path,),
+                kwargs={"worker": f"w{ii}", "poll_interval": 0.05}
+            )
+            for ii in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=120)
+            self.assertEqual(worker.exitcode, 0)
+
+        self.assertEqual(self.queue.counts()[DONE], 6)
+
+        writer = StreamingFeatureWriter(
+            os.path.join(self.tmpdir, "heavy.h5"),
+            os.path.join(self.tmpdir, "results.jsonl")
+        )
+        output = merge_results(self.queue, writer)
+        self.assertEqual(output["num_reconstructions"], 6)
+
+        results = dict(read_results(output["results_path"]))
+        self.assertEqual(set(results), set(self.identifiers))
+        self.assertEqual(
+            results[self.identifiers[0]]["results"]["axon.num_nodes"], 2)
+
+    def test_worker_records_failures(self):
+        with open(self.identifiers[0], "w") as swc:
+            swc.write("not an swc")
+
+        stats = run_worker(
+            self.queue_path, poll_interval=0.05, max_attempts=2)
+        self.assertEqual(stats, {"completed": 5, "failed": 2})
+        self.assertEqual(
+            [failure["identifier"] for failure in self.queue.failures()],
+            [self.identifiers[0]]
+        )
@@ -8,10 +8,11 @@ import os
 
 import pandas as pd
 import numpy as np
-import h5py
 import pytest
 
 import neuron_morphology.feature_extractor.__main__ as main
+from neuron_morphology.feature_extractor.feature_writer import \
+    read_layer_histograms
 from neuron_morphology.swc_io import write_swc
 from neuron_morphology.constants import (
     SOMA, APICAL_DENDRITE, BASAL_DENDRITE, AXON
@@ -125,11 +126,14 @@ class TestRun(unittest.TestCase):
         self.assertNotIn(
             "axon.apical_dendrite.earth_movers_distance.2", second_results)
 
+        self.assertEqual(
+            obtained["timing_summary"]["axon.num_tips"]["wall"]["count"], 2)
+
     @pytest.mark.skipif(TIMEOUT == 0, reason="potentially long-running test")
     def test_run_heavy_out(self):
         expected_counts = np.zeros(20)
         expected_counts[18] = 1
 
-        with h5py.File(self.heavy_output_path, "r") as hf:
-            counts = hf["first/axon.normalized_depth_histogram.2/counts"][:]
-            assert np.allclose(counts, expected_counts)
+        histograms = read_layer_histograms(
+            self.heavy_output_path, "axon.normalized_depth_histogram.2")
+        assert np.allclose(histograms["first"].counts, expected_counts)
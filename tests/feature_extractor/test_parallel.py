@@ -0,0 +1,80 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import pandas as pd
+
+from tests.objects import (
+    synthetic_morphology, assert_results_close)
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor import parallel
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    resolve_feature_set)
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = synthetic_morphology(1)
+        self.extractor = FeatureExtractor(
+            resolve_feature_set("aibs_default", "fast"))
+
+    @unittest.skipUnless(parallel.can_fork(), "requires fork")
+    def test_choose_num_processes(self):
+        data = Data(self.morphology)
+        num_nodes = len(self.morphology)
+
+        self.assertEqual(parallel.choose_num_processes(data, 1, 1), 1)
+        self.assertEqual(
+            parallel.choose_num_processes(data, 4, num_nodes + 1), 1)
+        self.assertEqual(
+            parallel.choose_num_processes(data, 4, num_nodes), 4)
+
+    def test_is_large_swc(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "a.swc")
+            write_swc(pd.DataFrame(self.morphology.nodes()), path)
+            num_nodes = len(self.morphology)
+
+            self.assertTrue(parallel.is_large_swc(path, num_nodes))
+            self.assertFalse(parallel.is_large_swc(path, num_nodes + 1))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_is_large_swc_short_lines(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "a.swc")
+            with open(path, "w") as swc_file:
+                swc_file.write("1 1 0 0 0 1 -1\n2 2 1 0 0 1 1\n3 2 2 0 0 1 2")
+
+            self.assertTrue(parallel.is_large_swc(path, 3))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    @unittest.skipUnless(parallel.can_fork(), "requires fork")
+    def test_extract(self):
+        expected = self.extractor.extract(Data(self.morphology))
+        obtained = self.extractor.extract(
+            Data(self.morphology), num_processes=2, min_parallel_nodes=1)
+
+        self.assertIn("parallel", obtained.timings["stages"])
+        self.assertNotIn("parallel", expected.timings["stages"])
+        self.assertEqual(
+            set(obtained.timings["features"]), set(expected.results))
+        assert_results_close(
+            self, expected.results, obtained.results, "results")
+
+    @unittest.skipUnless(parallel.can_fork(), "requires fork")
+    def test_extract_failure(self):
+        def fails(data):
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            FeatureExtractor([fails, fails]).extract(
+                Data(self.morphology), num_processes=2, min_parallel_nodes=1)
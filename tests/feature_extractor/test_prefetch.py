@@ -0,0 +1,111 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import pandas as pd
+
+from neuron_morphology.feature_extractor.prefetch import (
+    PrefetchStats, prefetch_swc_data)
+from neuron_morphology.feature_extractor.batch import iter_extract
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.identifiers = []
+        for ii in range(5):
+            builder = MorphologyBuilder().root()
+            for _ in range(ii + 2):
+                builder.axon()
+            path = os.path.join(self.tmpdir, f"{ii}.swc")
+            write_swc(pd.DataFrame(builder.nodes), path)
+            self.identifiers.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def reconstructions(self):
+        return [{"swc_path": path} for path in self.identifiers]
+
+    def test_prefetch_in_order(self):
+        stats = PrefetchStats()
+        loaded = list(prefetch_swc_data(
+            self.reconstructions(), depth=2, stats=stats))
+
+        self.assertEqual(
+            [spec["swc_path"] for spec in loaded], self.identifiers)
+        for spec in loaded:
+            with open(spec["swc_path"], "rb") as swc_file:
+                self.assertEqual(spec["swc_data"], swc_file.read())
+
+        self.assertEqual(stats.num_read, 5)
+        self.assertEqual(
+            stats.bytes_read,
+            sum(os.path.getsize(path) for path in self.identifiers)
+        )
+        self.assertEqual(set(stats.timings), set(self.identifiers))
+
+    def test_max_bytes(self):
+        stats = PrefetchStats()
+        largest = max(os.path.getsize(path) for path in self.identifiers)
+        list(prefetch_swc_data(
+            self.reconstructions(), depth=4, max_bytes=largest, stats=stats))
+
+        self.assertEqual(stats.num_read, 5)
+        self.assertLessEqual(stats.max_bytes_in_flight, largest)
+
+    def test_unreadable(self):
+        missing = {"swc_path": os.path.join(self.tmpdir, "missing.swc")}
+        stats = PrefetchStats()
+        loaded = list(prefetch_swc_data(
+            [missing] + self.reconstructions(), depth=2, stats=stats))
+
+        self.assertEqual(loaded[0], missing)
+        self.assertEqual(stats.num_failed, 1)
+        self.assertEqual(stats.num_read, 5)
+
+    def test_iter_extract(self):
+        stats = PrefetchStats()
+        prefetched = dict(iter_extract(
+            self.reconstructions(), num_processes=2, prefetch_depth=2,
+            prefetch_stats=stats
+        ))
+        unprefetched = dict(iter_extract(
+            self.reconstructions(), num_processes=1))
+
+        self.assertEqual(set(prefetched), set(self.identifiers))
+        self.assertEqual(stats.num_read, 5)
+        self.assertEqual(stats.timings, {})
+
+        for identifier, run in prefetched.items():
+            expected = unprefetched[identifier]["results"]
+            self.assertEqual(set(run["results"]), set(expected))
+            self.assertEqual(
+                run["results"]["axon.num_nodes"], expected["axon.num_nodes"])
+            self.assertEqual(
+                set(run["timings"]["reconstruction"]),
+                {"io", "parse", "extract"}
+            )
+            self.assertEqual(
+                set(unprefetched[identifier]["timings"]["reconstruction"]),
+                {"io", "parse", "extract"}
+            )
+
+    def test_iter_extract_forked(self):
+        # every reconstruction is large enough to be extracted by forking 
+        # this process, so none may be read on a prefetching thread
+        stats = PrefetchStats()
+        runs = dict(iter_extract(
+            self.reconstructions(), num_processes=2, min_parallel_nodes=1,
+            prefetch_depth=2, prefetch_stats=stats
+        ))
+
+        self.assertEqual(set(runs), set(self.identifiers))
+        self.assertEqual(stats.num_read, 0)
+        for run in runs.values():
+            self.assertIn("io", run["timings"]["reconstruction"])
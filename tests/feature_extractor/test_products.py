@@ -0,0 +1,139 @@
+import unittest
+
+from neuron_morphology.feature_extractor.data import Data, cached
+from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, specialize)
+from neuron_morphology.feature_extractor.feature_specialization import (
+    FeatureSpecialization)
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.products import (
+    Product, FeaturePlan, consumes, argument)
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestProducts(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = (
+            MorphologyBuilder()
+                .root()
+                    .axon()
+                        .axon().up()
+                    .basal_dendrite()
+                .build()
+        )
+
+        self.calls = []
+
+        def nodes_of(morphology, node_types=None):
+            self.calls.append(("nodes", node_types))
+            return morphology.get_node_by_types(node_types)
+        self.nodes_of = nodes_of
+
+        def count(morphology, nodes, scale=1):
+            self.calls.append(("count", scale))
+            return len(nodes) * scale
+
+        self.nodes = Product("nodes", nodes_of)
+        self.count = Product("count", count, requires={"nodes": self.nodes})
+
+    def test_parameters(self):
+        self.assertEqual(self.count.parameters, ["scale", "node_types"])
+        self.assertEqual(
+            self.count.bind(scale=2), {"scale": 2, "node_types": None})
+
+        with self.assertRaises(TypeError):
+            self.count.bind(bad=3)
+
+    def test_call_cached(self):
+        data = Data(self.morphology)
+        with data.computation_cache():
+            self.assertEqual(self.count(data, node_types=[2], scale=2), 4)
+            self.assertEqual(self.count(data, node_types=[2], scale=3), 6)
+
+            # products without requirements share keys with cached
+            self.assertEqual(
+                len(cached(data, self.nodes_of, node_types=[2])), 2)
+
+        self.assertEqual(
+            self.calls, [("nodes", [2]), ("count", 2), ("count", 3)])
+
+    def test_call_uncached(self):
+        self.assertEqual(self.count(self.morphology), 4)
+        self.assertEqual(self.count(self.morphology), 4)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_plan(self):
+
+        @consumes(self.count, scale=2)
+        def doubled(data, node_types=None):
+            return self.count(data, node_types=node_types, scale=2)
+
+        @consumes(self.nodes, node_types=argument("types"))
+        def num_typed(data, types=None):
+            return len(self.nodes(data, node_types=types))
+
+        class AxonSpec(FeatureSpecialization):
+            name = "axon"
+            marks = set()
+            kwargs = {"node_types": [2]}
+
+        features = list(specialize(doubled, [AxonSpec]).values())
+        features.append(num_typed)
+
+        plan = FeaturePlan(features)
+        self.assertEqual(plan.num_requests, 2)
+        self.assertEqual(plan.describe(), [
+            {
+                "product": "nodes",
+                "kwargs": {"node_types": [2]},
+                "consumers": ["count"]
+            },
+            {
+                "product": "count",
+                "kwargs": {"scale": 2, "node_types": [2]},
+                "consumers": ["axon.doubled"]
+            },
+            {
+                "product": "nodes",
+                "kwargs": {"node_types": None},
+                "consumers": ["num_typed"]
+            }
+        ])
+
+    def test_unresolved(self):
+
+        @consumes(self.nodes)
+        def needs_types(data, node_types):
+            return len(self.nodes(data, node_types=node_types))
+
+        plan = FeaturePlan([needs_types])
+        self.assertEqual(len(plan), 0)
+        self.assertEqual(plan.unresolved, [("needs_types", "nodes")])
+
+    def test_extract(self):
+
+        class AMark(Mark):
+            @classmethod
+            def validate(cls, data):
+                return True
+
+        @marked(AMark)
+        @consumes(self.nodes)
+        def num_nodes(data, node_types=None):
+            return len(self.nodes(data, node_types=node_types))
+
+        @consumes(self.count)
+        def also_num_nodes(data, node_types=None):
+            return self.count(data, node_types=node_types)
+
+        extractor = FeatureExtractor([num_nodes, also_num_nodes])
+        self.assertEqual(len(extractor.plan()), 2)
+        self.assertEqual(len(extractor.plan(Data(self.morphology))), 2)
+
+        run = extractor.extract(Data(self.morphology))
+        self.assertEqual(
+            run.results, {"num_nodes": 4, "also_num_nodes": 4})
+        self.assertEqual(self.calls, [("nodes", None), ("count", 1)])
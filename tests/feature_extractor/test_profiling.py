@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+import tracemalloc
+
+from neuron_morphology.feature_extractor.profiling import (
+    Timing, timed, tracking_memory, serialize_timings, summarize_timings)
+
+
+class TestTimed(unittest.TestCase):
+
+    def test_timed(self):
+        record = {}
+        with timed(record, "step"):
+            sum(range(1000))
+
+        self.assertGreaterEqual(record["step"].wall, 0.0)
+        self.assertIsNone(record["step"].peak_memory)
+
+    def test_timed_error(self):
+        record = {}
+        with self.assertRaises(ValueError):
+            with timed(record, "step"):
+                raise ValueError()
+
+        self.assertIn("step", record)
+
+    def test_tracking_memory(self):
+        record = {}
+        with tracking_memory():
+            with timed(record, "step", track_memory=True):
+                data = [0] * 100000
+            del data
+
+        self.assertGreater(record["step"].peak_memory, 100000)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_nested_peak(self):
+        record = {}
+        with tracking_memory():
+            with timed(record, "outer", track_memory=True):
+                data = bytearray(2 * 10 ** 6)
+                del data
+                with timed(record, "inner", track_memory=True):
+                    small = bytearray(10 ** 5)
+                    del small
+
+        self.assertGreaterEqual(record["outer"].peak_memory, 2 * 10 ** 6)
+        self.assertGreaterEqual(record["inner"].peak_memory, 10 ** 5)
+        self.assertLess(record["inner"].peak_memory, 2 * 10 ** 6)
+
+    def test_without_reset_peak(self):
+        record = {}
+        with mock.patch(
+            "neuron_morphology.feature_extractor.profiling._HAS_RESET_PEAK", 
+            False
+        ):
+            with tracking_memory():
+                with timed(record, "outer", track_memory=True):
+                    data = bytearray(10 ** 6)
+                    with timed(record, "inner", track_memory=True):
+                        more = bytearray(10 ** 6)
+                        del more
+                    del data
+
+        self.assertGreaterEqual(record["inner"].peak_memory, 10 ** 6)
+        self.assertGreaterEqual(record["outer"].peak_memory, 2 * 10 ** 6)
+
+    def test_serialize(self):
+        self.assertEqual(
+            serialize_timings({"a": Timing(1.0, 0.5), "b": Timing(1, 2, 3)}),
+            {
+                "a": {"wall": 1.0, "cpu": 0.5},
+                "b": {"wall": 1, "cpu": 2, "peak_memory": 3}
+            }
+        )
+
+
+class TestSummarizeTimings(unittest.TestCase):
+
+    def test_summarize(self):
+        runs = [
+            {"timings": {"features": {"a": {"wall": float(ii), "cpu": 1.0}}}}
+            for ii in range(101)
+        ]
+        runs.append({"results": {}})
+
+        summary = summarize_timings(runs)
+        self.assertEqual(summary["a"]["wall"]["p50"], 50.0)
+        self.assertEqual(summary["a"]["wall"]["p95"], 95.0)
+        self.assertEqual(summary["a"]["wall"]["max"], 100.0)
+        self.assertEqual(summary["a"]["cpu"]["count"], 101)
@@ -0,0 +1,212 @@
+import unittest
+import random
+import tempfile
+import shutil
+import os
+import sys
+import subprocess
+from functools import partial
+from unittest import mock
+
+import numpy as np
+
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
+from neuron_morphology.feature_extractor import result_cache
+from neuron_morphology.feature_extractor.mark import (
+    RequiresApical, RequiresRoot, validate_mark)
+from neuron_morphology.feature_extractor.result_cache import (
+    FeatureResultCache, describe_feature, hash_data, share_parameters,
+    summarize_cache_statistics)
+
+
+HASH_SCRIPT = """
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.result_cache import hash_data
+morphology = MorphologyBuilder().root(0, 0, 0).axon(1, 0, 0).build()
+print(hash_data(Data(morphology, names={"a", "b", "c", "d"})))
+"""
+
+
+def build_morphology(num_axon_nodes=2):
+    builder = MorphologyBuilder()
+    builder.rng = random.Random(0)
+    builder.root()
+    for _ in range(num_axon_nodes):
+        builder.axon()
+    return builder.build()
+
+
+class TestFeatureResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.sqlite")
+        self.cache = FeatureResultCache(self.path)
+
+        self.calls = []
+
+        def counted(data, scale=1):
+            self.calls.append(scale)
+            return len(data.morphology.nodes()) * scale
+
+        self.feature = MarkedFeature(set(), counted, name="counted")
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_put_get(self):
+        self.assertEqual(self.cache.get("a", self.feature), (False, None))
+        self.cache.put("a", self.feature, [1, 2])
+        self.cache.commit()
+
+        self.assertEqual(self.cache.get("a", self.feature), (True, [1, 2]))
+        self.assertEqual(
+            self.cache.statistics(), {"hits": 1, "misses": 1, "evictions": 0})
+
+    def test_persistent(self):
+        self.cache.put("a", self.feature, 3)
+        self.cache.close()
+
+        self.cache = FeatureResultCache(self.path)
+        self.assertEqual(self.cache.get("a", self.feature), (True, 3))
+
+    def test_specialization_changed(self):
+        self.cache.put("a", self.feature.partial(scale=2), 3)
+        found, _ = self.cache.get("a", self.feature.partial(scale=3))
+        self.assertFalse(found)
+
+    def test_evict(self):
+        self.cache.max_bytes = 1000
+        self.cache.put("a", self.feature, b"x" * 600)
+        self.cache.commit()
+        self.cache.put("b", self.feature, b"x" * 600)
+        self.cache.commit()
+
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.statistics()["evictions"], 1)
+        self.assertTrue(self.cache.get("b", self.feature)[0])
+        self.assertFalse(self.cache.get("a", self.feature)[0])
+
+    def test_hash_data(self):
+        self.assertEqual(
+            hash_data(Data(build_morphology())),
+            hash_data(Data(build_morphology()))
+        )
+        self.assertNotEqual(
+            hash_data(Data(build_morphology())),
+            hash_data(Data(build_morphology(3)))
+        )
+        self.assertNotEqual(
+            hash_data(Data(build_morphology())),
+            hash_data(Data(build_morphology(), extra=1))
+        )
+
+    def test_hash_data_mark_validation(self):
+        data = Data(build_morphology())
+        before = hash_data(data)
+        for mark in (RequiresRoot, RequiresApical):
+            validate_mark(mark, data)
+        self.assertTrue(data._mark_validity)
+        self.assertEqual(before, hash_data(data))
+
+    def test_hash_data_across_processes(self):
+        digests = set()
+        for seed in ("1", "2"):
+            digests.add(subprocess.run(
+                [sys.executable, "-c", HASH_SCRIPT],
+                env=dict(os.environ, PYTHONHASHSEED=seed),
+                check=True, stdout=subprocess.PIPE
+            ).stdout.strip())
+        self.assertEqual(len(digests), 1)
+
+    def test_hash_data_arrays(self):
+        self.assertNotEqual(
+            hash_data(Data(build_morphology(), depths=np.arange(3))),
+            hash_data(Data(build_morphology(), depths=np.arange(3) + 1))
+        )
+        self.assertIsNone(
+            hash_data(Data(build_morphology(), unhashable=object())))
+
+    def test_hash_data_shared(self):
+        depths = {"layer": np.arange(5)}
+        shared = share_parameters({"depths": depths})
+        data = Data(build_morphology(), depths=depths)
+
+        with mock.patch(
+            "neuron_morphology.feature_extractor.result_cache._digest",
+            wraps=result_cache._digest
+        ) as digest:
+            shared_hash = hash_data(data, shared)
+        self.assertFalse(any(
+            call.args[0] is depths for call in digest.call_args_list))
+        self.assertEqual(shared_hash, hash_data(data))
+
+    def test_describe_feature_code(self):
+        def first(data):
+            return 1
+
+        def second(data):
+            return 2
+
+        second.__qualname__ = first.__qualname__
+        self.assertNotEqual(
+            describe_feature(MarkedFeature(set(), first, name="feature")),
+            describe_feature(MarkedFeature(set(), second, name="feature"))
+        )
+        self.assertEqual(
+            describe_feature(self.feature.partial(scale=2)),
+            describe_feature(self.feature.partial(scale=2))
+        )
+
+    def test_extract(self):
+        extractor = FeatureExtractor([
+            self.feature,
+            MarkedFeature(
+                set(), partial(self.feature.feature, scale=2), name="scaled")
+        ])
+
+        first = extractor.extract(
+            Data(build_morphology()), result_cache=self.cache)
+        second = extractor.extract(
+            Data(build_morphology()), result_cache=self.cache)
+
+        self.assertEqual(self.calls, [1, 2])
+        self.assertEqual(first.results, second.results)
+        self.assertEqual(
+            first.serialize()["result_cache"], {"hits": 0, "misses": 2})
+        self.assertEqual(
+            second.serialize()["result_cache"], {"hits": 2, "misses": 0})
+
+    def test_extract_new_feature(self):
+        FeatureExtractor([self.feature]).extract(
+            Data(build_morphology()), result_cache=self.cache)
+        run = FeatureExtractor([
+            self.feature,
+            MarkedFeature(
+                set(), partial(self.feature.feature, scale=2), name="scaled")
+        ]).extract(Data(build_morphology()), result_cache=self.cache)
+
+        self.assertEqual(self.calls, [1, 2])
+        self.assertEqual(run.results, {"counted": 3, "scaled": 6})
+        self.assertEqual(run.cache_statistics, {"hits": 1, "misses": 1})
+
+    def test_no_cache(self):
+        run = FeatureExtractor([self.feature]).extract(
+            Data(build_morphology()))
+        self.assertNotIn("result_cache", run.serialize())
+
+    def test_summarize(self):
+        self.assertEqual(
+            summarize_cache_statistics([
+                {"result_cache": {"hits": 1, "misses": 2}},
+                {},
+                {"result_cache": {"hits": 3, "misses": 0}}
+            ]),
+            {"hits": 4, "misses": 2}
+        )
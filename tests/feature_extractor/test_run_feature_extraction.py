@@ -0,0 +1,97 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import pandas as pd
+
+import neuron_morphology.feature_extractor.run_feature_extraction as rfe
+from neuron_morphology.feature_extractor.batch import default_chunksize
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestPreparedExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.swc_path = os.path.join(self.tmpdir, "test.swc")
+
+        nodes = (
+            MorphologyBuilder()
+                .root()
+                    .axon()
+                        .axon().up()
+                        .axon().up(2)
+                    .basal_dendrite()
+                        .basal_dendrite()
+                .nodes
+        )
+        write_swc(pd.DataFrame(nodes), self.swc_path)
+
+        self.global_parameters = {
+            "reference_layer_depths": {
+                "names": ["1", "2", "wm"],
+                "boundaries": [0, 100, 200, 300]
+            }
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        rfe._worker_setup = None
+
+    def test_prepare(self):
+        setup = rfe.prepare_extraction(
+            "aibs_default", None, ["Geometric"], self.global_parameters)
+
+        self.assertIsNone(setup.only_marks)
+        self.assertEqual(
+            setup.required_marks, {rfe.well_known_marks["Geometric"]})
+        self.assertEqual(
+            setup.global_parameters["reference_layer_depths"]["2"].pia_side, 
+            100
+        )
+
+    def test_prepared_matches(self):
+        setup = rfe.prepare_extraction(
+            "aibs_default", None, None, self.global_parameters)
+
+        identifier, prepared = rfe.run_prepared_extraction(
+            {"swc_path": self.swc_path, "identifier": "a"}, setup)
+        _, repeated = rfe.run_prepared_extraction(
+            {"swc_path": self.swc_path, "identifier": "a"}, setup)
+        _, unprepared = rfe.run_feature_extraction(
+            {"swc_path": self.swc_path, "identifier": "a"},
+            "aibs_default", None, None, self.global_parameters
+        )
+
+        self.assertEqual(identifier, "a")
+        self.assertEqual(prepared["results"]["axon.num_tips"], 2)
+        for run in (repeated, unprepared):
+            self.assertEqual(
+                set(run["selected_features"]), 
+                set(prepared["selected_features"])
+            )
+            self.assertEqual(
+                run["results"]["all_neurites.total_length"],
+                prepared["results"]["all_neurites.total_length"]
+            )
+
+    def test_worker(self):
+        with self.assertRaises(RuntimeError):
+            rfe.run_worker_extraction({"swc_path": self.swc_path})
+
+        rfe.initialize_worker(
+            "aibs_default", None, None, self.global_parameters)
+        identifier, run = rfe.run_worker_extraction(
+            {"swc_path": self.swc_path})
+
+        self.assertEqual(identifier, self.swc_path)
+        self.assertEqual(run["results"]["basal_dendrite.num_nodes"], 2)
+
+
+class TestDefaultChunksize(unittest.TestCase):
+
+    def test_default_chunksize(self):
+        self.assertEqual(default_chunksize(50000, 8), 1563)
+        self.assertEqual(default_chunksize(2, 2), 1)
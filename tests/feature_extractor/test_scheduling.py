@@ -0,0 +1,106 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import pandas as pd
+
+from neuron_morphology.feature_extractor import scheduling
+from neuron_morphology.feature_extractor.__main__ import extract_multiple
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+def write_morphology(path, num_axon_nodes):
+    builder = MorphologyBuilder().root()
+    for _ in range(num_axon_nodes):
+        builder.axon()
+    write_swc(pd.DataFrame(builder.nodes), path)
+
+
+class TestScheduling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.reconstructions = []
+        for name, num_axon_nodes in (("small", 2), ("large", 40), ("mid", 10)):
+            path = os.path.join(self.tmpdir, f"{name}.swc")
+            write_morphology(path, num_axon_nodes)
+            self.reconstructions.append(
+                {"swc_path": path, "identifier": name})
+
+        self.costs = {
+            reconstruction["identifier"]: 
+                scheduling.estimate_cost(reconstruction)
+            for reconstruction in self.reconstructions
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_estimate_cost_missing(self):
+        self.assertEqual(
+            scheduling.estimate_cost(
+                {"swc_path": os.path.join(self.tmpdir, "missing.swc")}),
+            0.0
+        )
+
+    def test_order_largest_first(self):
+        ordered = scheduling.order_reconstructions(
+            self.reconstructions, self.costs)
+        self.assertEqual(
+            [item["identifier"] for item in ordered], 
+            ["large", "mid", "small"]
+        )
+
+    def test_order_input(self):
+        ordered = scheduling.order_reconstructions(
+            self.reconstructions, self.costs, "input")
+        self.assertEqual(ordered, self.reconstructions)
+
+    def test_order_unknown(self):
+        with self.assertRaises(ValueError):
+            scheduling.order_reconstructions(
+                self.reconstructions, self.costs, "smallest_first")
+
+    def test_report(self):
+        report = scheduling.ScheduleReport(num_slowest=2)
+        for identifier, cost in self.costs.items():
+            report.expect(identifier, cost)
+        for identifier, wall in (("small", 1.0), ("large", 3.0), ("mid", 2.0)):
+            report.record(identifier, {"timings": {"reconstruction": {
+                "load": {"wall": wall / 2, "cpu": 0},
+                "extract": {"wall": wall / 2, "cpu": 0}
+            }}})
+        report.makespan = 3.5
+
+        summary = report.summary()
+        self.assertEqual(summary["num_reconstructions"], 3)
+        self.assertAlmostEqual(summary["total_time"], 6.0)
+        self.assertAlmostEqual(summary["rank_correlation"], 1.0)
+        self.assertEqual(
+            [item["identifier"] for item in summary["slowest"]], 
+            ["large", "mid"]
+        )
+
+    def test_extract_multiple(self):
+        report = scheduling.ScheduleReport()
+        extract_multiple(
+            self.reconstructions,
+            "aibs_default",
+            os.path.join(self.tmpdir, "heavy.h5"),
+            num_processes=1,
+            results_path=os.path.join(self.tmpdir, "results.jsonl"),
+            schedule_report=report
+        )
+
+        summary = report.summary()
+        self.assertEqual(summary["schedule"], "largest_first")
+        self.assertEqual(summary["num_reconstructions"], 3)
+        self.assertGreater(summary["makespan"], 0)
+        self.assertEqual(
+            {item["identifier"]: item["expected_cost"] 
+                for item in summary["slowest"]},
+            self.costs
+        )
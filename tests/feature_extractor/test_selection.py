@@ -0,0 +1,77 @@
+import unittest
+
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.feature_extractor import (
+    FeatureExtractor)
+from neuron_morphology.feature_extractor.selection import (
+    FeatureSelection, select_features)
+from neuron_morphology.morphology_builder import MorphologyBuilder
+import neuron_morphology.features.default_features as default_features
+
+
+class AMark(Mark):
+    @classmethod
+    def validate(cls, data):
+        return hasattr(data, "a")
+
+
+class BMark(Mark):
+    @classmethod
+    def validate(cls, data):
+        return hasattr(data, "b")
+
+
+@marked(AMark)
+def foo(data):
+    return data.a
+
+
+@marked(BMark)
+def bar(data):
+    return data.b
+
+
+class TestSelection(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = MorphologyBuilder().root().build()
+
+    def test_select_features(self):
+        self.assertEqual(select_features([foo, bar], {AMark}), [foo])
+        self.assertEqual(select_features([foo, bar], {AMark, BMark}, {BMark}), [bar])
+
+    def test_plan_memoized(self):
+        selection = FeatureSelection([foo, bar], {AMark, BMark})
+        self.assertIs(selection.plan([foo]), selection.plan([foo]))
+        self.assertIsNot(selection.plan([foo]), selection.plan([foo, bar]))
+
+    def test_extractor_reuses_selection(self):
+        extractor = FeatureExtractor([foo, bar])
+        first = extractor.extract(Data(self.morphology, a=1))
+        second = extractor.extract(Data(self.morphology, a=2))
+
+        self.assertIs(first.selection, second.selection)
+        self.assertEqual(second.results, {"foo": 2})
+
+        third = extractor.extract(Data(self.morphology, a=1, b=3))
+        self.assertIsNot(first.selection, third.selection)
+        self.assertEqual(third.results, {"foo": 1, "bar": 3})
+
+    def test_register_invalidates(self):
+        extractor = FeatureExtractor([foo])
+        first = extractor.select({AMark, BMark})
+        extractor.register_features([bar])
+        second = extractor.select({AMark, BMark})
+
+        self.assertEqual(first.features, [foo])
+        self.assertEqual(second.features, [foo, bar])
+
+    def test_default_features_lazy(self):
+        self.assertIs(
+            default_features.default_features,
+            default_features.__getattr__("default_features")
+        )
+        with self.assertRaises(AttributeError):
+            default_features.not_a_feature_set
@@ -0,0 +1,173 @@
+import unittest
+import tempfile
+import shutil
+import threading
+import json
+import os
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+import pandas as pd
+
+from neuron_morphology.feature_extractor.server import (
+    ExtractionService, FeatureExtractionServer)
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class Crash:
+    """ Kills the worker process which unpickles it
+    """
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+class TestServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+
+        cls.swc_paths = []
+        for ii in range(3):
+            builder = MorphologyBuilder().root()
+            for _ in range(ii + 2):
+                builder.axon()
+            path = os.path.join(cls.tmpdir, f"{ii}.swc")
+            write_swc(pd.DataFrame(builder.nodes), path)
+            cls.swc_paths.append(path)
+
+        cls.server = FeatureExtractionServer(
+            ExtractionService(num_processes=2, max_wait=0.05))
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+        host, port = cls.server.server_address[:2]
+        cls.url = f"http://{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        shutil.rmtree(cls.tmpdir)
+
+    def post(self, body, content_type="application/json", query=""):
+        request = Request(
+            f"{self.url}/extract{query}", 
+            data=body, 
+            headers={"Content-Type": content_type}
+        )
+        with urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_health(self):
+        with urlopen(f"{self.url}/health") as response:
+            status = json.loads(response.read())
+        self.assertEqual(status["status"], "ok")
+        self.assertEqual(status["num_processes"], 2)
+
+    def test_paths(self):
+        response = self.post(json.dumps({"reconstructions": [
+            {"swc_path": path} for path in self.swc_paths
+        ]}).encode())
+
+        self.assertEqual(set(response["results"]), set(self.swc_paths))
+        self.assertEqual(
+            response["results"][self.swc_paths[0]]["results"]
+                ["axon.num_nodes"], 
+            2
+        )
+        self.assertEqual(response["failures"], {})
+
+    def test_bytes(self):
+        with open(self.swc_paths[1], "rb") as swc_file:
+            contents = swc_file.read()
+
+        response = self.post(
+            contents, "application/octet-stream", "?identifier=uploaded")
+        self.assertEqual(
+            response["results"]["uploaded"]["results"]["axon.num_nodes"], 3)
+
+        response = self.post(json.dumps({"reconstructions": [
+            {"swc": contents.decode(), "identifier": "inline"}
+        ]}).encode())
+        self.assertEqual(
+            response["results"]["inline"]["results"]["axon.num_nodes"], 3)
+
+    def test_concurrent(self):
+        def request(path):
+            return self.post(
+                json.dumps({"reconstructions": [{"swc_path": path}]}).encode())
+
+        with ThreadPoolExecutor(3) as executor:
+            responses = list(executor.map(request, self.swc_paths))
+
+        for path, response in zip(self.swc_paths, responses):
+            self.assertEqual(list(response["results"]), [path])
+
+    def test_failure(self):
+        response = self.post(
+            b"not an swc", "text/plain", "?identifier=broken")
+        self.assertEqual(response["results"], {})
+        self.assertIn("broken", response["failures"])
+
+    def test_invalid(self):
+        with self.assertRaises(HTTPError) as context:
+            self.post(b"{}")
+        self.assertEqual(context.exception.code, 400)
+
+    def test_path_root(self):
+        self.server.path_root = self.tmpdir
+        try:
+            response = self.post(json.dumps({"reconstructions": [
+                {"swc_path": self.swc_paths[0]}
+            ]}).encode())
+            self.assertEqual(list(response["results"]), [self.swc_paths[0]])
+
+            outside = os.path.join(self.tmpdir, "..", "outside.swc")
+            with self.assertRaises(HTTPError) as context:
+                self.post(json.dumps({"reconstructions": [
+                    {"swc_path": outside}
+                ]}).encode())
+            self.assertEqual(context.exception.code, 403)
+        finally:
+            self.server.path_root = None
+
+    def test_non_loopback(self):
+        with self.assertRaises(ValueError):
+            FeatureExtractionServer(self.server.service, "0.0.0.0")
+
+    def test_extraction_error(self):
+        with mock.patch.object(
+            self.server.service, "extract", 
+            side_effect=RuntimeError("pool failed")
+        ):
+            with self.assertRaises(HTTPError) as context:
+                self.post(json.dumps({"reconstructions": [
+                    {"swc_path": self.swc_paths[0]}
+                ]}).encode())
+
+        self.assertEqual(context.exception.code, 500)
+        self.assertIn(
+            "pool failed", json.loads(context.exception.read())["error"])
+
+    def test_worker_died(self):
+        service = ExtractionService(num_processes=2, max_wait=0.05)
+        try:
+            with self.assertRaises(BrokenProcessPool):
+                service.extract([
+                    {"swc_path": self.swc_paths[0]},
+                    {"swc_path": self.swc_paths[1], "crash": Crash()}
+                ])
+
+            results, failures = service.extract(
+                [{"swc_path": self.swc_paths[0]}])
+            self.assertEqual(list(results), [self.swc_paths[0]])
+            self.assertEqual(service.status()["num_restarts"], 1)
+        finally:
+            service.close()
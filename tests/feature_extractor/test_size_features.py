@@ -85,6 +85,28 @@ class TestTotalLength(MorphoSizeTest):
         self.assertEqual(obtained, 10)
 
 
+class TestBatched(MorphoSizeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.variants = [{}, {"node_types": [AXON]}, {"node_types": [SOMA, AXON]}]
+
+    def check(self, feature, batched):
+        np.testing.assert_allclose(
+            batched(self.morphology, self.variants),
+            [feature(self.morphology, **variant) for variant in self.variants]
+        )
+
+    def test_total_length(self):
+        self.check(size.total_length, size.batched_total_length)
+
+    def test_total_surface_area(self):
+        self.check(size.total_surface_area, size.batched_total_surface_area)
+
+    def test_total_volume(self):
+        self.check(size.total_volume, size.batched_total_volume)
+
+
 class TestTotalSurfaceArea(MorphoSizeTest):
     # see morphology tests for tests that vary radii
 
@@ -0,0 +1,199 @@
+import unittest
+import tempfile
+import shutil
+import os
+import time
+import multiprocessing as mp
+from unittest import mock
+
+import pandas as pd
+
+from neuron_morphology.feature_extractor import supervisor
+from neuron_morphology.feature_extractor.__main__ import extract_multiple
+from neuron_morphology.feature_extractor.feature_writer import read_results
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+def work(task):
+    kind, value = task
+    if kind == "sleep":
+        time.sleep(value)
+    elif kind == "allocate":
+        block = bytearray(value)
+        for ii in range(0, len(block), 4096):
+            block[ii] = 1
+        time.sleep(10)
+    elif kind == "fork_allocate":
+        child = os.fork()
+        if child == 0:
+            work(("allocate", value))
+            os._exit(0)
+        os.waitpid(child, 0)
+    elif kind == "raise":
+        raise ValueError(value)
+    elif kind == "exit":
+        os._exit(value)
+    return value
+
+
+class TestSupervisedPool(unittest.TestCase):
+
+    def run_tasks(self, tasks, **kwargs):
+        with supervisor.SupervisedPool(work, 2, **kwargs) as pool:
+            outcomes = {
+                task: (result, failure) 
+                for task, result, failure in pool.imap_unordered(tasks)
+            }
+            return outcomes, pool.num_replaced
+
+    def test_results(self):
+        tasks = [("sleep", 0), ("sleep", 0.01), ("sleep", 0.02)]
+        outcomes, num_replaced = self.run_tasks(tasks)
+
+        self.assertEqual(
+            outcomes, {task: (task[1], None) for task in tasks})
+        self.assertEqual(num_replaced, 0)
+
+    def test_timeout(self):
+        tasks = [("sleep", 30), ("sleep", 0), ("sleep", 0)]
+        start = time.perf_counter()
+        outcomes, num_replaced = self.run_tasks(tasks, timeout=0.5)
+
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertEqual(outcomes[("sleep", 30)][1].reason, "timeout")
+        self.assertEqual(outcomes[("sleep", 0)], (0, None))
+        self.assertEqual(num_replaced, 1)
+
+    def test_timeout_unmeasured(self):
+        with mock.patch.object(
+            supervisor, "group_memory", 
+            side_effect=AssertionError("memory measured")
+        ):
+            outcomes, _ = self.run_tasks(
+                [("sleep", 30), ("sleep", 0)], timeout=0.5)
+
+        failure = outcomes[("sleep", 30)][1]
+        self.assertEqual(failure.reason, "timeout")
+        self.assertIsNone(failure.peak_memory)
+
+    def test_error(self):
+        outcomes, num_replaced = self.run_tasks(
+            [("raise", "bad"), ("sleep", 0)])
+
+        failure = outcomes[("raise", "bad")][1]
+        self.assertEqual(failure.reason, "error")
+        self.assertIn("ValueError: bad", failure.message)
+        self.assertEqual(outcomes[("sleep", 0)], (0, None))
+        self.assertEqual(num_replaced, 0)
+
+    def test_crashed(self):
+        outcomes, num_replaced = self.run_tasks(
+            [("exit", 3), ("sleep", 0), ("sleep", 0.01)])
+
+        self.assertEqual(outcomes[("exit", 3)][1].reason, "crashed")
+        self.assertEqual(outcomes[("sleep", 0.01)], (0.01, None))
+        self.assertEqual(num_replaced, 1)
+
+    @unittest.skipUnless(
+        "forkserver" in mp.get_all_start_methods(), "requires forkserver")
+    def test_context(self):
+        outcomes, num_replaced = self.run_tasks(
+            [("exit", 3), ("sleep", 0), ("sleep", 0.01)],
+            context=mp.get_context("forkserver")
+        )
+
+        self.assertEqual(outcomes[("exit", 3)][1].reason, "crashed")
+        self.assertEqual(outcomes[("sleep", 0.01)], (0.01, None))
+        self.assertEqual(num_replaced, 1)
+
+    @unittest.skipIf(
+        supervisor.resident_memory(os.getpid()) is None, 
+        "resident memory is not available"
+    )
+    def test_memory(self):
+        limit = supervisor.resident_memory(os.getpid()) + 100 * 2 ** 20
+        outcomes, num_replaced = self.run_tasks(
+            [("allocate", 400 * 2 ** 20), ("sleep", 0)],
+            max_memory=limit,
+            timeout=60
+        )
+
+        failure = outcomes[("allocate", 400 * 2 ** 20)][1]
+        self.assertEqual(failure.reason, "memory")
+        self.assertGreater(failure.peak_memory, limit)
+        self.assertEqual(outcomes[("sleep", 0)], (0, None))
+        self.assertEqual(num_replaced, 1)
+
+
+    @unittest.skipIf(
+        supervisor.resident_memory(os.getpid()) is None
+        or not hasattr(os, "fork"),
+        "resident memory or fork is not available"
+    )
+    def test_memory_forked(self):
+        limit = supervisor.resident_memory(os.getpid()) + 100 * 2 ** 20
+        outcomes, num_replaced = self.run_tasks(
+            [("fork_allocate", 400 * 2 ** 20), ("sleep", 0)],
+            max_memory=limit,
+            timeout=60
+        )
+
+        failure = outcomes[("fork_allocate", 400 * 2 ** 20)][1]
+        self.assertEqual(failure.reason, "memory")
+        self.assertGreater(failure.peak_memory, limit)
+        self.assertEqual(num_replaced, 1)
+
+    @unittest.skipIf(
+        supervisor.resident_memory(os.getpid()) is None, 
+        "resident memory is not available"
+    )
+    def test_group_memory(self):
+        pgid = os.getpgrp()
+        usage = supervisor.group_memory([pgid, -1])
+
+        self.assertEqual(set(usage), {pgid})
+        self.assertGreater(usage[pgid], 0)
+
+
+class TestSupervisedExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        self.reconstructions = []
+        # a single axon node makes some default features divide by zero
+        for name, num_axon_nodes in (("bad", 1), ("a", 3), ("b", 4)):
+            builder = MorphologyBuilder().root()
+            for _ in range(num_axon_nodes):
+                builder.axon()
+            path = os.path.join(self.tmpdir, f"{name}.swc")
+            write_swc(pd.DataFrame(builder.nodes), path)
+            self.reconstructions.append(
+                {"swc_path": path, "identifier": name})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_failure_recorded(self):
+        results_path = os.path.join(self.tmpdir, "results.jsonl")
+        failures = []
+        extract_multiple(
+            self.reconstructions,
+            "aibs_default",
+            os.path.join(self.tmpdir, "heavy.h5"),
+            num_processes=2,
+            results_path=results_path,
+            task_timeout=600,
+            failures=failures
+        )
+
+        self.assertEqual(
+            [(item["identifier"], item["reason"]) for item in failures],
+            [("bad", "error")]
+        )
+        self.assertIn("ZeroDivisionError", failures[0]["message"])
+        self.assertEqual(
+            {identifier for identifier, _ in read_results(results_path)},
+            {"a", "b"}
+        )
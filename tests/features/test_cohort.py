@@ -0,0 +1,129 @@
+import unittest
+
+import numpy as np
+
+from tests.objects import (
+    test_morphology_large, test_morphology_small,
+    test_morphology_small_branching, test_morphology_small_multiple_trees)
+from neuron_morphology.constants import AXON, BASAL_DENDRITE
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.utilities import unnest
+from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.dimension import dimension
+from neuron_morphology.features.statistics.moments import moments
+from neuron_morphology.features.intrinsic import num_nodes
+from neuron_morphology.features.size import total_length
+from neuron_morphology.features.soma import soma_percentile
+from neuron_morphology.features.cohort import (
+    Cohort, grouped_reduce, cohort_dimension, cohort_moments,
+    cohort_num_nodes, cohort_total_length, cohort_soma_percentile,
+    cohort_feature_table)
+
+
+def assert_rows_close(reference, obtained, row):
+    if isinstance(reference, dict):
+        for key, value in reference.items():
+            assert_rows_close(value, obtained[key], row)
+    else:
+        np.testing.assert_allclose(
+            obtained[row], reference, rtol=1e-7, atol=1e-9, equal_nan=True)
+
+
+class TestCohort(unittest.TestCase):
+
+    def setUp(self):
+        self.morphologies = [
+            test_morphology_large(),
+            test_morphology_small(),
+            test_morphology_small_branching(),
+            test_morphology_small_multiple_trees(),
+            MorphologyBuilder().root(1, 2, 3).axon().axon().up(2)
+                .basal_dendrite().basal_dendrite().build()
+        ]
+        self.cohort = Cohort.from_morphologies(self.morphologies)
+
+    def check_parity(self, reference, cohort_feature, **kwargs):
+        obtained = cohort_feature(self.cohort, **kwargs)
+        for row, morphology in enumerate(self.morphologies):
+            assert_rows_close(
+                reference(Data(morphology), **kwargs), obtained, row)
+
+    def test_pack(self):
+        self.assertEqual(len(self.cohort), 5)
+        self.assertEqual(
+            self.cohort.offsets[-1],
+            sum(len(morphology.nodes()) for morphology in self.morphologies)
+        )
+        for row, morphology in enumerate(self.morphologies):
+            root = morphology.get_root()
+            np.testing.assert_allclose(
+                self.cohort.root_xyz()[row], [root["x"], root["y"], root["z"]])
+
+    def test_num_nodes(self):
+        for node_types in (None, [AXON], [AXON, AXON, BASAL_DENDRITE]):
+            self.check_parity(
+                num_nodes, cohort_num_nodes, node_types=node_types)
+
+    def test_total_length(self):
+        for node_types in (None, [AXON], [AXON, BASAL_DENDRITE]):
+            self.check_parity(
+                total_length, cohort_total_length, node_types=node_types)
+
+    def test_dimension_and_moments(self):
+        for coord_type in COORD_TYPE:
+            for node_types in (None, [AXON]):
+                self.check_parity(
+                    dimension, cohort_dimension,
+                    node_types=node_types, coord_type=coord_type
+                )
+                self.check_parity(
+                    moments, cohort_moments,
+                    node_types=node_types, coord_type=coord_type
+                )
+
+    def test_soma_percentile(self):
+        for symmetrize_xz in (True, False):
+            self.check_parity(
+                soma_percentile, cohort_soma_percentile,
+                node_types=None, symmetrize_xz=symmetrize_xz
+            )
+
+    def test_grouped_reduce_empty(self):
+        reduced = grouped_reduce(
+            np.minimum, np.array([3.0, 1.0, 2.0]), np.array([2, 0, 2]), 4)
+        np.testing.assert_equal(reduced, [1.0, np.nan, 2.0, np.nan])
+
+    def test_missing_types_nan(self):
+        dimensions = cohort_dimension(self.cohort, node_types=[99])
+        self.assertTrue(np.all(np.isnan(dimensions["min_xyz"])))
+        np.testing.assert_equal(
+            cohort_num_nodes(self.cohort, node_types=[99]), 0)
+
+    def test_feature_table(self):
+        table = cohort_feature_table(
+            self.morphologies,
+            {
+                "axon.num_nodes": lambda cohort: cohort_num_nodes(
+                    cohort, node_types=[AXON]),
+                "dimension": cohort_dimension
+            }
+        )
+
+        self.assertEqual(table.reconstruction_ids, ["0", "1", "2", "3", "4"])
+        self.assertEqual(table.values.shape, (5, 1 + 3 + 9))
+        self.assertIn("dimension.min_xyz_2", table.columns)
+        self.assertEqual(
+            table.values[4, table.columns.index("axon.num_nodes")], 2)
+
+        expected = unnest({"dimension": dimension(Data(self.morphologies[1]))})
+        self.assertAlmostEqual(
+            table.values[1, table.columns.index("dimension.width")],
+            expected["dimension.width"]
+        )
+
+    def test_default_feature_table(self):
+        table = cohort_feature_table(self.cohort)
+        self.assertIn("axon.node.dimension.width", table.columns)
+        self.assertIn("all_neurites.total_length", table.columns)
+        self.assertEqual(table.values.shape, (5, len(table.columns)))
@@ -1,5 +1,10 @@
 import os
+import random
+
+import numpy as np
+
 import neuron_morphology.swc_io as swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
 from neuron_morphology.morphology import Morphology
 from neuron_morphology.marker import Marker
 from neuron_morphology.constants import *
@@ -194,3 +199,43 @@ def test_morphology_from_data_file_by_node_type(node_types=None):
 
     axon_only_morphology = Morphology(nodes, node_id_cb, parent_id_cb)
     return axon_only_morphology
+
+
+def synthetic_morphology(seed):
+    """ A random reconstruction with several neurite types, including
+    trifurcations
+    """
+
+    rng = random.Random(seed)
+    builder = MorphologyBuilder()
+    builder.rng = rng
+    builder.root(0, 0, 0)
+
+    def grow(node_type, depth):
+        num_added = 0
+        for _ in range(rng.randint(1, 4)):
+            builder.child(None, None, None, node_type, rng.uniform(0.2, 2))
+            num_added += 1
+        if depth > 0:
+            for _ in range(rng.choice([2, 2, 3])):
+                builder.up(grow(node_type, depth - 1))
+        return num_added
+
+    for node_type in (AXON, BASAL_DENDRITE, APICAL_DENDRITE, BASAL_DENDRITE):
+        builder.up(grow(node_type, rng.randint(1, 3)))
+
+    return builder.build()
+
+
+def assert_results_close(test, reference, result, name):
+    if isinstance(reference, dict):
+        test.assertEqual(set(reference), set(result), name)
+        for key in reference:
+            assert_results_close(
+                test, reference[key], result[key], f"{name}.{key}")
+    else:
+        np.testing.assert_allclose(
+            np.asarray(result, dtype=float),
+            np.asarray(reference, dtype=float),
+            rtol=1e-7, atol=1e-9, equal_nan=True, err_msg=name
+        )
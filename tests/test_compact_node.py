@@ -0,0 +1,43 @@
+import unittest
+import copy
+import pickle
+
+from neuron_morphology.compact_node import CompactNode
+from neuron_morphology.constants import AXON
+
+
+class TestCompactNode(unittest.TestCase):
+
+    def setUp(self):
+        self.as_dict = {
+            "id": 2, "type": AXON, "x": 1.0, "y": 2.0, "z": 3.0, 
+            "radius": 0.5, "parent": 1
+        }
+        self.node = CompactNode.from_dict(self.as_dict)
+
+    def test_getitem(self):
+        self.assertEqual(self.node["y"], 2.0)
+        with self.assertRaises(KeyError):
+            self.node["layer"]
+
+    def test_setitem(self):
+        self.node["x"] = 10.0
+        self.assertEqual(self.node.x, 10.0)
+        with self.assertRaises(KeyError):
+            self.node["layer"] = "2/3"
+
+    def test_contains(self):
+        self.assertIn("radius", self.node)
+        self.assertNotIn("layer", self.node)
+
+    def test_dict_equality(self):
+        self.assertEqual(self.node, self.as_dict)
+        self.assertEqual(self.node.to_dict(), self.as_dict)
+        self.assertEqual(self.node.get("layer", "missing"), "missing")
+
+    def test_copy_and_pickle(self):
+        self.assertEqual(copy.deepcopy(self.node), self.as_dict)
+        self.assertEqual(pickle.loads(pickle.dumps(self.node)), self.as_dict)
+
+    def test_no_dict(self):
+        self.assertFalse(hasattr(self.node, "__dict__"))
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.constants import AXON
+import neuron_morphology.graph as graph
+
+
+class TestGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 0, 1)
+                        .axon(0, 0, 2)
+                            .axon(0, 0, 3).up()
+                            .axon(0, 2, 2).up(3)
+                    .basal_dendrite(3, 0, 0)
+                .root(10, 10, 10, AXON)
+                    .child(10, 10, 11, AXON)
+                .build()
+        )
+
+    def test_to_sparse_adjacency(self):
+        adjacency = self.morphology.to_sparse_adjacency()
+
+        self.assertEqual(adjacency.shape, (8, 8))
+        self.assertEqual(adjacency.nnz, 12)
+        self.assertEqual(adjacency[0, 5], 3.0)
+        self.assertEqual(adjacency[5, 0], 3.0)
+
+    def test_to_sparse_adjacency_directed(self):
+        adjacency = self.morphology.to_sparse_adjacency(
+            weighted=False, directed=True)
+
+        self.assertEqual(adjacency.nnz, 6)
+        self.assertEqual(adjacency[0, 1], 1.0)
+        self.assertEqual(adjacency[1, 0], 0.0)
+
+    def test_path_distances(self):
+        obtained = graph.path_distances(self.morphology, [3], [4, 5, 7])
+        np.testing.assert_allclose(obtained, [[3.0, 6.0, np.inf]])
+
+    def test_nearest_source_distances(self):
+        distances, sources = graph.nearest_source_distances(
+            self.morphology, [3, 5])
+
+        self.assertEqual(distances[0], 3.0)
+        self.assertEqual(sources[2], 3)
+        self.assertEqual(sources[0], 5)
+        self.assertIsNone(sources[6])
+
+    def test_tip_path_distances(self):
+        tip_ids, distances = graph.tip_path_distances(
+            self.morphology, node_types=[AXON])
+
+        self.assertEqual(tip_ids, [3, 4, 7])
+        self.assertEqual(distances[0, 1], 3.0)
+        self.assertTrue(np.isinf(distances[0, 2]))
+
+    def test_connected_components(self):
+        components = graph.connected_components(self.morphology)
+        self.assertEqual(
+            sorted(map(sorted, components)), [[0, 1, 2, 3, 4, 5], [6, 7]])
+
+    def test_breadth_first_node_ids(self):
+        order = graph.breadth_first_node_ids(self.morphology)
+
+        self.assertEqual(order[0], 0)
+        self.assertEqual(set(order[1:3]), {1, 5})
+        self.assertEqual(len(order), 6)
@@ -1,6 +1,7 @@
 import unittest
 
 from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.compact_node import CompactNode
 from neuron_morphology.constants import (
     SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
 
@@ -40,4 +41,17 @@ class TestMorphologyBuilder(unittest.TestCase):
 
         roots = morphology.get_roots()
         self.assertEqual(roots[1]["parent"], -1)
-        self.assertEqual(morphology.nodes()[-1]["parent"], 2)
\ No newline at end of file
+        self.assertEqual(morphology.nodes()[-1]["parent"], 2)
+
+    def test_compact(self):
+        morphology = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 0, 1)
+                        .axon(0, 0, 2)
+                .build(compact=True)
+        )
+
+        self.assertIsInstance(morphology.get_root(), CompactNode)
+        self.assertEqual(morphology.get_leaf_nodes()[0]["z"], 2)
+
@@ -0,0 +1,100 @@
+import unittest
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.constants import SOMA, AXON, BASAL_DENDRITE
+import neuron_morphology.morphology_hash as mh
+
+
+def build(nodes):
+    return Morphology(
+        nodes,
+        node_id_cb=lambda node: node["id"],
+        parent_id_cb=lambda node: node["parent"]
+    )
+
+
+def node(id, type, x, y, z, parent, radius=1.0):
+    return {
+        "id": id, "type": type, "x": x, "y": y, "z": z, "radius": radius,
+        "parent": parent
+    }
+
+
+class TestMorphologyHash(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [
+            node(1, SOMA, 0, 0, 0, -1),
+            node(2, AXON, 0, 1, 0, 1),
+            node(3, AXON, 0, 2, 0, 2),
+            node(4, AXON, 1, 2, 0, 2),
+            node(5, BASAL_DENDRITE, 0, -1, 0, 1),
+        ]
+
+    def test_independent_of_ids_and_order(self):
+        renumbered = [
+            node(50, BASAL_DENDRITE, 0, -1, 0, 10),
+            node(41, AXON, 1, 2, 0, 20),
+            node(10, SOMA, 0, 0, 0, -1),
+            node(30, AXON, 0.0, 2.0, 0.0, 20),
+            node(20, AXON, 0, 1, 0, 10),
+        ]
+
+        self.assertEqual(
+            mh.morphology_hash(build(self.nodes)),
+            mh.morphology_hash(build(renumbered))
+        )
+
+    def test_detects_geometry_change(self):
+        moved = [dict(item) for item in self.nodes]
+        moved[3]["x"] = 1.5
+
+        self.assertNotEqual(
+            mh.morphology_hash(build(self.nodes)),
+            mh.morphology_hash(build(moved))
+        )
+
+    def test_precision(self):
+        noisy = [dict(item) for item in self.nodes]
+        noisy[3]["x"] = 1.0000001
+
+        self.assertNotEqual(
+            mh.morphology_hash(build(self.nodes)),
+            mh.morphology_hash(build(noisy))
+        )
+        self.assertEqual(
+            mh.morphology_hash(build(self.nodes), precision=3),
+            mh.morphology_hash(build(noisy), precision=3)
+        )
+
+    def test_subtree_hashes(self):
+        hashes = mh.subtree_hashes(build(self.nodes))
+
+        self.assertEqual(len(hashes), 5)
+        self.assertNotEqual(hashes[3], hashes[4])
+
+        # identical leaves have identical subtree hashes
+        twins = mh.subtree_hashes(
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 1, 0).up()
+                    .axon(0, 1, 0)
+                .build()
+        )
+        self.assertEqual(twins[1], twins[2])
+
+    def test_changed_subtrees(self):
+        moved = [dict(item) for item in self.nodes]
+        moved[3]["x"] = 1.5
+
+        self.assertEqual(
+            mh.changed_subtrees(build(self.nodes), build(moved)), [4])
+        self.assertEqual(
+            mh.changed_subtrees(build(self.nodes), build(self.nodes)), [])
+
+    def test_pruned_subtree(self):
+        pruned = [item for item in self.nodes if item["id"] != 4]
+
+        self.assertEqual(
+            mh.changed_subtrees(build(self.nodes), build(pruned)), [2])
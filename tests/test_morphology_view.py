@@ -0,0 +1,54 @@
+import unittest
+
+from neuron_morphology.morphology import MorphologyView
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.constants import SOMA, AXON, BASAL_DENDRITE
+
+
+class TestMorphologyView(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 0, 1)
+                        .axon(0, 0, 2)
+                            .axon(0, 0, 3).up()
+                            .axon(0, 0, 4)
+                                .axon(0, 0, 5).up()
+                                .axon(0, 0, 6).up(4)
+                    .basal_dendrite(1, 0, 0)
+                        .basal_dendrite(2, 0, 0)
+                .build()
+        )
+
+    def test_type_view(self):
+        axon = self.morphology.view(node_types=[AXON])
+
+        self.assertIsInstance(axon, MorphologyView)
+        self.assertEqual(len(axon), 6)
+        self.assertEqual(axon.get_root()["id"], 1)
+        self.assertEqual(len(axon.get_leaf_nodes()), 3)
+        self.assertFalse(axon.has_type(BASAL_DENDRITE))
+
+    def test_shares_node_data(self):
+        axon = self.morphology.view(node_types=[AXON])
+        self.assertIs(axon.node_by_id(3), self.morphology.node_by_id(3))
+
+    def test_scoped_caches(self):
+        dendrite = self.morphology.view(node_types=[BASAL_DENDRITE])
+
+        self.assertEqual(len(dendrite.get_node_by_types([SOMA])), 0)
+        self.assertEqual(len(self.morphology.get_node_by_types([SOMA])), 1)
+        self.assertEqual(len(dendrite.get_compartments()), 1)
+
+    def test_subtree(self):
+        subtree = self.morphology.subtree(4)
+
+        self.assertEqual(set(subtree.node_ids()), {4, 5, 6})
+        self.assertEqual(subtree.get_root_id(), 4)
+        self.assertEqual(subtree.get_branching_nodes()[0]["id"], 4)
+
+    def test_view_of_view(self):
+        subtree = self.morphology.view(node_types=[AXON]).subtree(2)
+        self.assertEqual(set(subtree.node_ids()), {2, 3, 4, 5, 6})
@@ -5,6 +5,7 @@ import tempfile
 
 from neuron_morphology.morphology_builder import MorphologyBuilder
 import neuron_morphology.swc_io as swcio
+from neuron_morphology.compact_node import CompactNode
 
 
 class TestSWCIO(unittest.TestCase):
@@ -36,6 +37,14 @@ class TestSWCIO(unittest.TestCase):
         self.assertEqual(morph.get_root()['parent'], -1)
         self.assertEqual(morph.node_by_id(2)['parent'], 1)
 
+    def test_create_compact_morphology_from_swc(self):
+        morph = swcio.morphology_from_swc(self.swc_file, compact=True)
+        expected = swcio.morphology_from_swc(self.swc_file)
+
+        self.assertIsInstance(morph.get_root(), CompactNode)
+        self.assertEqual(morph.node_by_id(2), expected.node_by_id(2))
+        self.assertEqual(len(morph), len(expected))
+
     def test_save_morphology_to_swc(self):
         test_swc_path = os.path.join(self.test_dir, 'test.swc')
         swcio.morphology_to_swc(self.morphology, test_swc_path)
@@ -45,3 +54,26 @@ class TestSWCIO(unittest.TestCase):
             self.assertEqual(int(line[-1]), -1)
             line = test_swc.readline().rstrip().split(' ')
             self.assertEqual(float(line[-1]), 0.0)
+
+    def test_save_compact_morphology_to_swc(self):
+        test_swc_path = os.path.join(self.test_dir, 'test.swc')
+        expected_path = os.path.join(self.test_dir, 'expected.swc')
+        compact = swcio.morphology_from_swc(self.swc_file, compact=True)
+
+        swcio.morphology_to_swc(compact, test_swc_path)
+        swcio.morphology_to_swc(
+            swcio.morphology_from_swc(self.swc_file), expected_path)
+
+        with open(test_swc_path, 'r') as test_swc, \
+                open(expected_path, 'r') as expected_swc:
+            self.assertEqual(test_swc.read(), expected_swc.read())
+
+    def test_count_swc_nodes(self):
+        path = os.path.join(self.test_dir, 'counted.swc')
+        swcio.morphology_to_swc(
+            self.morphology, path, comments=['a comment'])
+        with open(path, 'a') as swc_file:
+            swc_file.write('\n')
+
+        self.assertEqual(
+            swcio.count_swc_nodes(path), len(self.morphology.nodes()))
@@ -287,6 +287,34 @@ class TestTree(unittest.TestCase):
                               for branching_node in branching_nodes]),
                          expected_branching_node_ids)
 
+    def test_has_type(self):
+
+        morphology = test_morphology_small().view(node_types=[SOMA, AXON])
+        self.assertTrue(morphology.has_type(AXON))
+        self.assertFalse(morphology.has_type(BASAL_DENDRITE))
+
+    def test_nodes_have_key(self):
+
+        morphology = test_morphology_small()
+        self.assertTrue(morphology.nodes_have_key('radius'))
+        self.assertFalse(morphology.nodes_have_key('layer'))
+
+    def test_nodes_have_key_partial(self):
+
+        morphology = test_morphology_small()
+        morphology.nodes()[0]['layer'] = '2/3'
+        self.assertFalse(morphology.nodes_have_key('layer'))
+
+    def test_get_roots_after_insert(self):
+
+        morphology = test_morphology_small()
+        self.assertEqual([1], [node['id'] for node in morphology.get_roots()])
+
+        new_node = test_node(id=100, type=SOMA, x=0, y=0, z=0, radius=1, parent_node_id=-1)
+        morphology._insert_between(
+            new_node, None, 1, lambda node, pid: node.__setitem__('parent', pid))
+        self.assertEqual(100, morphology.get_root_id())
+
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestTree)